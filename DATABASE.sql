@@ -33,3 +33,7 @@ CREATE TABLE Song (
     FOREIGN KEY (category_id) REFERENCES Category(id),
     FOREIGN KEY (from_platform) REFERENCES Platform(id)
 );
+
+-- Index for listing songs by add_time; SQLite appends the rowid (id) to every index entry,
+-- so it also serves keyset paging on (add_time, id)
+CREATE INDEX idx_song_add_time ON Song (add_time);
@@ -12,19 +12,33 @@ namespace net_api.Controllers
     {
         private readonly string _database;
 
+        // Upper bound for the pageSize query parameter of GetSongs
+        private const int MaxPageSize = 500;
+
         public SongsController(IConfiguration configuration)
         {
             _database = configuration.GetConnectionString("DefaultConnection");
         }
 
+        // Pass afterTime/afterId (the nextCursor of the previous response) to page by keyset
+        // instead of OFFSET, so deep pages cost the same as the first one. The separate
+        // add_time <= @afterTime term lets idx_song_add_time seek straight to the cursor.
+        // pageSize (default 20, at most MaxPageSize) lets bulk readers such as the import
+        // pre-filter fetch the whole library in fewer requests.
         [HttpGet]
-        public IActionResult GetSongs([FromQuery] int page = 1)
+        public IActionResult GetSongs([FromQuery] int page = 1, [FromQuery] long? afterTime = null, [FromQuery] long? afterId = null,
+                                      [FromQuery] int pageSize = 20)
         {
             try
             {
                 using var con = new SQLiteConnection(_database);
-                int pageSize = 20;
+                pageSize = Math.Clamp(pageSize, 1, MaxPageSize);
                 int offset = (page - 1) * pageSize;
+                bool keyset = afterTime.HasValue && afterId.HasValue;
+                if (keyset)
+                {
+                    offset = 0;
+                }
 
                 var sql = @"
                     SELECT s.id, s.title, s.title_hiragana, s.title_katakana, s.title_romaji, 
@@ -33,11 +47,12 @@ namespace net_api.Controllers
                            p.name as platform_name, p.type as platform_type, p.url as platform_url
                     FROM Song s
                     LEFT JOIN Category c ON s.category_id = c.id
-                    LEFT JOIN Platform p ON s.from_platform = p.id
-                    ORDER BY s.add_time DESC
+                    LEFT JOIN Platform p ON s.from_platform = p.id " +
+                    (keyset ? "WHERE s.add_time <= @afterTime AND (s.add_time < @afterTime OR s.id < @afterId) " : "") + @"
+                    ORDER BY s.add_time DESC, s.id DESC
                     LIMIT @pageSize OFFSET @offset";
 
-                var songs = con.Query(sql, new { pageSize, offset }).Select(row => new
+                var songs = con.Query(sql, new { pageSize, offset, afterTime, afterId }).Select(row => new
                 {
                     id = row.id,
                     title = row.title,
@@ -64,7 +79,14 @@ namespace net_api.Controllers
                     }
                 }).ToList();
 
-                return Ok(new { songs, page, pageSize });
+                var last = songs.LastOrDefault();
+                var nextCursor = songs.Count < pageSize || last == null ? null : new
+                {
+                    afterTime = (long)last.add_time,
+                    afterId = (long)last.id
+                };
+
+                return Ok(new { songs, page, pageSize, nextCursor });
             }
             catch (Exception ex)
             {
@@ -163,6 +185,59 @@ namespace net_api.Controllers
             }
         }
 
+        [HttpPost("batch"),Authorize]
+        public IActionResult CreateSongs([FromBody] List<CreateSongRequest> requests)
+        {
+            try
+            {
+                if (requests == null || requests.Count == 0)
+                {
+                    return BadRequest(new { error = "No songs to create" });
+                }
+
+                using var con = new SQLiteConnection(_database);
+                con.Open();
+                using var transaction = con.BeginTransaction();
+
+                var sql = @"
+                    INSERT INTO Song (title, title_hiragana, title_katakana, title_romaji, artist, description, category_id, add_time, from_platform, from_url, image_url)
+                    VALUES (@title, @title_hiragana, @title_katakana, @title_romaji, @artist, @description, @category_id, @add_time, @from_platform, @from_url, @image_url);
+                    SELECT last_insert_rowid();";
+
+                var addTime = DateTimeOffset.UtcNow.ToUnixTimeSeconds();
+                var results = new List<object>();
+
+                for (int index = 0; index < requests.Count; index++)
+                {
+                    var request = requests[index];
+                    var newId = con.ExecuteScalar<long>(sql, new
+                    {
+                        title = request.title,
+                        title_hiragana = request.title_hiragana,
+                        title_katakana = request.title_katakana,
+                        title_romaji = request.title_romaji,
+                        artist = request.artist,
+                        description = request.description,
+                        category_id = request.category_id,
+                        add_time = addTime,
+                        from_platform = request.from_platform,
+                        from_url = request.from_url,
+                        image_url = request.image_url
+                    }, transaction);
+
+                    results.Add(new { index, status = 201, id = newId });
+                }
+
+                transaction.Commit();
+
+                return Ok(new { results });
+            }
+            catch (Exception ex)
+            {
+                return StatusCode(500, new { error = ex.Message });
+            }
+        }
+
         [HttpPost("{id}"),Authorize]
         public IActionResult UpdateSong(int id, [FromBody] UpdateSongRequest request)
         {
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# API认证：缓存的TOTP令牌、appsettings.json与RSA私钥的加载缓存、RSA签名
+
+import base64
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import pyotp
+
+# TOTP令牌提供者
+# 每个时间窗口最多计算一次令牌；服务器只接受当前窗口的令牌（且按四舍五入后的秒数判断窗口），
+# 因此在窗口结束前margin秒内不再发出旧令牌，而是等到下一个窗口开始后直接使用新令牌
+class TOTPAuthProvider:
+    def __init__(self, totp_key, interval=30, margin=2.0, clock=time.time, sleep=time.sleep):
+        self.totp = pyotp.TOTP(totp_key, interval=interval)
+        self.interval = interval
+        self.margin = margin
+        self.clock = clock
+        self.sleep = sleep
+        self.window = None
+        self.code = None
+        self.lock = threading.Lock()
+
+    # 当前可用的令牌
+    def token(self):
+        with self.lock:
+            now = self.clock()
+            window = int(now // self.interval)
+            remaining = (window + 1) * self.interval - now
+            if remaining < self.margin:
+                # 当前窗口即将结束，等待进入下一个窗口
+                self.sleep(remaining)
+                window += 1
+            if window != self.window:
+                self.window = window
+                self.code = self.totp.generate_otp(window)
+            return self.code
+
+    # Authorization 请求头
+    def header(self):
+        return {"Authorization": f"Bearer {self.token()}"}
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+# 按密钥共享的TOTP令牌提供者
+def get_totp_provider(totp_key):
+    with _providers_lock:
+        provider = _providers.get(totp_key)
+        if provider is None:
+            provider = _providers[totp_key] = TOTPAuthProvider(totp_key)
+        return provider
+
+# 按修改时间缓存的文件读取，文件变化后自动重新读取
+@lru_cache(maxsize=16)
+def _read_text_cached(path, mtime_ns, size):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def read_text(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return _read_text_cached(path, stat.st_mtime_ns, stat.st_size)
+
+# 读取 appsettings.json 中的 TOTPKey、RSAKey 以及私钥文件
+def load_auth_config(appsettings_path, privkey_path):
+    content = read_text(appsettings_path)
+    if content is None:
+        return None, None, None
+    config = json.loads(content)
+    totp_key = config.get('ApiKeyConfig', {}).get('TOTPKey')
+    rsa_key = config.get('ApiKeyConfig', {}).get('RSAKey')
+    return totp_key, rsa_key, read_text(privkey_path)
+
+# 解析PEM私钥，同一私钥只解析一次
+@lru_cache(maxsize=8)
+def load_private_key(private_key_pem):
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key
+    from cryptography.hazmat.backends import default_backend
+    return load_pem_private_key(
+        private_key_pem.encode('utf-8'),
+        password=None,
+        backend=default_backend()
+    )
+
+# RSA签名器（SHA256withRSA，PKCS#1 v1.5），私钥只加载一次
+# 生成 $DATA.$SIGN 格式的令牌，大量签名时可分发到多个进程
+class RSASigner:
+    def __init__(self, private_key_pem):
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding
+        self.private_key_pem = private_key_pem
+        self.private_key = load_private_key(private_key_pem)
+        self.padding = padding.PKCS1v15()
+        self.algorithm = hashes.SHA256()
+
+    # 签名数据，返回 Base64 编码的签名
+    def sign(self, data):
+        signature = self.private_key.sign(data.encode('utf-8'), self.padding, self.algorithm)
+        return base64.b64encode(signature).decode('utf-8')
+
+    # 生成 $DATA.$SIGN 令牌
+    def token(self, data):
+        encoded_data = base64.b64encode(data.encode('utf-8')).decode('utf-8')
+        return f"{encoded_data}.{self.sign(data)}"
+
+    # 批量签名，processes为进程数（None表示CPU核数），1表示在当前进程中签名
+    def sign_batch(self, payloads, processes=None, chunksize=64):
+        payloads = list(payloads)
+        if processes == 1 or len(payloads) < 2:
+            return [self.sign(data) for data in payloads]
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_signer_worker,
+                                 initargs=(self.private_key_pem,)) as pool:
+            return list(pool.map(_sign_in_worker, payloads, chunksize=chunksize))
+
+# 工作进程中的签名器，每个进程初始化时加载一次私钥
+_worker_signer = None
+
+def _init_signer_worker(private_key_pem):
+    global _worker_signer
+    _worker_signer = RSASigner(private_key_pem)
+
+def _sign_in_worker(data):
+    return _worker_signer.sign(data)
+
+# 导出
+__all__ = ["TOTPAuthProvider", "get_totp_provider", "read_text", "load_auth_config", "load_private_key", "RSASigner"]
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# API认证开销的基准测试
+# 用法: python3 bench_auth.py totp [--requests 10000]
+#       python3 bench_auth.py rsa [--payloads 2000] [--processes N]
+
+import argparse
+import base64
+import os
+import time
+
+import pyotp
+
+from auth import TOTPAuthProvider, RSASigner
+
+# 旧版方式：每个请求新建TOTP对象并计算令牌
+def legacy_header(totp_key):
+    totp = pyotp.TOTP(totp_key)
+    return {"Authorization": f"Bearer {totp.now()}"}
+
+def bench_totp(args):
+    totp_key = pyotp.random_base32()
+    provider = TOTPAuthProvider(totp_key)
+    cases = [
+        ('legacy', lambda: legacy_header(totp_key)),
+        ('cached', provider.header),
+    ]
+    print(f"{args.requests} 次请求的认证开销")
+    print(f"{'方式':>8} {'总耗时(ms)':>12} {'每请求(us)':>12}")
+    for label, func in cases:
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            func()
+        elapsed = time.perf_counter() - start
+        print(f"{label:>8} {elapsed * 1000:>12.2f} {elapsed / args.requests * 1e6:>12.2f}")
+
+    # 用模拟时钟验证窗口边界：结束前margin秒内应等待并返回下一个窗口的令牌
+    slept = []
+    now = [0]
+    fake = TOTPAuthProvider(totp_key, clock=lambda: now[0], sleep=slept.append)
+    now[0] = 1000 * 30 + 10
+    assert fake.token() == pyotp.TOTP(totp_key).generate_otp(1000)
+    now[0] = 1000 * 30 + 29
+    assert fake.token() == pyotp.TOTP(totp_key).generate_otp(1001)
+    assert slept == [1]
+    print("窗口边界检查通过")
+
+# 旧版方式：每次签名都重新解析PEM私钥
+def legacy_sign(private_key_pem, data):
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key
+    private_key = load_pem_private_key(private_key_pem.encode('utf-8'), password=None)
+    signature = private_key.sign(data.encode('utf-8'), padding.PKCS1v15(), hashes.SHA256())
+    return base64.b64encode(signature).decode('utf-8')
+
+def generate_private_key_pem():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption()
+    ).decode('utf-8')
+
+def bench_rsa(args):
+    private_key_pem = generate_private_key_pem()
+    payloads = [f"song-{i}" for i in range(args.payloads)]
+    signer = RSASigner(private_key_pem)
+    processes = args.processes or os.cpu_count()
+    cases = [
+        ('legacy', 1, lambda: [legacy_sign(private_key_pem, data) for data in payloads]),
+        ('signer', 1, lambda: signer.sign_batch(payloads, processes=1)),
+        ('pool', processes, lambda: signer.sign_batch(payloads, processes=processes)),
+    ]
+    print(f"{args.payloads} 个负载，RSA-2048 PKCS#1 v1.5")
+    print(f"{'方式':>8} {'进程数':>6} {'耗时(s)':>8} {'签名/秒':>10}")
+    results = {}
+    for label, workers, func in cases:
+        start = time.perf_counter()
+        results[label] = func()
+        elapsed = time.perf_counter() - start
+        print(f"{label:>8} {workers:>6} {elapsed:>8.2f} {args.payloads / elapsed:>10.0f}")
+    # PKCS#1 v1.5 签名是确定性的，三种方式结果应完全一致
+    print(f"签名一致: {results['legacy'] == results['signer'] == results['pool']}")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='API认证基准测试')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    totp = sub.add_parser('totp', help='比较每个请求的TOTP令牌开销')
+    totp.add_argument('--requests', type=int, default=10000, help='模拟的请求数（歌曲数）')
+    totp.set_defaults(func=bench_totp)
+
+    rsa = sub.add_parser('rsa', help='比较单核与多进程的RSA签名速度')
+    rsa.add_argument('--payloads', type=int, default=2000, help='签名的负载数')
+    rsa.add_argument('--processes', type=int, default=None, help='多进程签名的进程数，默认CPU核数')
+    rsa.set_defaults(func=bench_rsa)
+
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    args.func(args)
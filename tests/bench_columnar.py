@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# columnar.py 的基准测试：比较逐项生成器统计与按列统计的耗时，以及JSON与列式文件的大小
+# 写出的每种列式文件都会读回，与内存中的列逐列比较
+# 用法: python3 bench_columnar.py [--size 50000] [--repeat 5]
+
+import argparse
+import os
+import tempfile
+import time
+from array import array
+from collections import Counter
+
+import serializer
+from bench_testjson import make_full_catalog
+from columnar import FORMATS, PLATFORMS, build_columns, export, level_distribution, np, overlap_stats, pa, parse_level
+from jsondata import ChunithmSong, MaimaiSong, OngekiSong
+from testjson import ArcadeStats, create_song_objects, merge_arcade_songs
+
+def timed(func, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+# 旧版统计：每个指标一次生成器遍历
+def legacy_stats(songs):
+    return {
+        'total': len(songs),
+        'chunithm': sum(1 for song in songs if song.chunithm is not None),
+        'maimai': sum(1 for song in songs if song.maimai is not None),
+        'ongeki': sum(1 for song in songs if song.ongeki is not None),
+        'chunithm_maimai': sum(1 for song in songs if song.chunithm and song.maimai),
+        'chunithm_ongeki': sum(1 for song in songs if song.chunithm and song.ongeki),
+        'maimai_ongeki': sum(1 for song in songs if song.maimai and song.ongeki),
+        'all_three': sum(1 for song in songs if song.chunithm and song.maimai and song.ongeki),
+    }
+
+def single_pass_stats(songs):
+    stats = ArcadeStats()
+    for song in songs:
+        stats.add(song)
+    return stats
+
+# 逐首解析MASTER难度后计数
+def legacy_levels(songs):
+    result = {}
+    for platform in PLATFORMS:
+        counts = Counter()
+        for song in songs:
+            entry = getattr(song, platform)
+            if entry is not None:
+                level = parse_level(entry.lev_mas)
+                if level == level:
+                    counts[level] += 1
+        result[platform] = dict(sorted(counts.items()))
+    return result
+
+def column_levels(columns):
+    return {platform: level_distribution(columns[f"{platform}_lev_mas"]) for platform in PLATFORMS}
+
+# 读回列式文件与原始列比较：Arrow中缺失的难度为null，.npy中缺失的字符串为空字符串
+def check_roundtrip(columns, path: str):
+    if path.endswith('.npy'):
+        records = np.load(path, allow_pickle=False)
+        read = {name: records[name].tolist() for name in columns}
+        missing_text = ''
+    else:
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+        table = pq.read_table(path) if path.endswith('.parquet') else feather.read_table(path)
+        read = {name: table.column(name).to_pylist() for name in columns}
+        missing_text = None
+    assert list(read) == list(columns), path
+    for name, column in columns.items():
+        if name == 'platforms':
+            expected = list(column)
+        elif isinstance(column, array):
+            # NaN不等于自身，比较前统一换成None
+            expected = [None if value != value else value for value in column]
+            read[name] = [None if value is None or value != value else value for value in read[name]]
+        else:
+            expected = [missing_text if value is None else value for value in column]
+        assert read[name] == expected, f"{path}: {name}"
+
+def main(args):
+    songs = merge_arcade_songs(*(
+        create_song_objects(make_full_catalog(args.size, game), song_class)
+        for game, song_class in (('chunithm', ChunithmSong), ('maimai', MaimaiSong), ('ongeki', OngekiSong))
+    ))
+    groups = serializer.to_dict(songs)
+    built, columns = timed(lambda: build_columns(groups), 1)
+    print(f"{len(songs)} 组歌曲，{len(columns)} 列，建列 {built * 1000:.0f}ms"
+          f"（numpy: {'有' if np is not None else '无'}，pyarrow: {'有' if pa is not None else '无'}）")
+
+    expected = legacy_stats(songs)
+    cases = [
+        ('平台统计 逐指标', lambda: legacy_stats(songs)),
+        ('平台统计 单次遍历', lambda: single_pass_stats(songs)),
+        ('平台统计 按列', lambda: overlap_stats(columns['platforms'])),
+        ('难度分布 逐首解析', lambda: legacy_levels(songs)),
+        ('难度分布 按列', lambda: column_levels(columns)),
+    ]
+    print(f"{'方式':>14} {'耗时(ms)':>10}")
+    for label, func in cases:
+        elapsed, _ = timed(func, args.repeat)
+        print(f"{label:>14} {elapsed * 1000:>10.2f}")
+    assert overlap_stats(columns['platforms']) == expected
+    assert column_levels(columns) == legacy_levels(songs)
+    print("统计结果一致")
+
+    with tempfile.TemporaryDirectory(prefix='bench_columnar_') as workdir:
+        path = os.path.join(workdir, 'arcade_songs_output.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            serializer.dump(songs, f)
+        print(f"{'格式':>10} {'大小(MB)':>10} {'写出(ms)':>10} {'读回一致':>8}")
+        print(f"{'json':>10} {os.path.getsize(path) / 1024 / 1024:>10.1f} {'-':>10}")
+        for suffix, library in FORMATS.items():
+            if (library == 'numpy' and np is None) or (library == 'pyarrow' and pa is None):
+                print(f"{suffix[1:]:>10} 未安装{library}，跳过")
+                continue
+            path = os.path.join(workdir, 'arcade_songs' + suffix)
+            elapsed, _ = timed(lambda: export(columns, path), 1)
+            check_roundtrip(columns, path)
+            print(f"{suffix[1:]:>10} {os.path.getsize(path) / 1024 / 1024:>10.1f} {elapsed * 1000:>10.0f} {'是':>8}")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='columnar.py 基准测试')
+    parser.add_argument('--size', type=int, default=50000, help='每个平台的合成曲目数')
+    parser.add_argument('--repeat', type=int, default=5, help='每项统计的重复次数')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    main(parse_arguments())
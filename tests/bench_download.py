@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# 图片下载基准测试，使用本地替身服务器模拟SEGA图片主机
+# 用法: python3 bench_download.py [--images 200] [--latency 0.05] [--workers 1 8 32] [--sync]
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from downloader import ImageDownloader, ImageManifest, MANIFEST_NAME
+from standin import StandinServer, image_handler
+
+PLATFORMS = ['chunithm', 'maimai', 'ongeki']
+
+def make_images(count: int, size: int):
+    return {f"img_{i:05d}.png": os.urandom(size) for i in range(count)}
+
+def run_download(images, base_url: str, workers: int, rate: float):
+    root = tempfile.mkdtemp(prefix='bench_images_')
+    try:
+        base_urls = {platform: f"{base_url}/{platform}/" for platform in PLATFORMS}
+        jobs = [(name, PLATFORMS[i % len(PLATFORMS)], name) for i, name in enumerate(images)]
+        start = time.perf_counter()
+        with ImageDownloader(root=root, workers=workers, rate_per_host=rate, base_urls=base_urls) as downloader:
+            counts, failed = downloader.download_all(jobs)
+        elapsed = time.perf_counter() - start
+        success = sum(counts.values())
+        # 校验写入磁盘的内容
+        for image_url, platform, filename in jobs:
+            with open(os.path.join(root, platform, filename), 'rb') as f:
+                assert f.read() == images[filename], f"{filename} 内容不一致"
+        return success, len(failed), elapsed
+    finally:
+        shutil.rmtree(root)
+
+# 增量同步：首次全量下载，之后只下载服务器上变化过的图片
+def run_sync(images, base_url: str, workers: int, changed: int):
+    root = tempfile.mkdtemp(prefix='bench_sync_')
+    try:
+        base_urls = {platform: f"{base_url}/{platform}/" for platform in PLATFORMS}
+        jobs = [(name, PLATFORMS[i % len(PLATFORMS)], name) for i, name in enumerate(images)]
+        rounds = [('首次同步', False, 0), ('再次同步', False, 0), ('条件请求', True, 0), ('部分变化', True, changed)]
+        print(f"{'轮次':>8} {'下载':>6} {'未变化':>6} {'跳过':>6} {'失败':>6} {'耗时(s)':>8}")
+        for label, revalidate, changed_count in rounds:
+            # 模拟服务器端更新了部分图片
+            for name in list(images)[:changed_count]:
+                images[name] = os.urandom(len(images[name]))
+            manifest = ImageManifest(os.path.join(root, MANIFEST_NAME))
+            start = time.perf_counter()
+            with ImageDownloader(root=root, workers=workers, base_urls=base_urls,
+                                 manifest=manifest, revalidate=revalidate) as downloader:
+                counts, failed = downloader.download_all(jobs)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>8} {counts['downloaded']:>6} {counts['revalidated']:>6} "
+                  f"{counts['skipped']:>6} {len(failed):>6} {elapsed:>8.2f}")
+    finally:
+        shutil.rmtree(root)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='图片下载基准测试')
+    parser.add_argument('--images', type=int, default=200, help='图片数量')
+    parser.add_argument('--size', type=int, default=64 * 1024, help='每张图片字节数')
+    parser.add_argument('--latency', type=float, default=0.05, help='替身服务器模拟延迟（秒）')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 32], help='要测试的并发数')
+    parser.add_argument('--rate', type=float, default=0, help='每个主机每秒最多请求数')
+    parser.add_argument('--sync', action='store_true', help='测试基于清单的增量同步')
+    parser.add_argument('--changed', type=int, default=10, help='增量同步测试中服务器端变化的图片数')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    images = make_images(args.images, args.size)
+    handler = image_handler(images, latency=args.latency)
+    with StandinServer(handler) as server:
+        if args.sync:
+            run_sync(images, server.base_url, max(args.workers), args.changed)
+            raise SystemExit
+        print(f"{'并发数':>6} {'成功':>6} {'失败':>6} {'耗时(s)':>8} {'张/秒':>8}")
+        for workers in args.workers:
+            success, failed, elapsed = run_download(images, server.base_url, workers, args.rate)
+            print(f"{workers:>6} {success:>6} {failed:>6} {elapsed:>8.2f} {success / elapsed:>8.1f}")
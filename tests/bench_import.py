@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# import_data.py 导入流程的基准测试，使用本地替身API统计请求数并注入失败
+# 用法: python3 bench_import.py concurrency [--songs 500] [--workers 1 4 16] [--fail-every 20]
+#       python3 bench_import.py batch [--songs 500] [--batch-sizes 1 10 50]
+#       python3 bench_import.py resume [--songs 1000] [--kill-after 400]
+#       python3 bench_import.py prefilter [--songs 1000] [--existing 0.9] [--library 5000]
+#       python3 bench_import.py parse [--lines 1000000] [--quoted 0.1] [--duplicates 0.05]
+#       python3 bench_import.py retry [--songs 100] [--fail-every 5] [--timeout 0.2]
+
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pyotp
+
+import import_data
+import metrics
+from standin import StandinServer, api_handler
+
+def make_entries(count: int, offset: int = 0):
+    return [{
+        "Title": f"曲目 {i}",
+        "Artist": f"アーティスト {i % 97}",
+        "CategoryId": 1,
+        "FromPlatform": 0,
+        "AddTime": 0
+    } for i in range(offset, offset + count)]
+
+def import_args(**overrides):
+    values = dict(batch_size=10, delay=0, workers=1, rate=0, retries=3, timeout=10)
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+def bench_concurrency(args):
+    entries = make_entries(args.songs)
+    print(f"{'并发数':>6} {'成功':>6} {'失败':>6} {'请求数':>6} {'注入失败':>8} {'耗时(s)':>8} {'首/秒':>8}")
+    for workers in args.workers:
+        handler = api_handler(latency=args.latency, fail_every=args.fail_every)
+        with StandinServer(handler) as server:
+            start = time.perf_counter()
+            success, errors = import_data.import_to_api(
+                entries, import_args(workers=workers, rate=args.rate, batch_size=1), base_url=server.base_url)
+            elapsed = time.perf_counter() - start
+        stats = handler.stats
+        print(f"{workers:>6} {success:>6} {len(errors):>6} {stats['requests']:>6} "
+              f"{stats['failures']:>8} {elapsed:>8.2f} {success / elapsed:>8.1f}")
+
+def bench_batch(args):
+    entries = make_entries(args.songs)
+    # 预先存在一部分歌曲，验证批量结果中的409
+    existing = [f"{song['Title']}|{song['Artist']}" for song in entries[::args.duplicate_every]] if args.duplicate_every else []
+    print(f"{'批量大小':>8} {'服务器批量':>10} {'成功':>6} {'已存在':>6} {'请求数':>6} {'批量请求':>8} {'平均负载(B)':>11} {'耗时(s)':>8}")
+    for batch_size in args.batch_sizes:
+        for supported in (True, False):
+            handler = api_handler(latency=args.latency, existing=existing, batch=supported)
+            with StandinServer(handler) as server:
+                start = time.perf_counter()
+                success, errors = import_data.import_to_api(
+                    entries, import_args(workers=args.workers, batch_size=batch_size), base_url=server.base_url)
+                elapsed = time.perf_counter() - start
+            stats = handler.stats
+            duplicates = sum(1 for error in errors if error.endswith("歌曲已存在"))
+            payload = sum(stats['payload_bytes']) / max(1, len(stats['payload_bytes']))
+            print(f"{batch_size:>8} {str(supported):>10} {success:>6} {duplicates:>6} {stats['requests']:>6} "
+                  f"{stats['batches']:>8} {payload:>11.0f} {elapsed:>8.2f}")
+            if batch_size == 1:
+                break
+
+# 在子进程中运行导入，父进程在中途将其强制结束
+def run_import_process(entries, base_url, journal_path, totp_key, batch_size, workers):
+    import_data.TOTP_KEY = totp_key
+    logging.getLogger().setLevel(logging.ERROR)
+    journal = import_data.ImportJournal(journal_path)
+    import_data.import_to_api(entries, import_args(workers=workers, batch_size=batch_size), base_url=base_url, journal=journal)
+
+def bench_resume(args):
+    entries = make_entries(args.songs)
+    handler = api_handler(latency=args.latency)
+    with tempfile.TemporaryDirectory(prefix='bench_resume_') as workdir, StandinServer(handler) as server:
+        journal_path = os.path.join(workdir, 'import_journal.db')
+
+        # 第一次运行：导入到一半时用SIGKILL结束进程
+        process = multiprocessing.Process(target=run_import_process, args=(
+            entries, server.base_url, journal_path, import_data.TOTP_KEY, args.batch_size, args.workers))
+        start = time.perf_counter()
+        process.start()
+        while handler.stats['created'] < args.kill_after and process.is_alive():
+            time.sleep(0.01)
+        process.kill()
+        process.join()
+        first_elapsed = time.perf_counter() - start
+        first_requests = handler.stats['requests']
+        created_before = handler.stats['created']
+
+        # 第二次运行：按导入日志跳过已完成的歌曲
+        journal = import_data.ImportJournal(journal_path)
+        completed = journal.completed_keys()
+        remaining = [entry for entry in entries if import_data.entry_key(entry) not in completed]
+        start = time.perf_counter()
+        import_data.import_to_api(remaining, import_args(workers=args.workers, batch_size=args.batch_size),
+                                  base_url=server.base_url, journal=journal)
+        second_elapsed = time.perf_counter() - start
+        summary = journal.summary()
+        journal.close()
+
+    stats = handler.stats
+    print(f"第一次运行: {first_requests} 个请求，新建 {created_before} 首后被结束，耗时 {first_elapsed:.2f}s")
+    print(f"导入日志记录已完成: {len(completed)} 首，重新运行需导入 {len(remaining)} 首")
+    print(f"第二次运行: {stats['requests'] - first_requests} 个请求，"
+          f"新建 {stats['created'] - created_before} 首，已存在 {stats['duplicates']} 首，耗时 {second_elapsed:.2f}s")
+    print(f"服务器最终歌曲数: {stats['created']}/{len(entries)}，导入日志: {summary}")
+
+def bench_prefilter(args):
+    entries = make_entries(args.songs)
+    # 已有曲库：list中前 existing 比例的歌曲，加上其他来源导入的歌曲
+    known = entries[:int(len(entries) * args.existing)]
+    others = make_entries(max(0, args.library - len(known)), offset=args.songs)
+    existing = [import_data.entry_key(song) for song in known + others]
+    print(f"导入 {len(entries)} 首，其中 {len(known)} 首已存在，已有曲库 {len(existing)} 首")
+    print(f"{'方式':>10} {'读取请求':>8} {'导入请求':>8} {'新建':>6} {'409':>6} {'跳过':>6} {'键内存(KB)':>10} {'耗时(s)':>8}")
+    for label, prefilter, bloom in (('不过滤', False, 0), ('集合', True, 0), ('布隆过滤器', True, args.library)):
+        handler = api_handler(latency=args.latency, existing=existing)
+        with StandinServer(handler) as server:
+            start = time.perf_counter()
+            remaining, skipped, memory = entries, 0, 0
+            if prefilter:
+                keys, _ = import_data.fetch_existing_keys(server.base_url, bloom_capacity=bloom)
+                remaining, skipped = import_data.drop_existing(entries, keys)
+                if isinstance(keys, set):
+                    memory = sys.getsizeof(keys) + sum(sys.getsizeof(key) for key in keys)
+                else:
+                    memory = len(keys.bits)
+            pages = handler.stats['pages']
+            posts_before = handler.stats['requests']
+            import_data.import_to_api(remaining, import_args(workers=args.workers, batch_size=args.batch_size),
+                                      base_url=server.base_url)
+            elapsed = time.perf_counter() - start
+        stats = handler.stats
+        print(f"{label:>10} {pages:>8} {stats['requests'] - posts_before:>8} {stats['created']:>6} "
+              f"{stats['duplicates']:>6} {skipped:>6} {memory / 1024:>10.0f} {elapsed:>8.2f}")
+
+# 合成的list.txt：带注释和空行，一部分字段加引号并在其中包含逗号和引号，一部分行与之前的行重复
+def write_list_file(path, lines, quoted, duplicates, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("# Music List\n# title,artist\n\n")
+        for i in range(lines):
+            if rows and rng.random() < duplicates:
+                row = rng.choice(rows)
+            elif rng.random() < quoted:
+                row = f'"曲目 {i}, part {i % 3}","アーティスト ""{i % 97}"""'
+            else:
+                row = f"曲目 {i},アーティスト {i % 97}"
+            if len(rows) < 10000:
+                rows.append(row)
+            f.write(row + "\n")
+            if i % 1000 == 0:
+                f.write("# section\n\n")
+
+# 改造前的解析：按引号拆分，全部读入列表，每行调用一次time.time()，之后再去重
+def legacy_parse(list_path):
+    music_entries = []
+    with open(list_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('"'):
+                parts = line.split('","')
+                if len(parts) >= 2:
+                    music_entries.append({"Title": parts[0][1:].strip(), "Artist": parts[1].rsplit('"', 1)[0].strip(),
+                                          "CategoryId": 1, "FromPlatform": 0, "AddTime": int(time.time())})
+            else:
+                parts = line.split(',')
+                if len(parts) >= 2:
+                    music_entries.append({"Title": parts[0].strip(), "Artist": ','.join(parts[1:]).strip(),
+                                          "CategoryId": 1, "FromPlatform": 0, "AddTime": int(time.time())})
+    unique_entries = []
+    seen = set()
+    for entry in music_entries:
+        key = import_data.entry_key(entry)
+        if key not in seen:
+            seen.add(key)
+            unique_entries.append(entry)
+    return len(unique_entries)
+
+def stream_parse(list_path):
+    return sum(1 for _ in import_data.pending_entries(import_data.iter_list_entries(list_path)))
+
+# 生产者线程开始解析到消费者拿到第一组的时间
+def first_chunk(list_path, batch_size):
+    start = time.perf_counter()
+    chunks = import_data.produce_chunks(import_data.pending_entries(import_data.iter_list_entries(list_path)), batch_size)
+    next(chunks)
+    elapsed = time.perf_counter() - start
+    chunks.close()
+    return elapsed
+
+def bench_parse(args):
+    with tempfile.TemporaryDirectory(prefix='bench_parse_') as workdir:
+        path = os.path.join(workdir, 'list.txt')
+        write_list_file(path, args.lines, args.quoted, args.duplicates)
+        print(f"list.txt: {args.lines} 行，{os.path.getsize(path) / 1024 / 1024:.1f} MB，"
+              f"引号行约 {args.quoted:.0%}，重复行约 {args.duplicates:.0%}")
+        print(f"{'方式':>8} {'待导入':>8} {'耗时(s)':>8} {'行/秒':>10} {'峰值内存(MB)':>12}")
+        for label, func in (('改造前', legacy_parse), ('流式', stream_parse)):
+            start = time.perf_counter()
+            count = func(path)
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            func(path)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{label:>8} {count:>8} {elapsed:>8.2f} {args.lines / elapsed:>10.0f} {peak / 1024 / 1024:>12.1f}")
+        print(f"流式导入拿到第一组（{args.batch_size} 首）用时 {first_chunk(path, args.batch_size) * 1000:.1f}ms")
+
+# 各种失败下的重试：只有确定未被处理的请求才重发，服务器上不应出现重复写入（409）
+def bench_retry(args):
+    entries = make_entries(args.songs)
+    options = import_args(workers=args.workers, batch_size=args.batch_size, timeout=args.timeout)
+    scenarios = [
+        ('503+Retry-After', dict(fail_every=args.fail_every)),
+        ('503', dict(fail_every=args.fail_every, retry_after=None)),
+        ('读取超时', dict(latency=args.timeout * 2)),
+    ]
+    print(f"{'场景':>16} {'成功':>6} {'失败':>6} {'重试':>6} {'请求数':>6} {'写入':>6} {'重复(409)':>9}")
+    for label, handler_options in scenarios:
+        metrics.METRICS.reset()
+        handler = api_handler(**handler_options)
+        with StandinServer(handler) as server:
+            success, errors = import_data.import_to_api(entries, options, base_url=server.base_url)
+            # 等待客户端超时后服务器仍在处理的请求完成
+            time.sleep(handler_options.get('latency', 0))
+        stats = handler.stats
+        print(f"{label:>16} {success:>6} {len(errors):>6} {metrics.METRICS.counters.get('import_retries', 0):>6} "
+              f"{stats['requests']:>6} {stats['created']:>6} {stats['duplicates']:>9}")
+
+    # 连接被拒绝：请求没有发出，可以安全重试
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    metrics.METRICS.reset()
+    success, errors = import_data.import_to_api(entries[:args.batch_size], options, base_url=f"http://127.0.0.1:{port}")
+    print(f"{'拒绝连接':>16} {success:>6} {len(errors):>6} {metrics.METRICS.counters.get('import_retries', 0):>6} "
+          f"{'-':>6} {'-':>6} {'-':>9}")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='import_data.py 基准测试')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    concurrency = sub.add_parser('concurrency', help='比较不同并发数下的导入速度')
+    concurrency.add_argument('--songs', type=int, default=500, help='导入的歌曲数')
+    concurrency.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16], help='要测试的并发数')
+    concurrency.add_argument('--latency', type=float, default=0.02, help='替身API模拟延迟（秒）')
+    concurrency.add_argument('--rate', type=float, default=0, help='每秒最多请求数，0表示不限制')
+    concurrency.add_argument('--fail-every', type=int, default=20, help='每第N个请求返回503，0表示不注入')
+    concurrency.set_defaults(func=bench_concurrency)
+
+    batch = sub.add_parser('batch', help='比较批量大小对请求数和耗时的影响')
+    batch.add_argument('--songs', type=int, default=500, help='导入的歌曲数')
+    batch.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 50], help='要测试的批量大小')
+    batch.add_argument('--workers', type=int, default=4, help='并发数')
+    batch.add_argument('--latency', type=float, default=0.02, help='替身API模拟延迟（秒）')
+    batch.add_argument('--duplicate-every', type=int, default=10, help='每N首中预置一首已存在的歌曲，0表示不预置')
+    batch.set_defaults(func=bench_batch)
+
+    resume = sub.add_parser('resume', help='中途结束导入进程后按导入日志继续')
+    resume.add_argument('--songs', type=int, default=1000, help='导入的歌曲数')
+    resume.add_argument('--kill-after', type=int, default=400, help='服务器新建多少首后结束导入进程')
+    resume.add_argument('--batch-size', type=int, default=1, help='批量大小')
+    resume.add_argument('--workers', type=int, default=4, help='并发数')
+    resume.add_argument('--latency', type=float, default=0.005, help='替身API模拟延迟（秒）')
+    resume.set_defaults(func=bench_resume)
+
+    prefilter = sub.add_parser('prefilter', help='导入前读取已有曲库，比较去掉已存在歌曲前后的请求数')
+    prefilter.add_argument('--songs', type=int, default=1000, help='导入的歌曲数')
+    prefilter.add_argument('--existing', type=float, default=0.9, help='导入的歌曲中已存在的比例')
+    prefilter.add_argument('--library', type=int, default=5000, help='已有曲库的歌曲数')
+    prefilter.add_argument('--batch-size', type=int, default=1, help='批量大小')
+    prefilter.add_argument('--workers', type=int, default=4, help='并发数')
+    prefilter.add_argument('--latency', type=float, default=0.02, help='替身API模拟延迟（秒）')
+    prefilter.set_defaults(func=bench_prefilter)
+
+    parse = sub.add_parser('parse', help='比较改造前的解析与流式解析去重的吞吐和内存')
+    parse.add_argument('--lines', type=int, default=1000000, help='list.txt的行数')
+    parse.add_argument('--quoted', type=float, default=0.1, help='字段加引号（含逗号）的行的比例')
+    parse.add_argument('--duplicates', type=float, default=0.05, help='与之前的行重复的比例')
+    parse.add_argument('--batch-size', type=int, default=10, help='流式导入的分组大小')
+    parse.set_defaults(func=bench_parse)
+
+    retry = sub.add_parser('retry', help='注入各种失败，检查重试不会造成重复写入')
+    retry.add_argument('--songs', type=int, default=100, help='导入的歌曲数')
+    retry.add_argument('--fail-every', type=int, default=5, help='每第N个请求返回503')
+    retry.add_argument('--timeout', type=float, default=0.2, help='请求超时秒数，读取超时场景中服务器延迟为其2倍')
+    retry.add_argument('--batch-size', type=int, default=10, help='批量大小')
+    retry.add_argument('--workers', type=int, default=4, help='并发数')
+    retry.set_defaults(func=bench_retry)
+
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    # 替身API不校验令牌，使用随机TOTP密钥
+    import_data.TOTP_KEY = pyotp.random_base32()
+    logging.getLogger().setLevel(logging.ERROR)
+    args.func(args)
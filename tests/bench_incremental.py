@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# 增量合并的基准测试：修改一个平台的部分歌曲后，比较完整合并与增量合并的耗时，并核对输出一致
+# 曲库中有一首没有标题的歌曲，没有变化时不应出现任何变更
+# 用法: python3 bench_incremental.py [--size 20000] [--changes 50]
+
+import argparse
+import filecmp
+import json
+import os
+import random
+import tempfile
+import time
+
+import serializer
+from bench_testjson import make_full_catalog
+from incremental import incremental_merge, summary
+from testjson import PLATFORMS, SOURCES, generate_arcade_songs
+
+def write_catalog(platform: str, catalog):
+    with open(SOURCES[platform][0], 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False)
+
+def full_merge(path: str):
+    start = time.perf_counter()
+    songs = generate_arcade_songs()
+    with open(path, 'w', encoding='utf-8') as f:
+        serializer.dump(songs, f)
+    return time.perf_counter() - start
+
+def incremental(output: str):
+    start = time.perf_counter()
+    changelog = incremental_merge(output)
+    return time.perf_counter() - start, changelog
+
+def main(args):
+    rng = random.Random(0)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench_incremental_') as workdir:
+        os.chdir(workdir)
+        try:
+            catalogs = {platform: make_full_catalog(args.size, platform) for platform in PLATFORMS}
+            catalogs['ongeki'][0]['title'] = None
+            for platform, catalog in catalogs.items():
+                write_catalog(platform, catalog)
+            output = 'arcade_songs_output.json'
+            print(f"每个平台 {args.size} 首")
+            print(f"{'场景':>12} {'完整合并(s)':>11} {'增量合并(s)':>11} {'输出一致':>8}  变更")
+
+            def run(label):
+                full = full_merge('full_output.json')
+                elapsed, changelog = incremental(output)
+                same = filecmp.cmp('full_output.json', output, shallow=False)
+                print(f"{label:>12} {full:>11.2f} {elapsed:>11.2f} {str(same):>8}  {summary(changelog)}")
+                return changelog
+
+            run('首次（无快照）')
+            unchanged = run('均未变化')
+            assert not any(unchanged['groups'].values()), unchanged['groups']
+
+            # maimai：修改、删除和新增部分歌曲
+            maimai = catalogs['maimai']
+            for item in rng.sample(maimai, args.changes):
+                item['artist'] += ' (feat. someone)'
+            for item in rng.sample(maimai, args.changes):
+                maimai.remove(item)
+            for i in range(args.changes):
+                maimai.append(dict(maimai[0], id=f"new-{i}", title=f"新曲 {i}"))
+            write_catalog('maimai', maimai)
+            run('maimai变化')
+
+            # chunithm：只修改一首
+            catalogs['chunithm'][0]['catname'] = 'VARIETY'
+            write_catalog('chunithm', catalogs['chunithm'])
+            run('chunithm一首')
+        finally:
+            os.chdir(cwd)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='增量合并基准测试')
+    parser.add_argument('--size', type=int, default=20000, help='每个平台的合成曲目数')
+    parser.add_argument('--changes', type=int, default=50, help='maimai中修改、删除、新增的歌曲数')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    main(parse_arguments())
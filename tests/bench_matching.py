@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# matching.py 的基准测试：在带有写法差异的合成曲库上比较各匹配方式的分组数、准确率和耗时
+# 用法: python3 bench_matching.py [--songs 20000] [--sizes 5000 10000 20000 40000]
+#       python3 bench_matching.py --real   （读取当前目录下的三个曲库文件，只报告分组数和耗时）
+
+import argparse
+import random
+import time
+from itertools import combinations
+
+from bench_search import KANJI, KATAKANA, make_word
+from jsondata import ChunithmSong, MaimaiSong, OngekiSong
+from matching import MODES, THRESHOLD, grams, match_groups, similarity, title_key
+from testjson import PLATFORMS, build_title_index, create_song_objects
+
+SONG_CLASSES = {'chunithm': ChunithmSong, 'maimai': MaimaiSong, 'ongeki': OngekiSong}
+READING_FIELD = {'chunithm': 'reading', 'maimai': 'title_kana', 'ongeki': 'title_sort'}
+
+# 各平台常见的写法差异
+def full_width(title: str) -> str:
+    return ''.join(chr(ord(ch) + 0xFEE0) if '!' <= ch <= '~' else ('　' if ch == ' ' else ch) for ch in title)
+
+def variant(title: str, rng: random.Random):
+    """返回 (差异类型, 变体标题)"""
+    kind = rng.random()
+    if kind < 0.7:
+        return 'same', title
+    if kind < 0.78:
+        return 'width', full_width(title)
+    if kind < 0.84:
+        return 'symbol', title.replace(' ', ' & ', 1) if ' ' in title else title + '!'
+    if kind < 0.88:
+        return 'case', title.upper()
+    if kind < 0.92:
+        return 'spacing', title.replace(' ', '') if ' ' in title else ' ' + title
+    if kind < 0.96:
+        kanji = [i for i, ch in enumerate(title) if ch in KANJI]
+        if kanji:
+            # 异体字：读音和艺术家不变
+            i = rng.choice(kanji)
+            return 'kanji', title[:i] + rng.choice(KANJI) + title[i + 1:]
+    # 错字：替换一个字符
+    i = rng.randrange(len(title))
+    return 'typo', title[:i] + rng.choice(KATAKANA) + title[i + 1:]
+
+def make_catalogs(count: int, seed: int = 0):
+    """返回 各平台曲库, 以及每首歌的真实编号（写在id字段中）"""
+    rng = random.Random(seed)
+    artists = [' '.join(make_word(rng) for _ in range(rng.randint(1, 2))) for _ in range(count // 10 + 1)]
+    catalogs = {platform: [] for platform in PLATFORMS}
+    for sid in range(count):
+        title = ' '.join(make_word(rng) for _ in range(rng.randint(1, 3)))
+        # 约2%的歌曲是已有曲名加后缀、艺术家不同的另一首歌，不应被合并
+        if sid and rng.random() < 0.02:
+            title = catalogs['chunithm'][-1]['title'] + ' ' + make_word(rng) if catalogs['chunithm'] else title
+        reading = ''.join(ch for ch in title if ch in KATAKANA) or title
+        artist = rng.choice(artists)
+        present = [platform for platform in PLATFORMS if rng.random() < 0.6] or [rng.choice(PLATFORMS)]
+        for position, platform in enumerate(present):
+            kind, text = ('same', title) if position == 0 else variant(title, rng)
+            # 错字的记录不带读音，只能靠模糊匹配找回
+            catalogs[platform].append({'id': str(sid), 'title': text, 'artist': artist,
+                                       READING_FIELD[platform]: reading if kind != 'typo' else None,
+                                       'variant': kind})
+    return catalogs
+
+def load_indexes(catalogs):
+    indexes = {}
+    for platform in PLATFORMS:
+        items = [{key: value for key, value in item.items() if key != 'variant'} for item in catalogs[platform]]
+        indexes[platform] = build_title_index(create_song_objects(items, SONG_CLASSES[platform]))
+    return indexes
+
+def pairs(groups):
+    """组内不同平台歌曲的 (id, id) 对"""
+    result = set()
+    for group in groups:
+        ids = [(platform, group[platform].id) for platform in PLATFORMS if group[platform] is not None]
+        result.update(combinations(ids, 2))
+    return result
+
+def true_pairs(catalogs):
+    by_id = {}
+    for platform in PLATFORMS:
+        for item in catalogs[platform]:
+            by_id.setdefault(item['id'], []).append((platform, item['id']))
+    return {pair for ids in by_id.values() for pair in combinations(ids, 2)}
+
+def all_pairs_fuzzy(indexes, threshold: float) -> int:
+    """不分块的模糊匹配：后面平台的每个标题与之前所有标题逐一比较，返回比较次数"""
+    seen = []
+    comparisons = 0
+    for platform in PLATFORMS:
+        current = [grams(title_key(title)) for title in indexes[platform]]
+        for query in current:
+            for other in seen:
+                comparisons += 1
+                similarity(query, other) >= threshold
+        seen.extend(current)
+    return comparisons
+
+def quality(args):
+    catalogs = make_catalogs(args.songs)
+    indexes = load_indexes(catalogs)
+    expected = true_pairs(catalogs)
+    kinds = {}
+    for platform in PLATFORMS:
+        for item in catalogs[platform]:
+            kinds[item['variant']] = kinds.get(item['variant'], 0) + 1
+    print(f"{args.songs} 首歌，{sum(len(index) for index in indexes.values())} 条平台记录，"
+          f"写法差异: {', '.join(f'{kind} {count}' for kind, count in kinds.items())}")
+    print(f"{'方式':>10} {'分组数':>8} {'准确率':>8} {'召回率':>8} {'耗时(ms)':>10} {'记录/秒':>10}")
+    records = sum(len(index) for index in indexes.values())
+    for mode in MODES:
+        start = time.perf_counter()
+        matcher = match_groups(indexes, mode, args.threshold)
+        elapsed = time.perf_counter() - start
+        found = pairs(matcher.groups)
+        correct = len(found & expected)
+        precision = correct / len(found) if found else 1.0
+        print(f"{mode:>10} {len(matcher.groups):>8} {precision:>8.2%} {correct / len(expected):>8.2%} "
+              f"{elapsed * 1000:>10.0f} {records / elapsed:>10.0f}")
+    print(f"（正确分组数 {args.songs}）")
+
+def scaling(args):
+    print(f"{'歌曲数':>8} {'分块模糊(ms)':>12} {'逐对比较次数':>12} {'逐对(ms)':>10}")
+    for size in args.sizes:
+        indexes = load_indexes(make_catalogs(size))
+        start = time.perf_counter()
+        match_groups(indexes, 'fuzzy', args.threshold)
+        blocked = time.perf_counter() - start
+        if size <= args.max_pairs_size:
+            start = time.perf_counter()
+            comparisons = all_pairs_fuzzy(indexes, args.threshold)
+            brute = f"{(time.perf_counter() - start) * 1000:>10.0f}"
+        else:
+            total = [len(indexes[platform]) for platform in PLATFORMS]
+            comparisons = total[0] * total[1] + (total[0] + total[1]) * total[2]
+            brute = f"{'-':>10}"
+        print(f"{size:>8} {blocked * 1000:>12.0f} {comparisons:>12} {brute}")
+
+def real(args):
+    from testjson import load_platform_songs
+    indexes = {platform: build_title_index(load_platform_songs(platform)) for platform in PLATFORMS}
+    print(', '.join(f"{platform} {len(index)} 首" for platform, index in indexes.items()))
+    for mode in MODES:
+        start = time.perf_counter()
+        matcher = match_groups(indexes, mode, args.threshold)
+        elapsed = time.perf_counter() - start
+        print(f"{mode:>10}: {len(matcher.groups)} 组，{elapsed * 1000:.0f}ms，" +
+              '，'.join(f"{name} {count}" for name, count in matcher.counts.items()))
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='matching.py 基准测试')
+    parser.add_argument('--songs', type=int, default=20000, help='合成曲库的歌曲数')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 10000, 20000, 40000], help='扩展性测试的歌曲数')
+    parser.add_argument('--max-pairs-size', type=int, default=5000, help='逐对比较只在不超过该歌曲数时实际运行')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='模糊匹配的相似度阈值')
+    parser.add_argument('--real', action='store_true', help='读取当前目录下的真实曲库')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    if args.real:
+        real(args)
+    else:
+        quality(args)
+        scaling(args)
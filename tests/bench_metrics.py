@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# metrics.py 的开销测试，以及import_data.py逐首输出日志与按进度抽样输出的对比
+# 用法: python3 bench_metrics.py [--calls 200000] [--songs 3000]
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import pyotp
+
+import import_data
+import metrics
+from bench_import import import_args, make_entries
+from standin import StandinServer, api_handler
+
+def per_call(func, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+def bench_overhead(args):
+    registry = metrics.Metrics()
+
+    def timed_stage():
+        with registry.stage('bench', items=1):
+            pass
+
+    cases = [
+        ('空函数', lambda: None),
+        ('stage()', timed_stage),
+        ('add()', lambda: registry.add('bench', 0.001, 1, 100)),
+        ('count()', lambda: registry.count('bench')),
+        ('observe()', lambda: registry.observe('bench', 0.012)),
+    ]
+    print(f"{'操作':>10} {'每次(us)':>10}")
+    for label, func in cases:
+        print(f"{label:>10} {per_call(func, args.calls):>10.2f}")
+
+def bench_logging(args):
+    entries = make_entries(args.songs)
+    print(f"{'日志':>8} {'日志行数':>8} {'耗时(s)':>8}")
+    for label, level in (('逐首', logging.DEBUG), ('抽样', logging.INFO)):
+        with tempfile.TemporaryDirectory(prefix='bench_metrics_') as workdir:
+            path = os.path.join(workdir, 'import.log')
+            handler = logging.FileHandler(path, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+            root = logging.getLogger()
+            saved = root.handlers[:]
+            root.handlers = [handler]
+            root.setLevel(level)
+            try:
+                api = api_handler()
+                with StandinServer(api) as server:
+                    start = time.perf_counter()
+                    import_data.import_to_api(entries, import_args(workers=1, batch_size=args.batch_size),
+                                              base_url=server.base_url)
+                    elapsed = time.perf_counter() - start
+            finally:
+                root.handlers = saved
+                handler.close()
+            with open(path, encoding='utf-8') as f:
+                lines = sum(1 for _ in f)
+        print(f"{label:>8} {lines:>8} {elapsed:>8.2f}")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='metrics.py 开销测试')
+    parser.add_argument('--calls', type=int, default=200000, help='每种操作的调用次数')
+    parser.add_argument('--songs', type=int, default=3000, help='导入的歌曲数')
+    parser.add_argument('--batch-size', type=int, default=50, help='导入的批量大小')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    # 替身API不校验令牌，使用随机TOTP密钥
+    import_data.TOTP_KEY = pyotp.random_base32()
+    bench_overhead(args)
+    bench_logging(args)
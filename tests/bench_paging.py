@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# 歌曲列表分页的基准测试：页码（OFFSET）与游标（add_time, id）分页的每页耗时和完整导出
+# 用法: python3 bench_paging.py sqlite [--rows 1000000] [--pages 1 10 100 1000 10000 50000] [--export-rows 20000]
+#       python3 bench_paging.py client [--songs 5000]
+
+import argparse
+import filecmp
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from songs_client import SongsClient, export_library
+from sqlite_mirror import PAGE_SIZE, create_schema, explain, insert_rows, list_sql
+from standin import StandinServer, api_handler
+
+# 合成歌曲行，add_time有重复，验证游标在相同时间下按id区分
+def make_rows(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield (f"曲目 {i}", None, None, None, f"アーティスト {i % 997}", None,
+               rng.randint(1, 8), 1_600_000_000 + rng.randrange(count // 4 + 1), None, None, None)
+
+def build(path: str, rows: int):
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA journal_mode = OFF")
+    con.execute("PRAGMA synchronous = OFF")
+    create_schema(con, mirror=False)
+    insert_rows(con, make_rows(rows))
+    con.execute("ANALYZE")
+    return con
+
+def fetch(con, page: int = 1, cursor=None):
+    sql, params = list_sql(page, cursor)
+    return con.execute(sql, params).fetchall()
+
+def timed_fetch(con, repeat: int, page: int = 1, cursor=None):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows = fetch(con, page, cursor)
+    return (time.perf_counter() - start) / repeat, rows
+
+# 第page页对应的游标：上一页最后一首的 (add_time, id)
+def cursor_before(con, page: int):
+    if page == 1:
+        return None
+    row = fetch(con, page - 1)[-1]
+    return {'afterTime': row[8], 'afterId': row[0]}
+
+# 逐页读取整个表，返回 (耗时, 行数)
+def walk(con, keyset: bool):
+    start = time.perf_counter()
+    page, cursor, count = 1, None, 0
+    while True:
+        rows = fetch(con, page, cursor) if keyset else fetch(con, page)
+        count += len(rows)
+        if len(rows) < PAGE_SIZE:
+            return time.perf_counter() - start, count
+        page += 1
+        cursor = {'afterTime': rows[-1][8], 'afterId': rows[-1][0]}
+
+def bench_sqlite(args):
+    with tempfile.TemporaryDirectory(prefix='bench_paging_') as workdir:
+        con = build(os.path.join(workdir, 'songs.db'), args.rows)
+        print(f"{args.rows} 行（DATABASE.sql 建表，每页 {PAGE_SIZE} 首）")
+        print(f"{'页码':>8} {'OFFSET(ms)':>11} {'游标(ms)':>10} {'结果一致':>8}")
+        for page in args.pages:
+            if (page - 1) * PAGE_SIZE >= args.rows:
+                continue
+            cursor = cursor_before(con, page)
+            offset_elapsed, expected = timed_fetch(con, args.repeat, page)
+            keyset_elapsed, rows = timed_fetch(con, args.repeat, page, cursor)
+            print(f"{page:>8} {offset_elapsed * 1000:>11.2f} {keyset_elapsed * 1000:>10.2f} {str(rows == expected):>8}")
+        sql, params = list_sql(2, cursor_before(con, 2))
+        print(f"游标查询计划: {'; '.join(detail for detail in explain(con, sql, params) if 'LEFT-JOIN' not in detail)}")
+        con.close()
+
+        # 完整导出：OFFSET分页的总耗时随行数平方增长，只在较小的表上比较
+        con = build(os.path.join(workdir, 'export.db'), args.export_rows)
+        offset_elapsed, offset_count = walk(con, keyset=False)
+        keyset_elapsed, keyset_count = walk(con, keyset=True)
+        print(f"完整导出 {args.export_rows} 行: OFFSET {offset_elapsed:.2f}s（{offset_count} 行），"
+              f"游标 {keyset_elapsed:.2f}s（{keyset_count} 行）")
+        con.close()
+
+def bench_client(args):
+    rng = random.Random(0)
+    handler = api_handler()
+    with tempfile.TemporaryDirectory(prefix='bench_paging_') as workdir, StandinServer(handler) as server:
+        # 先通过API新建歌曲，add_time有重复
+        client = SongsClient(server.base_url)
+        for i in range(args.songs):
+            client.session.post(f"{server.base_url}/api/Songs", json={
+                'Title': f"曲目 {i}", 'Artist': f"アーティスト {i % 97}", 'CategoryId': 1,
+                'AddTime': 1_600_000_000 + rng.randrange(args.songs // 4 + 1)})
+        print(f"{args.songs} 首，每页 {PAGE_SIZE} 首")
+        outputs = {}
+        for mode in ('offset', 'keyset'):
+            client = SongsClient(server.base_url)
+            outputs[mode] = os.path.join(workdir, f"{mode}.json")
+            start = time.perf_counter()
+            count = export_library(client, outputs[mode], mode)
+            print(f"{mode:>8}: {count} 首，{client.requests} 个请求，耗时 {time.perf_counter() - start:.2f}s")
+        print(f"导出结果一致: {filecmp.cmp(outputs['offset'], outputs['keyset'], shallow=False)}")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='歌曲列表分页基准测试')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sqlite = sub.add_parser('sqlite', help='在DATABASE.sql建的本地库上比较每页查询耗时')
+    sqlite.add_argument('--rows', type=int, default=1_000_000, help='合成的歌曲行数')
+    sqlite.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100, 1000, 10000, 50000], help='要测试的页码')
+    sqlite.add_argument('--repeat', type=int, default=5, help='每页的重复次数')
+    sqlite.add_argument('--export-rows', type=int, default=20000, help='完整导出比较的行数')
+    sqlite.set_defaults(func=bench_sqlite)
+
+    client = sub.add_parser('client', help='通过替身API用两种分页方式导出，比较结果')
+    client.add_argument('--songs', type=int, default=5000, help='替身API中的歌曲数')
+    client.set_defaults(func=bench_client)
+
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    args.func(args)
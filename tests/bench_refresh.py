@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# 曲库刷新阶段的基准测试：用三个本地替身服务器模拟SEGA官网，比较顺序下载解析与并发刷新
+# 用法: python3 bench_refresh.py [--size 3000] [--latency 0.4 0.6 0.3]
+
+import argparse
+import filecmp
+import json
+import os
+import tempfile
+import time
+
+import requests
+
+import serializer
+from bench_testjson import make_full_catalog
+from refresh import CATALOG_FILES, catalogs_changed, fetch_catalogs
+from standin import StandinServer, file_handler
+from testjson import PLATFORMS, generate_arcade_songs
+
+def write_output(path: str, processes: int):
+    songs = generate_arcade_songs(processes=processes)
+    with open(path, 'w', encoding='utf-8') as f:
+        serializer.dump(songs, f)
+
+# 旧版流程：依次下载三个曲库（refresh.sh），再依次解析并合并
+def legacy_refresh(urls, output: str):
+    start = time.perf_counter()
+    for platform in PLATFORMS:
+        response = requests.get(urls[platform], timeout=30)
+        response.raise_for_status()
+        with open(CATALOG_FILES[platform], 'wb') as f:
+            f.write(response.content)
+    fetched = time.perf_counter()
+    write_output(output, processes=1)
+    return fetched - start, time.perf_counter() - fetched
+
+# 新流程：并发条件请求，只有曲库变化时才在多个进程中解析并合并
+def refresh_stage(urls, output: str):
+    start = time.perf_counter()
+    results = fetch_catalogs(urls=urls)
+    fetched = time.perf_counter()
+    merged = catalogs_changed(results) or not os.path.exists(output)
+    if merged:
+        write_output(output, processes=len(PLATFORMS))
+    statuses = ','.join(status for status, _ in results.values())
+    return fetched - start, time.perf_counter() - fetched, statuses, merged
+
+def main(args):
+    catalogs = {platform: json.dumps(make_full_catalog(args.size, platform), ensure_ascii=False).encode('utf-8')
+                for platform in PLATFORMS}
+    files = {platform: {os.path.basename(CATALOG_FILES[platform]): body} for platform, body in catalogs.items()}
+    handlers = {platform: file_handler(files[platform], latency, content_type='application/json')
+                for platform, latency in zip(PLATFORMS, args.latency)}
+    servers = {platform: StandinServer(handler) for platform, handler in handlers.items()}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench_refresh_') as workdir:
+        try:
+            for server in servers.values():
+                server.__enter__()
+            urls = {platform: f"{server.base_url}/{CATALOG_FILES[platform]}" for platform, server in servers.items()}
+            os.chdir(workdir)
+            size = sum(len(body) for body in catalogs.values())
+            print(f"三个曲库共 {size / 1024 / 1024:.1f} MB，模拟延迟 {', '.join(f'{p} {l}s' for p, l in zip(PLATFORMS, args.latency))}")
+            print(f"{'场景':>12} {'下载(s)':>8} {'解析合并(s)':>11} {'总计(s)':>8}  结果")
+
+            fetch, merge = legacy_refresh(urls, 'legacy_output.json')
+            print(f"{'旧版顺序':>12} {fetch:>8.2f} {merge:>11.2f} {fetch + merge:>8.2f}")
+
+            def run(label):
+                fetch, merge, statuses, merged = refresh_stage(urls, 'arcade_songs_output.json')
+                print(f"{label:>12} {fetch:>8.2f} {merge:>11.2f} {fetch + merge:>8.2f}  {statuses}{'' if merged else '，跳过合并'}")
+
+            run('首次刷新')
+            print(f"输出与旧版一致: {filecmp.cmp('legacy_output.json', 'arcade_songs_output.json', shallow=False)}")
+            run('均未变化')
+
+            # maimai曲库更新
+            updated = json.loads(catalogs['maimai'])
+            updated[0]['title'] += ' (updated)'
+            files['maimai'][CATALOG_FILES['maimai']] = json.dumps(updated, ensure_ascii=False).encode('utf-8')
+            run('一个变化')
+            run('均未变化')
+        finally:
+            os.chdir(cwd)
+            for server in servers.values():
+                server.__exit__(None, None, None)
+    requests_total = sum(handler.stats['requests'] for handler in handlers.values())
+    not_modified = sum(handler.stats['not_modified'] for handler in handlers.values())
+    print(f"替身服务器共 {requests_total} 个请求，其中 {not_modified} 个返回304")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='曲库刷新基准测试')
+    parser.add_argument('--size', type=int, default=3000, help='每个平台的合成曲目数')
+    parser.add_argument('--latency', type=float, nargs=3, default=[0.4, 0.6, 0.3],
+                        help='chunithm、maimai、ongeki替身服务器的模拟延迟（秒）')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    main(parse_arguments())
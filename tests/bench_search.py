@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# search.py 搜索索引的基准测试：与逐条子串扫描（相当于 LIKE '%q%'）比较查询耗时
+# 用法: python3 bench_search.py [--groups 100000] [--repeat 20]
+
+import argparse
+import random
+import time
+
+from search import GAMES, SearchIndex, normalize
+
+KATAKANA = 'アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワンガギグゲゴザジズゼゾダデドバビブベボパピプペポー'
+KANJI = '夜空星月花風雨雪光影心夢恋愛歌音色海川山森桜春夏秋冬白黒赤青天地神魔竜刀剣火水雷氷鏡城街駅道時'
+LATIN = 'abcdefghijklmnopqrstuvwxyz'
+ROMAJI = {kana: roma for kana, roma in zip('アイウエオカキクケコサシスセソタチツテトナニヌネノ', [
+    'a', 'i', 'u', 'e', 'o', 'ka', 'ki', 'ku', 'ke', 'ko', 'sa', 'shi', 'su', 'se', 'so',
+    'ta', 'chi', 'tsu', 'te', 'to', 'na', 'ni', 'nu', 'ne', 'no'])}
+
+# 由片假名、汉字和英文单词组成的合成曲库，字符分布接近真实曲名
+def make_word(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.4:
+        return ''.join(rng.choice(KATAKANA) for _ in range(rng.randint(2, 6)))
+    if kind < 0.7:
+        return ''.join(rng.choice(KANJI) for _ in range(rng.randint(1, 3)))
+    return ''.join(rng.choice(LATIN) for _ in range(rng.randint(3, 8))).capitalize()
+
+def make_groups(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    artists = [' '.join(make_word(rng) for _ in range(rng.randint(1, 2))) for _ in range(count // 20 + 1)]
+    groups = []
+    for i in range(count):
+        title = ' '.join(make_word(rng) for _ in range(rng.randint(1, 3)))
+        reading = ''.join(ch for ch in title if ch in KATAKANA)
+        romaji = ''.join(ROMAJI.get(ch, ch) for ch in reading) or None
+        artist = rng.choice(artists)
+        group = {'title': title}
+        for game in GAMES:
+            if rng.random() < 0.5 or (game == 'ongeki' and not any(group.get(g) for g in GAMES)):
+                group[game] = {'title': title, 'artist': artist, 'reading': reading or None, 'title_romaji': romaji}
+            else:
+                group[game] = None
+        groups.append(group)
+    return groups
+
+def pick_queries(groups, seed: int = 1):
+    rng = random.Random(seed)
+    sample = rng.choice(groups)
+    song = next(sample[game] for game in GAMES if sample[game])
+    return [
+        ('完整标题', sample['title']),
+        ('标题前缀', sample['title'][:3]),
+        ('艺术家', song['artist']),
+        ('罗马字', 'kato'),
+        ('全角', 'ＴＯＫＩ'),
+        ('单字', '夜'),
+        ('常见字', 'a'),
+        ('稀有', 'zzzz'),
+    ]
+
+# 逐条子串扫描，文本已预先规范化
+def scan(texts, query: str):
+    query = normalize(query)
+    return [position for position, text in enumerate(texts) if query in text]
+
+def timed(func, *args, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return (time.perf_counter() - start) / repeat, result
+
+def main(args):
+    groups = make_groups(args.groups)
+    start = time.perf_counter()
+    index = SearchIndex(groups)
+    built = time.perf_counter() - start
+    entries = sum(len(posting) for posting in index.postings.values())
+    print(f"{len(groups)} 组歌曲，{len(index.postings)} 个索引键，{entries} 条倒排记录"
+          f"（{entries * 4 / 1024 / 1024:.0f} MB），建索引 {built:.2f}s")
+
+    print(f"{'查询':>8} {'结果数':>8} {'索引(ms)':>10} {'扫描(ms)':>10} {'加速':>8}")
+    for label, query in pick_queries(groups):
+        indexed, results = timed(index.search, query, repeat=args.repeat)
+        scanned, expected = timed(scan, index.texts, query, repeat=args.repeat)
+        # 索引结果按相关度排序，与扫描结果的集合应一致
+        assert sorted(results) == expected, query
+        print(f"{label:>8} {len(results):>8} {indexed * 1000:>10.2f} {scanned * 1000:>10.2f} {scanned / indexed:>7.0f}x")
+    print("结果与逐条扫描一致")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='search.py 基准测试')
+    parser.add_argument('--groups', type=int, default=100000, help='合成曲库的分组数')
+    parser.add_argument('--repeat', type=int, default=20, help='每个查询的重复次数')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    main(parse_arguments())
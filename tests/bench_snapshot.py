@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# snapshot.py 的基准测试：在不同规模的合成曲库上比较查看器冷启动（新进程中加载数据并取出第一页）的耗时和内存，
+# 以及第一次筛选（需要遍历全部分组）的耗时；并检查各种筛选条件作为第一次查询时两种格式的结果一致
+# 用法: python3 bench_snapshot.py [--sizes 5000 20000 50000]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import serializer
+from bench_testjson import make_full_catalog
+from jsondata import ChunithmSong, MaimaiSong, OngekiSong
+from snapshot import Snapshot, write_snapshot
+from testjson import create_song_objects, merge_arcade_songs
+from viewdata import SongIndex
+
+# 在子进程中运行：加载数据、取出第一页，再做一次按游戏筛选，输出各步耗时和峰值RSS
+COLD_START = """
+import json, resource, sys, time
+start = time.perf_counter()
+from snapshot import Snapshot
+from viewdata import PAGE_SIZE, SongIndex
+imported = time.perf_counter()
+mode, path = sys.argv[1], sys.argv[2]
+if mode == 'snapshot':
+    groups = Snapshot(path)
+else:
+    with open(path, 'r', encoding='utf-8') as f:
+        groups = json.load(f)
+index = SongIndex(groups)
+page = [index.groups[position] for position in index.query()[:PAGE_SIZE]]
+ready = time.perf_counter()
+index.query(['maimai'])
+filtered = time.perf_counter()
+print(json.dumps({'load': ready - imported, 'filter': filtered - ready,
+                  'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+def make_groups(size: int):
+    songs = merge_arcade_songs(*(
+        create_song_objects(make_full_catalog(size, game), song_class)
+        for game, song_class in (('chunithm', ChunithmSong), ('maimai', MaimaiSong), ('ongeki', OngekiSong))
+    ))
+    return serializer.to_dict(songs)
+
+# 每种筛选条件都在新建的索引上作为第一次查询执行（索引尚未构建），比较JSON与快照的结果
+def check_first_queries(groups, snapshot_path: str):
+    artist = next(group[game]['artist'] for group in groups for game in ('chunithm', 'maimai', 'ongeki')
+                  if group.get(game) and group[game].get('artist'))
+    title = (groups[0].get('title') or '')[:2]
+    cases = [{'artist': artist}, {'artist': artist, 'games': ['chunithm']}, {'title': title},
+             {'title': title, 'artist': artist}, {'games': ['maimai']}]
+    with Snapshot(snapshot_path) as snapshot:
+        for case in cases:
+            expected = list(SongIndex(groups).query(**case))
+            assert list(SongIndex(snapshot).query(**case)) == expected, case
+    return len(cases)
+
+def cold_start(mode: str, path: str) -> dict:
+    tests_dir = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.check_output([sys.executable, '-c', COLD_START, mode, path], cwd=tests_dir)
+    return json.loads(output)
+
+def main(args):
+    print(f"{'每平台曲目':>10} {'格式':>9} {'大小(MB)':>9} {'启动(ms)':>9} {'首次筛选(ms)':>12} {'峰值RSS(MB)':>11}")
+    with tempfile.TemporaryDirectory(prefix='bench_snapshot_') as workdir:
+        for size in args.sizes:
+            groups = make_groups(size)
+            json_path = os.path.join(workdir, 'arcade_songs_output.json')
+            snapshot_path = os.path.join(workdir, 'arcade_songs_output.snap')
+            with open(json_path, 'w', encoding='utf-8') as f:
+                serializer.dump(groups, f)
+            start = time.perf_counter()
+            write_snapshot(groups, snapshot_path)
+            written = time.perf_counter() - start
+            with Snapshot(snapshot_path) as snapshot:
+                assert snapshot[len(groups) - 1] == groups[-1]
+            checked = check_first_queries(groups, snapshot_path)
+            for mode, path in (('json', json_path), ('snapshot', snapshot_path)):
+                results = [cold_start(mode, path) for _ in range(args.repeat)]
+                best = min(results, key=lambda result: result['load'])
+                print(f"{size:>10} {mode:>9} {os.path.getsize(path) / 1024 / 1024:>9.1f} {best['load'] * 1000:>9.1f} "
+                      f"{best['filter'] * 1000:>12.0f} {best['rss'] / 1024:>11.1f}")
+            print(f"{'':>10} 写出快照 {written * 1000:.0f}ms，{len(groups)} 组，{checked} 种首次筛选结果一致")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='snapshot.py 基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 20000, 50000], help='每个平台的合成曲目数')
+    parser.add_argument('--repeat', type=int, default=3, help='每种格式启动的次数（取最快一次）')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    main(parse_arguments())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# sqlite_mirror.py 查询基准测试：在合成的Song表上比较SearchSongs的LIKE查询、FTS5和索引后的查询计划
+# 用法: python3 bench_sqlite.py [--rows 1000000] [--repeat 5] [--keep DIR]
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from bench_search import KATAKANA, ROMAJI, make_word
+from sqlite_mirror import create_schema, explain, insert_rows, search_sql
+
+HIRAGANA = {kana: chr(ord(kana) - 0x60) for kana in KATAKANA if 'ァ' <= kana <= 'ン'}
+
+# 合成歌曲行，add_time互不相同，保证按时间排序的结果唯一
+def make_rows(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    artists = [' '.join(make_word(rng) for _ in range(rng.randint(1, 2))) for _ in range(count // 20 + 1)]
+    times = list(range(1_600_000_000, 1_600_000_000 + count))
+    rng.shuffle(times)
+    for add_time in times:
+        title = ' '.join(make_word(rng) for _ in range(rng.randint(1, 3)))
+        # 约一成曲目带有常见的后缀，用于测试命中较多的查询
+        if rng.random() < 0.1:
+            title += ' -Remix-'
+        katakana = ''.join(ch for ch in title if ch in KATAKANA) or None
+        hiragana = ''.join(HIRAGANA.get(ch, ch) for ch in katakana) if katakana else None
+        romaji = ''.join(ROMAJI.get(ch, ch) for ch in katakana) if katakana else None
+        yield (title, hiragana, katakana, romaji, rng.choice(artists), None,
+               rng.randint(1, 8), add_time, rng.randint(1, 4), None, None)
+
+def build(path: str, rows: int, mirror: bool):
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA journal_mode = OFF")
+    con.execute("PRAGMA synchronous = OFF")
+    create_schema(con, mirror=mirror)
+    start = time.perf_counter()
+    insert_rows(con, make_rows(rows))
+    elapsed = time.perf_counter() - start
+    con.execute("ANALYZE")
+    return con, elapsed
+
+# 查询名称 -> SearchSongs参数
+CASES = [
+    ('最新一页', dict()),
+    ('分类一页', dict(category=5)),
+    ('分类第500页', dict(category=5, page=500)),
+    ('全部-常见', dict(query='remix', search_type='all')),
+    ('全部-稀有', dict(query='zqxv', search_type='all')),
+    ('标题+分类', dict(query='ka', search_type='title', category=3)),
+    ('标题-假名', dict(query='カキク', search_type='title')),
+    ('艺术家', dict(query='Kat', search_type='artist', category=7)),
+]
+
+def run(con, repeat: int, **kwargs):
+    sql, params = search_sql(**kwargs)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows = con.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / repeat, [row[0] for row in rows], explain(con, sql, params)
+
+def main(args):
+    workdir = args.keep or tempfile.mkdtemp(prefix='bench_sqlite_')
+    plain_path = os.path.join(workdir, 'plain.db')
+    mirror_path = os.path.join(workdir, 'mirror.db')
+    for path in (plain_path, mirror_path):
+        if os.path.exists(path):
+            os.remove(path)
+    plain, plain_time = build(plain_path, args.rows, mirror=False)
+    mirror, mirror_time = build(mirror_path, args.rows, mirror=True)
+    print(f"{args.rows} 行：原表导入 {plain_time:.1f}s，{os.path.getsize(plain_path) / 1024 / 1024:.0f} MB；"
+          f"镜像导入 {mirror_time:.1f}s，{os.path.getsize(mirror_path) / 1024 / 1024:.0f} MB")
+
+    print(f"{'查询':>10} {'原表LIKE(ms)':>13} {'镜像LIKE(ms)':>13} {'镜像FTS(ms)':>12} {'结果一致':>8}  镜像FTS查询计划")
+    for label, kwargs in CASES:
+        plain_elapsed, expected, _ = run(plain, args.repeat, use_fts=False, **kwargs)
+        like_elapsed, like_ids, _ = run(mirror, args.repeat, use_fts=False, **kwargs)
+        fts_elapsed, fts_ids, plan = run(mirror, args.repeat, use_fts=True, **kwargs)
+        same = expected == like_ids == fts_ids
+        print(f"{label:>10} {plain_elapsed * 1000:>13.2f} {like_elapsed * 1000:>13.2f} {fts_elapsed * 1000:>12.2f} "
+              f"{str(same):>8}  {'; '.join(detail for detail in plan if 'LEFT-JOIN' not in detail)}")
+
+    plain.close()
+    mirror.close()
+    if not args.keep:
+        os.remove(plain_path)
+        os.remove(mirror_path)
+        os.rmdir(workdir)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='SQLite镜像查询基准测试')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='合成的歌曲行数')
+    parser.add_argument('--repeat', type=int, default=5, help='每个查询的重复次数')
+    parser.add_argument('--keep', default=None, help='保留数据库的目录，不指定时使用临时目录并在结束后删除')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    main(parse_arguments())
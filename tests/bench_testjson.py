@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# testjson.py 各处理阶段的基准测试
+# 用法: python3 bench_testjson.py join [--sizes 1000 10000 100000] [--legacy]
+#       python3 bench_testjson.py stream [--size 50000] [--images] [--image-size 2048]
+#       python3 bench_testjson.py memory [--size 20000]
+#       python3 bench_testjson.py serialize [--size 20000]
+
+import argparse
+import filecmp
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import field, fields, make_dataclass
+from typing import Dict, List
+
+import serializer
+from downloader import MANIFEST_NAME
+from jsondata import ChunithmSong, MaimaiSong, OngekiSong, ArcadeSong
+from standin import StandinServer, image_handler
+from testjson import create_song_objects, find_song_by_title, merge_arcade_songs
+
+# 合成曲库 - 各平台之间约有一半曲目同名
+def make_catalog(size: int, game: str, seed: int = 0) -> List[Dict]:
+    rng = random.Random(f"{game}-{seed}")
+    catalog = []
+    for i in range(size):
+        # 一半的标题三个平台共用，其余为平台独占
+        title = f"曲目 {i}" if rng.random() < 0.5 else f"{game} 曲目 {i}"
+        catalog.append({
+            'id': str(i),
+            'title': title,
+            'artist': f"アーティスト {rng.randrange(size // 10 + 1)}",
+            'image_url': f"{game}_{i:06d}.png",
+        })
+    return catalog
+
+# 带有各平台常见字段的合成曲库，体积接近真实数据
+def make_full_catalog(size: int, game: str) -> List[Dict]:
+    rng = random.Random(game)
+    levels = ['5', '7', '9', '11', '12', '12+', '13', '13+', '14', '14+']
+    difficulties = ('bas', 'adv', 'exc', 'mas') if game == 'ongeki' else ('bas', 'adv', 'exp', 'mas')
+    catalog = make_catalog(size, game)
+    for item in catalog:
+        item['title_kana'] = item['title'].upper()
+        item.update({f"lev_{name}": rng.choice(levels) for name in difficulties})
+        if game == 'chunithm':
+            item.update(catname='ORIGINAL', newflag='0', reading=item['title'].upper(), image=item.pop('image_url'))
+        elif game == 'maimai':
+            item.update(catcode='maimai', version='240000', release='240000', sort='0', comment='')
+        else:
+            item.update(chapter='第1章', character='星咲 あかり', category='オンゲキ', copyright1='-')
+    return catalog
+
+def make_songs(size: int):
+    return (
+        create_song_objects(make_catalog(size, 'chunithm'), ChunithmSong),
+        create_song_objects(make_catalog(size, 'maimai'), MaimaiSong),
+        create_song_objects(make_catalog(size, 'ongeki'), OngekiSong),
+    )
+
+# 旧版合并方式：对每个标题线性扫描三个列表
+def legacy_merge(chunithm_songs, maimai_songs, ongeki_songs) -> List[ArcadeSong]:
+    all_titles = set()
+    all_titles.update(song.title for song in chunithm_songs)
+    all_titles.update(song.title for song in maimai_songs)
+    all_titles.update(song.title for song in ongeki_songs)
+    return [
+        ArcadeSong(
+            title=title,
+            chunithm=find_song_by_title(chunithm_songs, title),
+            maimai=find_song_by_title(maimai_songs, title),
+            ongeki=find_song_by_title(ongeki_songs, title)
+        )
+        for title in all_titles
+    ]
+
+def timed(func, *args, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_join(args):
+    print(f"{'每平台曲数':>10} {'合并方式':>8} {'耗时(ms)':>10} {'每曲(ns)':>10}")
+    for size in args.sizes:
+        songs = make_songs(size)
+        elapsed = timed(merge_arcade_songs, *songs)
+        print(f"{size:>10} {'index':>8} {elapsed * 1000:>10.2f} {elapsed / (size * 3) * 1e9:>10.0f}")
+        # 旧版为平方复杂度，只在小规模下对比
+        if args.legacy and size <= args.legacy_limit:
+            elapsed = timed(legacy_merge, *songs, repeat=1)
+            print(f"{size:>10} {'legacy':>8} {elapsed * 1000:>10.2f} {elapsed / (size * 3) * 1e9:>10.0f}")
+
+# 在子进程中运行testjson.py：把各平台的图片地址指向本地替身服务器，再以__main__运行
+WITH_IMAGES = """
+import os, runpy, sys
+script, base_url = sys.argv[1], sys.argv[2]
+sys.path.insert(0, os.path.dirname(script))
+import downloader
+downloader.IMAGE_BASE_URLS.update({platform: f"{base_url}/{platform}/" for platform in downloader.IMAGE_BASE_URLS})
+sys.argv = [script] + sys.argv[3:]
+runpy.run_path(script, run_name='__main__')
+"""
+
+# 在子进程中运行testjson.py并返回峰值RSS（KB）和耗时；不指定base_url时不同步图片
+def run_testjson(workdir: str, *flags: str, base_url: str = None):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testjson.py')
+    if base_url is None:
+        command = [sys.executable, script, '--no-images', *flags]
+    else:
+        command = [sys.executable, '-c', WITH_IMAGES, script, base_url, *flags]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    if status != 0:
+        raise RuntimeError(f"testjson.py {' '.join(flags)} 运行失败: {status}")
+    return usage.ru_maxrss, elapsed
+
+def count_images(root: str) -> int:
+    return sum(len(files) for _, _, files in os.walk(root)) - os.path.exists(os.path.join(root, MANIFEST_NAME))
+
+def bench_stream(args):
+    with tempfile.TemporaryDirectory(prefix='bench_stream_') as workdir:
+        names = []
+        for game in ('chunithm', 'maimai', 'ongeki'):
+            catalog = make_full_catalog(args.size, game)
+            names.extend(item.get('image_url') or item.get('image') for item in catalog)
+            with open(os.path.join(workdir, f"{game}_songs.json"), 'w', encoding='utf-8') as f:
+                json.dump(catalog, f, ensure_ascii=False)
+        catalog_bytes = sum(os.path.getsize(os.path.join(workdir, f"{game}_songs.json"))
+                            for game in ('chunithm', 'maimai', 'ongeki'))
+        output = os.path.join(workdir, 'arcade_songs_output.json')
+        image_root = os.path.join(workdir, 'images')
+
+        print(f"曲库大小: {catalog_bytes / 1024 / 1024:.1f} MB（每个平台 {args.size} 首）")
+        print(f"{'模式':>8} {'图片':>6} {'峰值RSS(MB)':>12} {'耗时(s)':>8}")
+        results = {}
+        # 所有图片共用同一份内容，替身服务器的内存不随图片数增长
+        body = os.urandom(args.image_size)
+        with StandinServer(image_handler(dict.fromkeys(names, body))) as server:
+            for mode, flags in (('default', ()), ('stream', ('--stream',))):
+                rss, elapsed = run_testjson(workdir, *flags)
+                results[mode] = output + '.' + mode
+                os.replace(output, results[mode])
+                print(f"{mode:>8} {'-':>6} {rss / 1024:>12.1f} {elapsed:>8.2f}")
+                if args.images:
+                    # 默认路径：同步全部图片，每次从空目录开始
+                    rss, elapsed = run_testjson(workdir, *flags, base_url=server.base_url)
+                    downloaded = count_images(image_root)
+                    shutil.rmtree(image_root)
+                    os.remove(output)
+                    print(f"{mode:>8} {downloaded:>6} {rss / 1024:>12.1f} {elapsed:>8.2f}")
+        same = filecmp.cmp(results['default'], results['stream'], shallow=False)
+        print(f"输出一致: {same}")
+
+# 不带__slots__的同名数据类，相当于改造前的歌曲类
+def unslotted(cls):
+    return make_dataclass(cls.__name__, [(f.name, f.type, field(default=f.default)) for f in fields(cls)])
+
+# 解析JSON并创建歌曲对象，返回丢弃原始数据后每条记录占用的字节数
+def record_size(text: str, song_class, intern_strings: bool) -> float:
+    tracemalloc.start()
+    items = json.loads(text)
+    songs = create_song_objects(items, song_class, intern_strings)
+    del items
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / len(songs)
+
+def bench_memory(args):
+    print(f"{'平台':>8} {'dataclass':>10} {'slots':>10} {'slots+intern':>13}  (字节/首)")
+    for game, song_class in (('chunithm', ChunithmSong), ('maimai', MaimaiSong), ('ongeki', OngekiSong)):
+        text = json.dumps(make_full_catalog(args.size, game), ensure_ascii=False)
+        before = record_size(text, unslotted(song_class), False)
+        slotted = record_size(text, song_class, False)
+        interned = record_size(text, song_class, True)
+        print(f"{game:>8} {before:>10.0f} {slotted:>10.0f} {interned:>13.0f}")
+
+# 旧版递归转换：逐字段getattr
+def legacy_to_dict(obj):
+    if hasattr(obj, '__dataclass_fields__'):
+        return {field: legacy_to_dict(getattr(obj, field)) for field in obj.__dataclass_fields__}
+    elif isinstance(obj, list):
+        return [legacy_to_dict(item) for item in obj]
+    return obj
+
+def bench_serialize(args):
+    songs = merge_arcade_songs(*(
+        create_song_objects(make_full_catalog(args.size, game), song_class)
+        for game, song_class in (('chunithm', ChunithmSong), ('maimai', MaimaiSong), ('ongeki', OngekiSong))
+    ))
+    expected = json.dumps(legacy_to_dict(songs), ensure_ascii=False, indent=2)
+
+    cases = [
+        ('legacy to_dict', lambda: legacy_to_dict(songs)),
+        ('compiled to_dict', lambda: serializer.to_dict(songs)),
+        ('json.dumps', lambda: serializer.dumps(songs)),
+    ]
+    if serializer.orjson is not None:
+        cases.append(('orjson.dumps', lambda: serializer.dumps(songs, fast=True)))
+    else:
+        print("未安装orjson，跳过orjson测试")
+
+    print(f"{len(songs)} 组歌曲")
+    print(f"{'方式':>18} {'耗时(ms)':>10} {'每组(us)':>10}")
+    for label, func in cases:
+        elapsed = timed(func)
+        print(f"{label:>18} {elapsed * 1000:>10.1f} {elapsed / len(songs) * 1e6:>10.2f}")
+    same = serializer.dumps(songs) == expected and (
+        serializer.orjson is None or serializer.dumps(songs, fast=True) == expected)
+    print(f"输出一致: {same}")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='testjson.py 基准测试')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    join = sub.add_parser('join', help='按标题合并三个平台曲库')
+    join.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='每个平台的合成曲目数')
+    join.add_argument('--legacy', action='store_true', help='同时测试旧版线性扫描合并')
+    join.add_argument('--legacy-limit', type=int, default=10000, help='旧版合并的最大测试规模')
+    join.set_defaults(func=bench_join)
+
+    stream = sub.add_parser('stream', help='比较完整加载与流式处理的峰值内存')
+    stream.add_argument('--size', type=int, default=50000, help='每个平台的合成曲目数')
+    stream.add_argument('--images', action='store_true', help='同时测试默认的图片同步路径（从本地替身服务器下载每首曲目的封面）')
+    stream.add_argument('--image-size', type=int, default=2048, help='每张合成图片的字节数')
+    stream.set_defaults(func=bench_stream)
+
+    memory = sub.add_parser('memory', help='比较歌曲对象每条记录的内存占用')
+    memory.add_argument('--size', type=int, default=20000, help='每个平台的合成曲目数')
+    memory.set_defaults(func=bench_memory)
+
+    serialize = sub.add_parser('serialize', help='比较数据类转换与JSON序列化速度')
+    serialize.add_argument('--size', type=int, default=20000, help='每个平台的合成曲目数')
+    serialize.set_defaults(func=bench_serialize)
+
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    args.func(args)
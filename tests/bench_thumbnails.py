@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# thumbnails.py 的基准测试：在跨平台重复封面的合成图片目录上测量去重节省的空间和耗时，
+# 以及各缩略图格式在不同进程数下的生成速度，并检查每张缩略图的尺寸和模式（未安装Pillow时只测去重）
+# 用法: python3 bench_thumbnails.py [--songs 2000] [--image-size 1024] [--processes 1 2 4]
+#       [--formats webp jpeg] [--modes RGB P RGBA]
+
+import argparse
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from thumbnails import (Image, FORMATS, PLATFORMS, THUMB_DIR, THUMB_SIZE, dedupe, generate_thumbnails, load_index,
+                        save_index)
+
+def make_image(rng: random.Random, size: int, mode: str = 'RGB') -> bytes:
+    """Pillow可用时生成带噪点的PNG（RGB、带透明色的调色板P或带渐变透明度的RGBA），
+    否则生成同等大小的随机字节（只用于去重）"""
+    if Image is None:
+        return rng.randbytes(size * size // 8)
+    image = Image.effect_noise((size, size), rng.randint(16, 96)).convert('RGB')
+    if mode == 'P':
+        image = image.quantize(64)
+        image.info['transparency'] = 0
+    elif mode == 'RGBA':
+        image.putalpha(Image.linear_gradient('L').resize((size, size)))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def make_images(root: str, songs: int, image_size: int, shared: float, modes=('RGB',), seed: int = 0) -> int:
+    """写出各平台的封面，shared比例的封面在各平台使用同一张图，各首依次使用modes中的模式；返回文件数"""
+    rng = random.Random(seed)
+    files = 0
+    for platform in PLATFORMS:
+        os.makedirs(os.path.join(root, platform), exist_ok=True)
+    for sid in range(songs):
+        present = [platform for platform in PLATFORMS if rng.random() < 0.6] or [rng.choice(PLATFORMS)]
+        mode = modes[sid % len(modes)]
+        artwork = make_image(rng, image_size, mode)
+        for platform in present:
+            data = artwork if rng.random() < shared else make_image(rng, image_size, mode)
+            with open(os.path.join(root, platform, f"{sid:05d}.png"), 'wb') as f:
+                f.write(data)
+            files += 1
+    return files
+
+def disk_usage(root: str) -> int:
+    """按inode计算的实际占用字节数，硬链接只计一次"""
+    seen = set()
+    total = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            stat = os.stat(os.path.join(directory, name))
+            if (stat.st_dev, stat.st_ino) not in seen:
+                seen.add((stat.st_dev, stat.st_ino))
+                total += stat.st_size
+    return total
+
+def check_thumbnails(root: str, index, thumb_format: str) -> int:
+    """打开每张缩略图，检查格式和尺寸；源图有透明度时WebP缩略图应保留透明度，返回检查的张数"""
+    suffix, image_format = FORMATS[thumb_format]
+    sources = {entry['sha256']: os.path.join(root, *key.split('/', 1)) for key, entry in index['images'].items()}
+    for sha256, name in index['thumbs'].items():
+        assert name == sha256 + suffix, name
+        with Image.open(os.path.join(root, THUMB_DIR, name)) as thumb, Image.open(sources[sha256]) as source:
+            assert thumb.format == image_format and max(thumb.size) <= THUMB_SIZE, (name, thumb.format, thumb.size)
+            transparent = 'A' in source.mode or 'transparency' in source.info
+            expected = 'RGBA' if transparent and image_format == 'WEBP' else ('L', 'RGB')
+            assert thumb.mode in expected, (name, source.mode, thumb.mode)
+    return len(index['thumbs'])
+
+def main(args):
+    megabytes = 1024 * 1024
+    with tempfile.TemporaryDirectory(prefix='bench_thumbnails_') as root:
+        start = time.perf_counter()
+        files = make_images(root, args.songs, args.image_size, args.shared, args.modes)
+        before = disk_usage(root)
+        print(f"{files} 张图片（{'/'.join(args.modes)}），{before / megabytes:.1f} MB（生成 {time.perf_counter() - start:.1f}s，"
+              f"Pillow: {'有' if Image is not None else '无'}）")
+
+        print(f"{'去重':>10} {'耗时(ms)':>10} {'新链接':>8} {'不同内容':>8} {'占用(MB)':>10}")
+        index = load_index(root)
+        for label in ('首次', '再次'):
+            start = time.perf_counter()
+            stats = dedupe(root, index)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>10} {elapsed * 1000:>10.0f} {stats['linked']:>8} {stats['unique']:>8} "
+                  f"{disk_usage(root) / megabytes:>10.1f}")
+        save_index(root, index)
+        after = disk_usage(root)
+        print(f"节省 {(before - after) / megabytes:.1f} MB（{(before - after) / before:.1%}）")
+
+        if Image is None:
+            print("未安装Pillow，跳过缩略图生成测试")
+            return
+        print(f"{'格式':>6} {'进程数':>8} {'缩略图':>8} {'失败':>6} {'耗时(s)':>9} {'张/秒':>8} {'大小(KB)':>9}")
+        for thumb_format in args.formats:
+            for processes in args.processes:
+                shutil.rmtree(os.path.join(root, THUMB_DIR), ignore_errors=True)
+                result = generate_thumbnails(root, index, thumb_format=thumb_format, processes=processes)
+                rate = result['generated'] / result['seconds'] if result['seconds'] else 0
+                size = disk_usage(os.path.join(root, THUMB_DIR)) / max(1, result['generated']) / 1024
+                print(f"{thumb_format:>6} {processes:>8} {result['generated']:>8} {len(result['failed']):>6} "
+                      f"{result['seconds']:>9.2f} {rate:>8.0f} {size:>9.1f}")
+            checked = check_thumbnails(root, index, thumb_format)
+            result = generate_thumbnails(root, index, thumb_format=thumb_format)
+            print(f"{thumb_format:>6} 检查 {checked} 张缩略图通过；再次运行跳过已有 {result['skipped']} 张，"
+                  f"耗时 {result['seconds'] * 1000:.0f}ms")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='thumbnails.py 基准测试')
+    parser.add_argument('--songs', type=int, default=2000, help='合成的歌曲数')
+    parser.add_argument('--image-size', type=int, default=512, help='合成封面的边长（像素）')
+    parser.add_argument('--shared', type=float, default=0.8, help='其他平台沿用同一封面的比例')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4], help='缩略图生成的进程数')
+    parser.add_argument('--formats', nargs='+', default=list(FORMATS), choices=list(FORMATS), help='要测试的缩略图格式')
+    parser.add_argument('--modes', nargs='+', default=['RGB', 'P', 'RGBA'], choices=['RGB', 'P', 'RGBA'],
+                        help='合成封面的图片模式，各首依次使用')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    main(parse_arguments())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# viewdata.py 首页的负载测试，使用Flask测试客户端，不经过网络
+# 用法: python3 bench_viewdata.py cache [--size 2000] [--requests 50]
+#       python3 bench_viewdata.py page [--size 2000] [--requests 20]
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from flask import render_template
+
+import serializer
+import viewdata
+from bench_testjson import make_full_catalog
+from jsondata import ChunithmSong, MaimaiSong, OngekiSong
+from testjson import create_song_objects, merge_arcade_songs
+
+# 旧版首页：每个请求都重新读取、解析并渲染整个曲库
+def legacy_display_songs():
+    with open(viewdata.JSON_FILE_PATH, 'r', encoding='utf-8') as f:
+        songs_data = json.load(f)
+    return render_template('index.html', groups=songs_data, games=viewdata.GAMES,
+                           filters={'game': [], 'title': '', 'artist': '', 'page_size': len(songs_data)},
+                           query='', page=1, pages=1, total=len(songs_data))
+
+def write_output(path: str, size: int):
+    songs = merge_arcade_songs(*(
+        create_song_objects(make_full_catalog(size, game), song_class)
+        for game, song_class in (('chunithm', ChunithmSong), ('maimai', MaimaiSong), ('ongeki', OngekiSong))
+    ))
+    with open(path, 'w', encoding='utf-8') as f:
+        serializer.dump(songs, f)
+    return len(songs)
+
+def run(client, path: str, count: int, headers=None):
+    start = time.perf_counter()
+    for _ in range(count):
+        response = client.get(path, headers=headers)
+        response.get_data()
+    return response, time.perf_counter() - start
+
+# 首个数据块到达的时间和完整响应的时间，每次请求前清空页面缓存
+def first_byte(client, path: str, count: int):
+    first = total = size = 0
+    for _ in range(count):
+        viewdata.song_cache.pages.clear()
+        start = time.perf_counter()
+        response = client.get(path, buffered=False)
+        chunks = iter(response.response)
+        size = len(next(chunks))
+        first += time.perf_counter() - start
+        size += sum(len(chunk) for chunk in chunks)
+        total += time.perf_counter() - start
+        response.close()
+    return first / count, total / count, size
+
+def setup(args, workdir: str):
+    viewdata.JSON_FILE_PATH = os.path.join(workdir, 'arcade_songs_output.json')
+    groups = write_output(viewdata.JSON_FILE_PATH, args.size)
+    viewdata.app.add_url_rule('/legacy', 'legacy', legacy_display_songs)
+    print(f"{groups} 组歌曲，文件 {os.path.getsize(viewdata.JSON_FILE_PATH) / 1024 / 1024:.1f} MB")
+    return viewdata.app.test_client()
+
+def bench_cache(args):
+    with tempfile.TemporaryDirectory(prefix='bench_viewdata_') as workdir:
+        client = setup(args, workdir)
+        print(f"每种方式 {args.requests} 个请求")
+        print(f"{'方式':>10} {'状态':>6} {'耗时(s)':>8} {'请求/秒':>10}")
+        legacy, elapsed = run(client, '/legacy', args.requests)
+        print(f"{'legacy':>10} {legacy.status_code:>6} {elapsed:>8.2f} {args.requests / elapsed:>10.1f}")
+        first = client.get('/').get_data()
+        cached, elapsed = run(client, '/', args.requests)
+        print(f"{'cached':>10} {cached.status_code:>6} {elapsed:>8.2f} {args.requests / elapsed:>10.1f}")
+        etag = cached.headers['ETag']
+        not_modified, elapsed = run(client, '/', args.requests, headers={'If-None-Match': etag})
+        print(f"{'etag':>10} {not_modified.status_code:>6} {elapsed:>8.2f} {args.requests / elapsed:>10.1f}")
+        print(f"缓存输出与首次渲染一致: {first == cached.get_data()}")
+
+        # 文件变化后缓存和ETag都应失效
+        write_output(viewdata.JSON_FILE_PATH, args.size // 2)
+        changed = client.get('/', headers={'If-None-Match': etag})
+        print(f"文件更新后: 状态 {changed.status_code}，ETag已变化: {changed.headers['ETag'] != etag}")
+
+def bench_page(args):
+    with tempfile.TemporaryDirectory(prefix='bench_viewdata_') as workdir:
+        client = setup(args, workdir)
+        client.get('/')
+        cases = [
+            ('legacy', '/legacy'),
+            ('page 500', f"/?page_size={viewdata.MAX_PAGE_SIZE}"),
+            ('page 50', '/'),
+            ('filtered', '/?game=maimai&game=ongeki&title=曲目 1&page=2'),
+        ]
+        print(f"每种方式 {args.requests} 个请求（不使用页面缓存）")
+        print(f"{'方式':>10} {'首字节(ms)':>11} {'完整(ms)':>10} {'页面(KB)':>10}")
+        for label, path in cases:
+            first, total, size = first_byte(client, path, args.requests)
+            print(f"{label:>10} {first * 1000:>11.1f} {total * 1000:>10.1f} {size / 1024:>10.0f}")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='viewdata.py 负载测试')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    cache = sub.add_parser('cache', help='比较每次解析渲染、页面缓存与304的请求速度')
+    cache.add_argument('--size', type=int, default=2000, help='每个平台的合成曲目数')
+    cache.add_argument('--requests', type=int, default=50, help='每种方式的请求数')
+    cache.set_defaults(func=bench_cache)
+
+    page = sub.add_parser('page', help='比较整页渲染与分页流式输出的首字节时间')
+    page.add_argument('--size', type=int, default=2000, help='每个平台的合成曲目数')
+    page.add_argument('--requests', type=int, default=20, help='每种方式的请求数')
+    page.set_defaults(func=bench_page)
+
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    args.func(args)
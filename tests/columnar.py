@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# 列式导出：把合并后的曲库转换为每个字段一列（难度解析为数值），写出Parquet/Arrow或NumPy结构化数组，
+# 并用整列运算一次得出平台收录和难度分布统计
+# 用法: python3 columnar.py [--input arcade_songs_output.json] [--output arcade_songs.parquet]
+# 合并时导出请使用 python3 testjson.py --columnar arcade_songs.parquet
+
+import argparse
+import json
+import math
+import os
+import re
+import time
+from array import array
+from collections import Counter
+from dataclasses import fields
+from typing import Dict, Iterable, List, Optional
+
+from jsondata import ChunithmSong, MaimaiSong, OngekiSong
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+PLATFORMS = ('chunithm', 'maimai', 'ongeki')
+SONG_CLASSES = {'chunithm': ChunithmSong, 'maimai': MaimaiSong, 'ongeki': OngekiSong}
+
+# platforms列中各平台对应的位，组合后的值0-7表示收录该曲的平台集合
+PLATFORM_BITS = {'chunithm': 1, 'maimai': 2, 'ongeki': 4}
+
+# 输出格式（按文件扩展名选择）和需要的库
+FORMATS = {'.parquet': 'pyarrow', '.arrow': 'pyarrow', '.feather': 'pyarrow', '.npy': 'numpy'}
+
+# 难度：整数部分加可选的"+"，"+"记为 +0.5；"?"、空值等无法解析的记为NaN
+LEVEL_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(\+)?')
+
+def is_level(name: str) -> bool:
+    """字段是否为难度（lev_*、dx_lev_*）"""
+    return name.startswith(('lev_', 'dx_lev_'))
+
+def parse_level(value) -> float:
+    if not value:
+        return math.nan
+    match = LEVEL_PATTERN.fullmatch(str(value).strip())
+    if match is None:
+        return math.nan
+    return float(match.group(1)) + (0.5 if match.group(2) else 0.0)
+
+def column_names() -> List[str]:
+    """全部列名：分组标题、平台位掩码，以及各平台每个字段一列（平台_字段）"""
+    names = ['title', 'platforms']
+    for platform in PLATFORMS:
+        names.extend(f"{platform}_{field.name}" for field in fields(SONG_CLASSES[platform]))
+    return names
+
+class ColumnBuilder:
+    """逐组追加合并后的曲目（ArcadeSong的字典形式），按列保存
+
+    难度列为array('d')，缺失为NaN；platforms列为array('B')；其余列为字符串列表，缺失为None
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.platforms = array('B')
+        self.titles: List[Optional[str]] = []
+        # 平台 -> [(字段名, 列, 是否难度)]
+        self.fields = {}
+        self.columns: Dict[str, object] = {'title': self.titles, 'platforms': self.platforms}
+        for platform in PLATFORMS:
+            specs = []
+            for field in fields(SONG_CLASSES[platform]):
+                level = is_level(field.name)
+                column = array('d') if level else []
+                self.columns[f"{platform}_{field.name}"] = column
+                specs.append((field.name, column, level))
+            self.fields[platform] = specs
+
+    def add(self, group: Dict):
+        mask = 0
+        for platform in PLATFORMS:
+            song = group.get(platform)
+            if song is None:
+                for _, column, level in self.fields[platform]:
+                    column.append(math.nan if level else None)
+                continue
+            mask |= PLATFORM_BITS[platform]
+            for name, column, level in self.fields[platform]:
+                value = song.get(name)
+                if level:
+                    column.append(parse_level(value))
+                else:
+                    column.append(None if value is None else str(value))
+        self.titles.append(group.get('title'))
+        self.platforms.append(mask)
+        self.count += 1
+
+    def extend(self, groups: Iterable[Dict]):
+        for group in groups:
+            self.add(group)
+        return self
+
+def build_columns(groups: Iterable[Dict]) -> Dict[str, object]:
+    return ColumnBuilder().extend(groups).columns
+
+def platform_counts(platforms) -> List[int]:
+    """platforms列中0-7各值的出现次数，一次计数得出所有平台组合"""
+    if np is not None:
+        return np.bincount(np.frombuffer(platforms, dtype=np.uint8), minlength=8).tolist()
+    # 没有numpy时按字节计数，bytes.count在C中逐字节比较
+    data = bytes(platforms)
+    return [data.count(value) for value in range(8)]
+
+def overlap_stats(platforms) -> Dict[str, int]:
+    """由平台组合计数求各平台、两两重叠和三平台收录数"""
+    counts = platform_counts(platforms)
+
+    def having(mask: int) -> int:
+        return sum(count for value, count in enumerate(counts) if value & mask == mask)
+
+    bits = PLATFORM_BITS
+    return {
+        'total': sum(counts),
+        'chunithm': having(bits['chunithm']),
+        'maimai': having(bits['maimai']),
+        'ongeki': having(bits['ongeki']),
+        'chunithm_maimai': having(bits['chunithm'] | bits['maimai']),
+        'chunithm_ongeki': having(bits['chunithm'] | bits['ongeki']),
+        'maimai_ongeki': having(bits['maimai'] | bits['ongeki']),
+        'all_three': having(7),
+    }
+
+def level_distribution(column) -> Dict[float, int]:
+    """难度列中每个难度值的曲目数（忽略NaN），按难度排序"""
+    if np is not None:
+        values = np.frombuffer(column, dtype=np.float64)
+        levels, counts = np.unique(values[~np.isnan(values)], return_counts=True)
+        return dict(zip(levels.tolist(), counts.tolist()))
+    counts = Counter(value for value in column if value == value)
+    return dict(sorted(counts.items()))
+
+def format_level(level: float) -> str:
+    whole = int(level)
+    return f"{whole}+" if level - whole == 0.5 else f"{level:g}"
+
+def to_arrow(columns: Dict[str, object]):
+    """转换为pyarrow.Table，难度列的NaN写为null"""
+    arrays = {}
+    for name, column in columns.items():
+        if name == 'platforms':
+            arrays[name] = pa.array(np.frombuffer(column, dtype=np.uint8) if np is not None else list(column),
+                                    type=pa.uint8())
+        elif isinstance(column, array):
+            arrays[name] = pa.array([None if value != value else value for value in column], type=pa.float64())
+        else:
+            arrays[name] = pa.array(column, type=pa.string())
+    return pa.table(arrays)
+
+def to_structured(columns: Dict[str, object]):
+    """转换为NumPy结构化数组：字符串列为定长Unicode（缺失为空字符串），难度列为float64"""
+    arrays = []
+    for name, column in columns.items():
+        if name == 'platforms':
+            arrays.append(np.frombuffer(column, dtype=np.uint8))
+        elif isinstance(column, array):
+            arrays.append(np.frombuffer(column, dtype=np.float64))
+        else:
+            arrays.append(np.array(['' if value is None else value for value in column], dtype=str))
+    return np.rec.fromarrays(arrays, names=list(columns))
+
+def check_format(path: str) -> str:
+    """检查扩展名对应的格式和所需的库是否可用，返回扩展名"""
+    suffix = os.path.splitext(path)[1].lower()
+    library = FORMATS.get(suffix)
+    if library is None:
+        raise ValueError(f"不支持的列式格式: {path}（可用 {', '.join(FORMATS)}）")
+    if library == 'pyarrow' and pa is None or library == 'numpy' and np is None:
+        raise ValueError(f"写出 {suffix} 需要安装 {library}")
+    return suffix
+
+def export(columns: Dict[str, object], path: str):
+    """按扩展名写出：.parquet/.arrow/.feather 需要pyarrow，.npy 需要numpy"""
+    suffix = check_format(path)
+    library = FORMATS[suffix]
+    if suffix == '.parquet':
+        pq.write_table(to_arrow(columns), path)
+    elif library == 'pyarrow':
+        feather.write_feather(to_arrow(columns), path)
+    else:
+        np.save(path, to_structured(columns), allow_pickle=False)
+
+def report(columns: Dict[str, object]):
+    """输出平台收录统计（格式与testjson.py相同）和各平台MASTER难度分布"""
+    stats = overlap_stats(columns['platforms'])
+    print("===== 数据统计结果 =====")
+    print(f"总歌曲数量: {stats['total']}")
+    print(f"\n各平台收录数量:")
+    print(f"Chunithm: {stats['chunithm']}")
+    print(f"Maimai: {stats['maimai']}")
+    print(f"Ongeki: {stats['ongeki']}")
+    print(f"\n多平台同时收录数量:")
+    print(f"Chunithm & Maimai: {stats['chunithm_maimai']}")
+    print(f"Chunithm & Ongeki: {stats['chunithm_ongeki']}")
+    print(f"Maimai & Ongeki: {stats['maimai_ongeki']}")
+    print(f"三平台同时收录: {stats['all_three']}")
+    print(f"\nMASTER难度分布:")
+    for platform in PLATFORMS:
+        distribution = level_distribution(columns[f"{platform}_lev_mas"])
+        print(f"{platform.capitalize()}: " +
+              (', '.join(f"{format_level(level)}×{count}" for level, count in distribution.items()) or '-'))
+    print("=======================")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='合并曲库的列式导出与统计')
+    parser.add_argument('--input', default='arcade_songs_output.json', help='testjson.py输出的合并曲库')
+    parser.add_argument('--output', default=None, help='列式文件（.parquet/.arrow/.feather/.npy），不指定时只输出统计')
+    args = parser.parse_args()
+    if args.output:
+        try:
+            check_format(args.output)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+# 导出
+__all__ = ["PLATFORM_BITS", "FORMATS", "is_level", "parse_level", "column_names", "ColumnBuilder",
+           "build_columns", "platform_counts", "overlap_stats", "level_distribution", "check_format", "export", "report"]
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    start = time.perf_counter()
+    with open(args.input, 'r', encoding='utf-8') as f:
+        columns = build_columns(json.load(f))
+    built = time.perf_counter()
+    report(columns)
+    if args.output:
+        export(columns, args.output)
+        print(f"已写出 {args.output}")
+    print(f"建列 {(built - start) * 1000:.0f}ms，统计与导出 {(time.perf_counter() - built) * 1000:.0f}ms")
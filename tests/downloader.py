@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# 各平台封面图片的基础路径
+IMAGE_BASE_URLS = {
+    'chunithm': "https://new.chunithm-net.com/chuni-mobile/html/mobile/img/",
+    'maimai': "https://maimaidx.jp/maimai-mobile/img/Music/",
+    'ongeki': "https://ongeki-net.com/ongeki-mobile/img/music/",
+}
+
+# 流式写入磁盘时每次读取的字节数
+CHUNK_SIZE = 64 * 1024
+
+# 图片清单文件名，位于图片根目录下
+MANIFEST_NAME = 'manifest.json'
+
+# 单张图片的同步结果
+DOWNLOADED = 'downloaded'
+REVALIDATED = 'revalidated'
+SKIPPED = 'skipped'
+
+# download_all中每个并发线程最多排队的任务数，任务可以是边生成边下载的生成器
+PENDING_PER_WORKER = 4
+
+def build_image_url(image_url: str, platform: str, base_urls: Optional[Dict[str, str]] = None) -> str:
+    """根据平台拼接图片的完整下载地址"""
+    base_urls = IMAGE_BASE_URLS if base_urls is None else base_urls
+    return base_urls.get(platform, '') + image_url
+
+class HostRateLimiter:
+    """按主机限制请求速率，rate为每秒请求数，0表示不限制"""
+
+    def __init__(self, rate: float = 0):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str):
+        if not self.interval:
+            return
+        # 在锁内预约下一个时间槽，锁外等待，避免阻塞其他主机
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def file_sha256(filepath: str) -> str:
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ImageManifest:
+    """本地图片清单，记录每张图片的大小、ETag/Last-Modified和内容哈希"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"读取图片清单 {path} 失败，将重新下载: {e}")
+
+    @staticmethod
+    def key(platform: str, filename: str) -> str:
+        return f"{platform}/{filename}"
+
+    def get(self, platform: str, filename: str) -> Optional[Dict]:
+        with self._lock:
+            return self.entries.get(self.key(platform, filename))
+
+    def update(self, platform: str, filename: str, entry: Dict):
+        with self._lock:
+            self.entries[self.key(platform, filename)] = entry
+
+    def matches(self, filepath: str, entry: Optional[Dict]) -> bool:
+        """本地文件存在且大小和哈希均与清单一致"""
+        if not entry or not os.path.exists(filepath):
+            return False
+        if os.path.getsize(filepath) != entry.get('size'):
+            return False
+        return file_sha256(filepath) == entry.get('sha256')
+
+    def save(self):
+        """先写临时文件再替换，避免中断时留下损坏的清单"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            partial_path = self.path + '.part'
+            with open(partial_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(partial_path, self.path)
+
+class ImageDownloader:
+    """并发图片下载器，每个主机复用一个连接池会话
+
+    传入manifest后按清单增量同步：本地文件哈希一致时直接跳过，
+    revalidate为True时改为带If-None-Match/If-Modified-Since的条件请求
+    """
+
+    def __init__(self, root: str = 'images', workers: int = 8, rate_per_host: float = 0,
+                 base_urls: Optional[Dict[str, str]] = None, verify: bool = False, timeout: float = 30,
+                 manifest: Optional[ImageManifest] = None, revalidate: bool = False):
+        self.root = root
+        self.manifest = manifest
+        self.revalidate = revalidate
+        self.workers = max(1, workers)
+        self.base_urls = IMAGE_BASE_URLS if base_urls is None else base_urls
+        self.verify = verify
+        self.timeout = timeout
+        self.limiter = HostRateLimiter(rate_per_host)
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session(self, host: str) -> requests.Session:
+        """获取主机对应的会话，连接池大小与并发数一致"""
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.verify = self.verify
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+            return session
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def download(self, image_url: str, platform: str, filename: str) -> Optional[str]:
+        """同步单张图片，返回 downloaded/revalidated/skipped，失败时返回None
+
+        响应体分块写入临时文件并同时计算哈希，完成后再替换目标文件
+        """
+        filepath = os.path.join(self.root, platform, filename)
+        try:
+            headers = {}
+            entry = self.manifest.get(platform, filename) if self.manifest else None
+            if self.manifest and self.manifest.matches(filepath, entry):
+                if not self.revalidate:
+                    return SKIPPED
+                if entry.get('etag'):
+                    headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    headers['If-Modified-Since'] = entry['last_modified']
+
+            real_image_url = build_image_url(image_url, platform, self.base_urls)
+            host = urlsplit(real_image_url).netloc
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+            self.limiter.wait(host)
+            start = time.perf_counter()
+            with self._session(host).get(real_image_url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 304 and headers:
+                    metrics.observe('image_request', time.perf_counter() - start)
+                    return REVALIDATED
+                response.raise_for_status()  # 确保请求成功
+                digest = hashlib.sha256()
+                size = 0
+                partial_path = filepath + '.part'
+                with open(partial_path, 'wb') as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                os.replace(partial_path, filepath)
+            elapsed = time.perf_counter() - start
+            metrics.observe('image_request', elapsed)
+            metrics.add('image_download', elapsed, 1, size)
+
+            if self.manifest:
+                self.manifest.update(platform, filename, {
+                    'size': size,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'sha256': digest.hexdigest(),
+                })
+            logging.debug(f"图片已下载: {filepath}")
+            return DOWNLOADED
+        except Exception as e:
+            print(f"下载图片失败: {e}")
+            return None
+
+    def download_all(self, jobs: Iterable[Tuple[str, str, str]]) -> Tuple[Dict[str, int], List[Tuple[str, str, str]]]:
+        """并发同步 (image_url, platform, filename) 列表，返回各结果的数量和失败的任务
+
+        jobs按需读取，在途任务不超过 workers * PENDING_PER_WORKER 个，传入生成器时内存与任务总数无关
+        """
+        counts = {DOWNLOADED: 0, REVALIDATED: 0, SKIPPED: 0}
+        failed = []
+        pending = {}
+        max_pending = self.workers * PENDING_PER_WORKER
+
+        def collect(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                job = pending.pop(future)
+                result = future.result()
+                if result is None:
+                    failed.append(job)
+                else:
+                    counts[result] += 1
+                metrics.count(f"images_{result or 'failed'}")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for job in jobs:
+                    pending[pool.submit(self.download, *job)] = job
+                    if len(pending) >= max_pending:
+                        collect(FIRST_COMPLETED)
+                while pending:
+                    collect(FIRST_COMPLETED)
+        finally:
+            # 即使中途中断也保存已完成部分的清单
+            if self.manifest:
+                self.manifest.save()
+        return counts, failed
+
+# 导出
+__all__ = ["IMAGE_BASE_URLS", "MANIFEST_NAME", "DOWNLOADED", "REVALIDATED", "SKIPPED", "PENDING_PER_WORKER",
+           "build_image_url", "file_sha256", "HostRateLimiter", "ImageManifest", "ImageDownloader"]
@@ -1,11 +1,25 @@
 #!/usr/bin/env python3
+import csv
 import json
 import os
 import requests
-import pyotp
 import logging
 import argparse
 import time
+import random
+import sqlite3
+import threading
+import hashlib
+import math
+import queue
+import unicodedata
+from email.utils import parsedate_to_datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+import metrics
+from auth import get_totp_provider
+from songs_client import SongsClient
 
 # 配置变量 - 置于脚本头部
 BASE_URL = "https://your-default-base-url.com"
@@ -39,173 +53,605 @@ def parse_arguments():
     # 移除base-url和totp-key命令行参数
     # parser.add_argument('--base-url', required=True, help='服务器基础路径')
     # parser.add_argument('--totp-key', required=True, help='TOTP 密钥')
-    parser.add_argument('--batch-size', type=int, default=10, help='批量导入大小，默认10条')
-    parser.add_argument('--delay', type=int, default=500, help='请求间隔毫秒数，默认500ms')
+    parser.add_argument('--batch-size', type=int, default=10, help='批量导入大小，默认10条，每批一个请求；1表示逐首导入')
+    parser.add_argument('--delay', type=int, default=500, help='请求间隔毫秒数，默认500ms；未指定--rate时换算为请求速率上限')
+    parser.add_argument('--workers', type=int, default=4, help='并发导入线程数，默认4')
+    parser.add_argument('--rate', type=float, default=None, help='每秒最多请求数，默认由--delay换算，0表示不限制')
+    parser.add_argument('--retries', type=int, default=3, help='连接失败、429或带Retry-After的503时的最大重试次数，默认3；读取超时和其他5xx不重试，以免重复写入')
+    parser.add_argument('--timeout', type=float, default=30, help='单个请求超时秒数，默认30')
+    parser.add_argument('--journal', default='import_journal.db', help='导入日志文件，重新运行时跳过已完成的歌曲')
+    parser.add_argument('--fresh', action='store_true', help='清空导入日志，从头开始导入')
+    parser.add_argument('--no-prefilter', action='store_true', help='不预先读取已有曲库，所有歌曲都发送到服务器')
+    parser.add_argument('--bloom', type=int, default=0, metavar='CAPACITY',
+                        help='用指定容量的布隆过滤器保存已有曲库的键，适用于非常大的曲库；默认0表示使用集合')
+    parser.add_argument('--bloom-error', type=float, default=1e-6, help='布隆过滤器的误判率，默认1e-6')
+    parser.add_argument('--metrics', default=None, help='写出导入各阶段耗时、请求延迟直方图和结果计数（.prom为Prometheus文本格式，其余为JSON）')
+    parser.add_argument('--profile', default=None, help='用cProfile采集并写入该文件')
+    parser.add_argument('--tracemalloc', action='store_true', help='用tracemalloc记录内存峰值和分配最多的代码行')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE,
+                        help=f'边解析边导入时预先解析的最大分组数，默认{QUEUE_SIZE}')
+    parser.add_argument('--verbose', action='store_true', help='逐首输出导入结果（默认只按进度抽样输出）')
     return parser.parse_args()
 
-# 获取 TOTP 认证令牌
-def get_totp_token(totp_key):
-    totp = pyotp.TOTP(totp_key)
-    return totp.now()
+# 请求速率上限：优先使用--rate，否则由--delay换算
+def get_request_rate(args):
+    if args.rate is not None:
+        return args.rate
+    return 1000 / args.delay if args.delay > 0 else 0
+
+# 自适应令牌桶限速器
+# 正常时按上限发放令牌；服务器返回429/503时速率减半，之后每次成功缓慢恢复到上限
+class TokenBucket:
+    def __init__(self, rate, capacity=None, min_rate=0.5):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate) if rate > 0 else 0
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    # 取得一个令牌，令牌不足时等待
+    def acquire(self):
+        if self.max_rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    # 服务器限流时降低速率
+    def throttle(self):
+        if self.max_rate <= 0:
+            return
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+
+    # 请求成功时逐步恢复速率
+    def recover(self):
+        if self.max_rate <= 0:
+            return
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+# 创建带连接池的会话，连接数与并发线程数一致
+def create_session(pool_size=1):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
 # 获取认证头
+# 同一密钥共享一个令牌提供者，每个30秒窗口只计算一次令牌
 def get_auth_header(totp_key):
-    totp_token = get_totp_token(totp_key)
-    return {"Authorization": f"Bearer {totp_token}"}
+    return get_totp_provider(totp_key).header()
 
-# 导入单首歌曲到API
-def import_single_song(song, base_url, totp_key):
-    auth_header = get_auth_header(totp_key)
-    if not auth_header:
-        return False, "无法获取认证令牌"
+# 歌曲去重与导入日志使用的键
+def entry_key(entry):
+    return f"{entry['Title']}|{entry['Artist']}"
+
+# 与已有曲库比较时使用的规范化键：NFKC（全角转半角）、合并空白并忽略大小写
+def normalized_key(title, artist):
+    def normalize(text):
+        return ' '.join(unicodedata.normalize('NFKC', text or '').split()).casefold()
+    return f"{normalize(title)}|{normalize(artist)}"
+
+# 布隆过滤器：按容量和误判率分配位数组，每个键由blake2b摘要的两个64位值做双重哈希
+# 不会漏判，误判的歌曲会被当作已存在而跳过
+class BloomFilter:
+    def __init__(self, capacity, error_rate=1e-6):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
     
-    api_url = f"{base_url}/api/Songs"
+    def positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
     
-    try:
-        response = requests.post(
-            api_url,
-            headers=auth_header,
-            json=song
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+    
+    def __len__(self):
+        return self.count
+
+# 预过滤读取已有曲库时的每页歌曲数（服务器上限）
+PREFILTER_PAGE_SIZE = 500
+
+# 分页读取服务器上的已有曲库（GET /api/Songs，按游标分页），返回规范化键的集合和请求数
+# bloom_capacity大于0时改用该容量的布隆过滤器，内存只与容量有关
+def fetch_existing_keys(base_url, timeout=30, retries=3, bloom_capacity=0, error_rate=1e-6):
+    client = SongsClient(base_url, timeout=timeout, retries=retries, page_size=PREFILTER_PAGE_SIZE)
+    keys = BloomFilter(bloom_capacity, error_rate) if bloom_capacity else set()
+    with metrics.stage('prefilter') as record:
+        for song in client.iter_songs():
+            keys.add(normalized_key(song.get('title'), song.get('artist')))
+        record['items'] = len(keys)
+    if bloom_capacity and len(keys) > bloom_capacity:
+        logging.warning(f"已有曲库 {len(keys)} 首超过布隆过滤器容量 {bloom_capacity}，误判率将高于 {error_rate}")
+    return keys, client.requests
+
+# 去掉已有曲库中存在的歌曲，返回 (剩余歌曲, 跳过的数量)
+def drop_existing(entries, existing_keys):
+    remaining = [entry for entry in entries if normalized_key(entry['Title'], entry['Artist']) not in existing_keys]
+    return remaining, len(entries) - len(remaining)
+
+# 导入日志（SQLite），记录每个 Title|Artist 的最终结果
+# 成功和已存在视为完成，中断后重新运行只导入未完成或失败的歌曲
+class ImportJournal:
+    DONE_STATUS = ('success', 'duplicate')
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.con = sqlite3.connect(path, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS journal ("
+            "key TEXT PRIMARY KEY NOT NULL, status TEXT NOT NULL, message TEXT, updated_at INTEGER NOT NULL)"
         )
+        self.con.commit()
+
+    # 已完成的键
+    def completed_keys(self):
+        with self.lock:
+            rows = self.con.execute(
+                "SELECT key FROM journal WHERE status IN (?, ?)", self.DONE_STATUS
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    # 记录一组结果，[(key, status, message), ...]，每组提交一次
+    def record(self, outcomes):
+        now = int(time.time())
+        with self.lock:
+            self.con.executemany(
+                "INSERT OR REPLACE INTO journal (key, status, message, updated_at) VALUES (?, ?, ?, ?)",
+                [(key, status, message, now) for key, status, message in outcomes]
+            )
+            self.con.commit()
+
+    # 各状态的数量
+    def summary(self):
+        with self.lock:
+            return dict(self.con.execute("SELECT status, COUNT(*) FROM journal GROUP BY status").fetchall())
+
+    def clear(self):
+        with self.lock:
+            self.con.execute("DELETE FROM journal")
+            self.con.commit()
+
+    def close(self):
+        with self.lock:
+            self.con.close()
+
+# 服务器不支持批量接口时可能返回的状态码
+BATCH_UNSUPPORTED_STATUS = (400, 404, 405, 415)
+
+# 请求是否确定没有到达服务器：连接超时或无法建立连接（拒绝连接、DNS解析失败）
+def never_sent(error):
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+# Retry-After要求等待的秒数（整数秒或HTTP日期），没有或无法解析时返回None
+def retry_after_seconds(response):
+    value = response.headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+# 带重试的POST请求
+# 创建歌曲的接口不是幂等的，只在请求确定未被处理时重试：连接失败、429、带Retry-After的503，
+# 按Retry-After或指数退避等待；读取超时、连接中断和其他5xx时服务器可能已经写入，直接返回失败
+# 返回 (response, 错误信息)，最终失败时response为None
+def post_with_retry(url, payload, totp_key, session=None, limiter=None, retries=0, timeout=30, backoff=0.5):
+    http = session or requests
+    message = None
+    
+    for attempt in range(retries + 1):
+        # 先等待限速器再取令牌，避免令牌在等待期间过期
+        if limiter:
+            limiter.acquire()
+        auth_header = get_auth_header(totp_key)
+        if not auth_header:
+            return None, "无法获取认证令牌"
         
-        if response.status_code == 201:
-            return True, "导入成功"
-        elif response.status_code == 409:
-            return False, "歌曲已存在"
-        else:
-            return False, f"HTTP错误: {response.status_code} - {response.text}"
-    except Exception as e:
-        return False, f"请求错误: {str(e)}"
-
-# 从list.txt导入数据
-def import_from_list_file():
-    list_path = 'list.txt'
-    if not os.path.exists(list_path):
-        logging.error(f"数据源文件 {list_path} 不存在")
-        return [], []
+        try:
+            start = time.perf_counter()
+            response = http.post(
+                url,
+                headers=auth_header,
+                json=payload,
+                timeout=timeout
+            )
+            metrics.observe('import_request', time.perf_counter() - start)
+            
+            if limiter and response.status_code < 400:
+                limiter.recover()
+            if limiter and response.status_code in (429, 503):
+                limiter.throttle()
+            retry_after = retry_after_seconds(response)
+            if response.status_code != 429 and (response.status_code != 503 or retry_after is None):
+                return response, None
+            message = f"HTTP错误: {response.status_code} - {response.text}"
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            if not never_sent(e):
+                metrics.count('import_unconfirmed')
+                return None, f"请求错误（服务器可能已处理，未重试）: {str(e)}"
+            retry_after = None
+            message = f"请求错误: {str(e)}"
+        except Exception as e:
+            return None, f"请求错误: {str(e)}"
+        
+        if attempt < retries:
+            metrics.count('import_retries')
+            if retry_after is not None:
+                delay = retry_after
+            else:
+                delay = backoff * (2 ** attempt) * (1 + random.random())
+            logging.debug(f"{url} 第 {attempt + 1} 次重试，{delay:.2f}s 后开始: {message}")
+            time.sleep(delay)
     
-    music_entries = []
-    skipped_lines = []
+    return None, message
+
+# 根据状态码得到单首歌曲的导入结果
+DUPLICATE_MESSAGE = "歌曲已存在"
+
+def song_result(status_code, text=''):
+    if status_code == 201:
+        return True, "导入成功"
+    elif status_code == 409:
+        return False, DUPLICATE_MESSAGE
+    else:
+        return False, f"HTTP错误: {status_code} - {text}"
+
+# 导入单首歌曲到API
+def import_single_song(song, base_url, totp_key, session=None, limiter=None, retries=0, timeout=30):
+    response, message = post_with_retry(f"{base_url}/api/Songs", song, totp_key, session, limiter, retries, timeout)
+    if response is None:
+        return False, message
+    return song_result(response.status_code, response.text)
+
+# 批量导入一组歌曲到API，返回每首歌曲的 (success, message)
+# 服务器拒绝批量接口时返回None，由调用方改为逐首导入
+def import_song_batch(songs, base_url, totp_key, session=None, limiter=None, retries=0, timeout=30):
+    response, message = post_with_retry(f"{base_url}/api/Songs/batch", songs, totp_key, session, limiter, retries, timeout)
+    if response is None:
+        return [(False, message)] * len(songs)
+    if response.status_code in BATCH_UNSUPPORTED_STATUS:
+        return None
+    if response.status_code != 200:
+        return [song_result(response.status_code, response.text)] * len(songs)
     
+    try:
+        results = response.json()['results']
+    except (ValueError, KeyError, TypeError):
+        return None
+    
+    outcomes = [(False, "服务器未返回该首的结果")] * len(songs)
+    for item in results:
+        index = item.get('index')
+        if isinstance(index, int) and 0 <= index < len(songs):
+            outcomes[index] = song_result(item.get('status'), item.get('error', ''))
+    return outcomes
+
+# 从list.txt逐条产出歌曲，不把整个文件读入内存；跳过注释和空行，格式错误的行追加到errors
+# 不含引号的行按第一个逗号分隔（之后的逗号都属于艺术家，与原格式一致）；
+# 含引号的行按CSV规则解析，引号内可以包含逗号，""表示一个引号，第二个字段之后的字段并入艺术家
+# 所有歌曲使用同一个AddTime（开始解析的时间）
+def iter_list_entries(list_path='list.txt', errors=None):
+    errors = [] if errors is None else errors
+    add_time = int(time.time())
     with open(list_path, 'r', encoding='utf-8') as f:
         for line_num, line in enumerate(f, 1):
             line = line.strip()
-            # 跳过注释和空行
-            if not line or line.startswith('#'):
+            if not line or line[0] == '#':
                 continue
-            
-            # 解析行数据
+            if '"' in line:
+                try:
+                    parts = next(csv.reader((line,), skipinitialspace=True, strict=True))
+                except csv.Error as e:
+                    errors.append(f"第 {line_num} 行: 解析错误 - {e}")
+                    continue
+            else:
+                parts = line.split(',', 1)
+            if len(parts) < 2:
+                errors.append(f"第 {line_num} 行: 格式错误 - {line}")
+                continue
+            yield {
+                "Title": parts[0].strip(),
+                "Artist": (parts[1] if len(parts) == 2 else ','.join(parts[1:])).strip(),
+                "CategoryId": 1,
+                "FromPlatform": 0,
+                "AddTime": add_time
+            }
+
+# 从list.txt导入数据，返回 (全部歌曲, 格式错误的行)
+def import_from_list_file(list_path='list.txt'):
+    if not os.path.exists(list_path):
+        logging.error(f"数据源文件 {list_path} 不存在")
+        return [], []
+    skipped_lines = []
+    music_entries = list(iter_list_entries(list_path, skipped_lines))
+    return music_entries, skipped_lines
+
+# 逐条筛选待导入的歌曲：列表内去重，跳过导入日志中已完成的和已有曲库中已存在的，各原因计入counts
+# 去重保存完整的键，内存与不重复的歌曲数成正比，但不会因哈希碰撞误删歌曲
+def pending_entries(entries, completed=(), existing_keys=None, counts=None):
+    counts = {} if counts is None else counts
+    for name in ('parsed', 'duplicates', 'completed', 'existing'):
+        counts.setdefault(name, 0)
+    seen = set()
+    for entry in entries:
+        counts['parsed'] += 1
+        key = entry_key(entry)
+        if key in seen:
+            counts['duplicates'] += 1
+            continue
+        seen.add(key)
+        if key in completed:
+            counts['completed'] += 1
+            continue
+        if existing_keys is not None and normalized_key(entry['Title'], entry['Artist']) in existing_keys:
+            counts['existing'] += 1
+            continue
+        yield entry
+
+# 已有曲库的键在第一首待导入的歌曲到达预过滤时才读取：导入日志显示全部已完成时不发送任何请求
+# 读取失败时记录警告并不做预过滤
+class LazyExistingKeys:
+    def __init__(self, args):
+        self.args = args
+        self.keys = None
+        self.loaded = False
+    
+    def load(self):
+        self.loaded = True
+        args = self.args
+        try:
+            self.keys, pages = fetch_existing_keys(BASE_URL, args.timeout, args.retries, args.bloom, args.bloom_error)
+            logging.info(f"已有曲库 {len(self.keys)} 首（{pages} 个请求）")
+        except Exception as e:
+            logging.warning(f"读取已有曲库失败，不做预过滤: {e}")
+    
+    def __contains__(self, key):
+        if not self.loaded:
+            self.load()
+        return self.keys is not None and key in self.keys
+
+# 流式导入时生产者最多预先准备的分组数（每组--batch-size首）
+QUEUE_SIZE = 64
+# 总数未知（流式导入）时每完成多少首输出一次进度
+PROGRESS_INTERVAL = 1000
+
+# 生产者线程在后台迭代entries（解析、去重、筛选），按size分组放入有界队列，消费者逐组取出
+# 队列满时生产者等待，内存只与队列长度有关；生产者的异常在消费者一侧重新抛出，消费者提前结束时生产者随之退出
+def produce_chunks(entries, size, maxsize=QUEUE_SIZE):
+    chunks = queue.Queue(max(1, maxsize))
+    finished = object()
+    failure = []
+    stop = threading.Event()
+    
+    def put(item):
+        while not stop.is_set():
             try:
-                # 处理带引号的字段
-                if line.startswith('"'):
-                    parts = line.split('","')
-                    if len(parts) >= 2:
-                        title = parts[0][1:].strip()  # 移除开头的引号
-                        artist = parts[1].rsplit('"', 1)[0].strip()  # 移除结尾的引号
-                        music_entries.append({
-                            "Title": title,
-                            "Artist": artist,
-                            "CategoryId": 1,
-                            "FromPlatform": 0,
-                            "AddTime": int(time.time())
-                        })
-                    else:
-                        skipped_lines.append(f"第 {line_num} 行: 格式错误 - {line}")
-                else:
-                    parts = line.split(',')
-                    if len(parts) >= 2:
-                        title = parts[0].strip()
-                        artist = ','.join(parts[1:]).strip()
-                        music_entries.append({
-                            "Title": title,
-                            "Artist": artist,
-                            "CategoryId": 1,
-                            "FromPlatform": 0,
-                            "AddTime": int(time.time())
-                        })
-                    else:
-                        skipped_lines.append(f"第 {line_num} 行: 格式错误 - {line}")
-            except Exception as e:
-                skipped_lines.append(f"第 {line_num} 行: 解析错误 - {str(e)}")
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
     
-    return music_entries, skipped_lines
+    def produce():
+        try:
+            with metrics.stage('parse_list') as record:
+                chunk = []
+                for entry in entries:
+                    chunk.append(entry)
+                    record['items'] += 1
+                    if len(chunk) >= size:
+                        if not put(chunk):
+                            return
+                        chunk = []
+                if chunk:
+                    put(chunk)
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            put(finished)
+    
+    producer = threading.Thread(target=produce, name='list-producer', daemon=True)
+    producer.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is finished:
+                break
+            yield chunk
+    finally:
+        stop.set()
+        producer.join()
+    if failure:
+        raise failure[0]
 
 # 导入数据到API
-def import_to_api(music_entries, args):
-    if not music_entries:
+# 按--batch-size分组，每组一个请求；多个线程共享同一个连接池会话，由令牌桶统一控制请求速率
+# 服务器拒绝批量接口后，剩余的分组改为逐首导入
+# music_entries为列表时直接分组；为其他可迭代对象时由生产者线程边解析边经有界队列送入，
+# 同时在途的分组不超过并发数的两倍，第一组解析完即开始发送
+# 传入journal时每组完成后立即记录结果
+def import_to_api(music_entries, args, base_url=None, journal=None, queue_size=QUEUE_SIZE):
+    if isinstance(music_entries, list) and not music_entries:
         logging.info("没有要导入的音乐数据")
         return 0, []
     
+    base_url = base_url or BASE_URL
     success_count = 0
     errors = []
+    total = len(music_entries) if isinstance(music_entries, list) else None
+    batch_size = max(1, args.batch_size)
+    batch_state = {'supported': batch_size > 1}
+    limiter = TokenBucket(get_request_rate(args))
+    # 逐首结果只在debug级别输出，info级别每完成约5%（总数未知时每PROGRESS_INTERVAL首）输出一次进度
+    progress_every = max(1, total // 20) if total else PROGRESS_INTERVAL
+    max_pending = max(1, args.workers) * 2
+    if total is None:
+        chunks = produce_chunks(music_entries, batch_size, queue_size)
+    else:
+        chunks = (music_entries[start:start + batch_size] for start in range(0, total, batch_size))
     
-    # 单首导入循环
-    for index, song in enumerate(music_entries, 1):
-        logging.info(f"正在导入第 {index}/{len(music_entries)} 首: {song['Title']} - {song['Artist']}")
+    with metrics.stage('import') as stage_record, create_session(args.workers) as session, \
+            ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        # 导入一组歌曲，返回每首的结果
+        def import_chunk(chunk):
+            if batch_state['supported']:
+                outcomes = import_song_batch(chunk, base_url, TOTP_KEY, session, limiter, args.retries, args.timeout)
+                if outcomes is not None:
+                    return outcomes
+                if batch_state['supported']:
+                    batch_state['supported'] = False
+                    logging.warning("服务器不支持批量导入，改为逐首导入")
+            return [
+                import_single_song(song, base_url, TOTP_KEY, session, limiter, args.retries, args.timeout)
+                for song in chunk
+            ]
+        
+        done = 0
+        # 处理一组完成的结果，start为该组第一首的序号（从0开始）
+        def record(start, chunk, results):
+            nonlocal done, success_count
+            outcomes = []
+            for offset, (success, message) in enumerate(results):
+                index = start + offset + 1
+                song = chunk[offset]
+                done += 1
+                shown = f"{done}/{total}" if total else f"{done}"
+                
+                if success:
+                    success_count += 1
+                    status = 'success'
+                    logging.debug(f"[{shown}] 成功: {song['Title']} - {song['Artist']}")
+                else:
+                    status = 'duplicate' if message == DUPLICATE_MESSAGE else 'failed'
+                    errors.append(f"第 {index} 首 {song['Title']}: {message}")
+                    logging.debug(f"[{shown}] 失败: {song['Title']} - {song['Artist']}: {message}")
+                metrics.count(f"import_{status}")
+                outcomes.append((entry_key(song), status, message))
+                if done % progress_every == 0 or done == total:
+                    logging.info(f"进度 {shown}，成功 {success_count}，失败 {len(errors)}")
+            
+            if journal:
+                journal.record(outcomes)
         
-        # 导入单首歌曲
-        success, message = import_single_song(song, BASE_URL, TOTP_KEY)
+        pending = {}
+        submitted = 0
         
-        if success:
-            success_count += 1
-            logging.info(f"成功: {message}")
-        else:
-            errors.append(f"第 {index} 首 {song['Title']}: {message}")
-            logging.warning(f"失败: {message}")
+        # 等待至少一组完成并处理结果
+        def collect(return_when=FIRST_COMPLETED):
+            finished, _ = wait(pending, return_when=return_when)
+            for future in finished:
+                start, chunk = pending.pop(future)
+                record(start, chunk, future.result())
         
-        # 添加延迟，最后一首不需要延迟
-        if index < len(music_entries) and args.delay > 0:
-            time.sleep(args.delay / 1000)
+        for chunk in chunks:
+            pending[pool.submit(import_chunk, chunk)] = (submitted, chunk)
+            submitted += len(chunk)
+            while len(pending) >= max_pending:
+                collect()
+        while pending:
+            collect()
+        stage_record['items'] = done
+    
+    if total is None:
+        if done == 0:
+            logging.info("没有要导入的音乐数据")
+        elif done % progress_every:
+            logging.info(f"进度 {done}，成功 {success_count}，失败 {len(errors)}")
     
     return success_count, errors
 
 # 主函数
-def main():
-    # 解析命令行参数
-    args = parse_arguments()
+def main(args):
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
     
     logging.info("===== 开始音乐数据导入 ====")
-    logging.info(f"服务器基础路径: {args.base_url}")
+    logging.info(f"服务器基础路径: {BASE_URL}")
     
     # 从list.txt导入
-    logging.info("从list.txt导入数据...")
-    list_entries, list_errors = import_from_list_file()
+    list_path = 'list.txt'
+    if not os.path.exists(list_path):
+        logging.error(f"数据源文件 {list_path} 不存在")
+        logging.info("没有数据需要导入")
+        return
+    
+    # 跳过导入日志中已完成的歌曲
+    journal = ImportJournal(args.journal)
+    if args.fresh:
+        journal.clear()
+    completed = journal.completed_keys()
+    if completed:
+        logging.info(f"导入日志 {args.journal} 中已完成 {len(completed)} 条")
+    
+    # 已有曲库中存在的歌曲不再发送（服务器本身不检查重复），有歌曲待导入时才读取已有曲库
+    existing_keys = None if args.no_prefilter else LazyExistingKeys(args)
+    
+    # 边解析、去重、筛选边导入到API
+    logging.info("从list.txt导入数据到API...")
+    list_errors = []
+    counts = {}
+    entries = pending_entries(iter_list_entries(list_path, list_errors), completed, existing_keys, counts)
+    try:
+        success, import_errors = import_to_api(entries, args, journal=journal, queue_size=args.queue_size)
+    finally:
+        journal.close()
     
     if list_errors:
         logging.warning("解析list.txt时遇到问题:")
         for error in list_errors:
             logging.warning(f"- {error}")
     
-    logging.info(f"从list.txt解析到 {len(list_entries)} 条有效记录")
+    logging.info(f"从list.txt解析到 {counts['parsed']} 条有效记录，重复 {counts['duplicates']} 条，"
+                 f"导入日志中已完成 {counts['completed']} 条，已有曲库中存在 {counts['existing']} 条")
+    logging.info(f"===== 导入完成 ====")
+    logging.info(f"成功导入: {success} 条")
+    logging.info(f"失败: {len(import_errors)} 条")
     
-    # 合并数据并去重
-    all_entries = list_entries
-    unique_entries = []
-    seen = set()
-    
-    for entry in all_entries:
-        key = f"{entry['Title']}|{entry['Artist']}"
-        if key not in seen:
-            seen.add(key)
-            unique_entries.append(entry)
-    
-    logging.info(f"合并并去重后，共 {len(unique_entries)} 条记录待导入")
-    
-    # 导入到API
-    if unique_entries:
-        logging.info("开始导入数据到API...")
-        success, import_errors = import_to_api(unique_entries, args)
-        
-        logging.info(f"===== 导入完成 ====")
-        logging.info(f"成功导入: {success} 条")
-        logging.info(f"失败: {len(import_errors)} 条")
-        
-        if import_errors:
-            logging.warning("导入错误详情:")
-            for error in import_errors:
-                logging.warning(f"- {error}")
-    else:
-        logging.info("没有数据需要导入")
+    if import_errors:
+        logging.warning("导入错误详情:")
+        for error in import_errors:
+            logging.warning(f"- {error}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # 解析命令行参数
+    args = parse_arguments()
+    with metrics.profiling(args.profile, args.tracemalloc):
+        main(args)
+    if args.metrics:
+        metrics.METRICS.write(args.metrics)
+        logging.info(f"各阶段统计:\n{metrics.METRICS.report()}")
+        logging.info(f"指标已写出: {args.metrics}")
\ No newline at end of file
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# 增量合并：与上一次的快照逐曲比较，只重新生成受影响的ArcadeSong分组，并输出变更日志
+# 用法: python3 testjson.py --incremental（或 python3 incremental.py）
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import serializer
+from downloader import file_sha256
+from testjson import PLATFORMS, SOURCES, create_song_objects, read_json_file
+
+# 快照记录上一次合并时各曲库的哈希、每首歌的 (键, 标题, 摘要)，以及每个分组在输出文件中的字节范围；
+# 分组范围保存为 [标题, 偏移, 长度] 列表，标题可以是None（JSON对象的键只能是字符串）
+SNAPSHOT_NAME = '.arcade_snapshot.json'
+# 变更日志，供图片同步、API导入等后续步骤只处理变化的部分
+CHANGELOG_NAME = 'arcade_changes.json'
+
+INDENT = 2
+
+def record_digest(song: Dict) -> str:
+    """歌曲字典的内容摘要，同一平台的字段顺序固定，直接对字段值的repr取哈希"""
+    return hashlib.blake2b(repr(tuple(song.values())).encode('utf-8'), digest_size=8).hexdigest()
+
+def record_keys(songs: List[Dict]) -> List[str]:
+    """每首歌的键：优先使用id，没有id时使用标题；重复的键按出现次数加后缀"""
+    keys = []
+    seen = {}
+    for song in songs:
+        key = str(song['id']) if song.get('id') else f"title:{song.get('title')}"
+        count = seen.get(key, 0)
+        seen[key] = count + 1
+        keys.append(key if count == 0 else f"{key}#{count}")
+    return keys
+
+def load_snapshot(snapshot_path: str, output_path: str) -> Optional[Dict]:
+    """读取快照，输出文件在快照之后被改动过或快照损坏时返回None"""
+    try:
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        stat = os.stat(output_path)
+        if snapshot['output'] != [stat.st_size, stat.st_mtime_ns] or not isinstance(snapshot['groups'], list):
+            return None
+        return snapshot
+    except (OSError, ValueError, KeyError):
+        return None
+
+def format_group(group: Dict) -> bytes:
+    """序列化一个分组，格式与 JSONArrayWriter 写出的数组元素一致"""
+    text = serializer.dumps(group, indent=INDENT)
+    return text.replace('\n', '\n' + ' ' * INDENT).encode('utf-8')
+
+def group_spans(snapshot: Dict) -> Dict[Optional[str], List[int]]:
+    """快照中的分组范围：标题 -> [偏移, 长度]"""
+    return {title: [offset, length] for title, offset, length in snapshot['groups']}
+
+def diff_records(old: Dict[str, List], new: Dict[str, List]) -> Tuple[List[str], List[str], List[str]]:
+    """比较 键 -> [标题, 摘要]，返回新增、删除和变化的键"""
+    added = [key for key in new if key not in old]
+    removed = [key for key in old if key not in new]
+    changed = [key for key, record in new.items() if key in old and old[key][1] != record[1]]
+    return added, removed, changed
+
+def incremental_merge(output_path: str = 'arcade_songs_output.json', snapshot_path: str = SNAPSHOT_NAME,
+                      changelog_path: Optional[str] = CHANGELOG_NAME) -> Dict:
+    """增量更新合并输出，返回变更日志
+
+    未变化的曲库不解析，只使用快照中的标题；变化的曲库逐曲比较摘要。受影响的标题重新生成分组，
+    其余分组直接从旧输出文件中按字节范围复制。没有可用快照时所有分组都视为新增，相当于完整合并
+    """
+    snapshot = load_snapshot(snapshot_path, output_path) or {'platforms': {}, 'groups': []}
+    old_groups = group_spans(snapshot)
+
+    records = {}
+    songs = {}
+    affected = set()
+    platform_changes = {}
+    for platform in PLATFORMS:
+        file_path, song_class = SOURCES[platform]
+        sha256 = file_sha256(file_path) if os.path.exists(file_path) else None
+        previous = snapshot['platforms'].get(platform)
+        if previous and previous['sha256'] == sha256:
+            records[platform] = previous
+            platform_changes[platform] = {'added': 0, 'removed': 0, 'changed': 0}
+            continue
+
+        song_dicts = [serializer.to_dict(song) for song in
+                      create_song_objects(read_json_file(file_path), song_class)]
+        new = {key: [song.get('title'), record_digest(song)]
+               for key, song in zip(record_keys(song_dicts), song_dicts)}
+        old = dict(zip(previous['keys'], zip(previous['titles'], previous['digests']))) if previous else {}
+        added, removed, changed = diff_records(old, new)
+        for key in added + changed:
+            affected.add(new[key][0])
+        for key in removed + changed:
+            affected.add(old[key][0])
+        platform_changes[platform] = {'added': len(added), 'removed': len(removed), 'changed': len(changed)}
+
+        songs[platform] = {}
+        for song in song_dicts:
+            songs[platform].setdefault(song.get('title'), song)
+        records[platform] = {
+            'sha256': sha256,
+            'keys': list(new),
+            'titles': [title for title, _ in new.values()],
+            'digests': [digest for _, digest in new.values()],
+        }
+
+    # 分组顺序与merge_arcade_songs一致：按chunithm、maimai、ongeki中首次出现的顺序
+    titles = {}
+    for platform in PLATFORMS:
+        titles.update(dict.fromkeys(records[platform]['titles']))
+
+    groups = {'added': [], 'removed': [title for title in old_groups if title not in titles], 'changed': []}
+    spans = []
+    partial_path = output_path + '.part'
+    old_data = b''
+    if old_groups:
+        with open(output_path, 'rb') as f:
+            old_data = f.read()
+    with open(partial_path, 'wb') as out:
+        out.write(b'[' if titles else b'[]')
+        separator = b'\n' + b' ' * INDENT
+        offset = 1
+        for title in titles:
+            out.write(separator)
+            offset += len(separator)
+            separator = b',\n' + b' ' * INDENT
+            span = old_groups.get(title)
+            old_bytes = old_data[span[0]:span[0] + span[1]] if span is not None else None
+            if span is not None and title not in affected:
+                data = old_bytes
+            else:
+                previous_group = json.loads(old_bytes) if old_bytes is not None else {}
+                group = {'title': title}
+                for platform in PLATFORMS:
+                    # 未变化的曲库沿用旧分组中的歌曲
+                    group[platform] = (songs[platform].get(title) if platform in songs
+                                       else previous_group.get(platform))
+                data = format_group(group)
+                if old_bytes is None:
+                    groups['added'].append(title)
+                elif data != old_bytes:
+                    groups['changed'].append(title)
+            spans.append([title, offset, len(data)])
+            out.write(data)
+            offset += len(data)
+        if titles:
+            out.write(b'\n]')
+    os.replace(partial_path, output_path)
+
+    stat = os.stat(output_path)
+    with open(snapshot_path + '.part', 'w', encoding='utf-8') as f:
+        json.dump({'output': [stat.st_size, stat.st_mtime_ns], 'platforms': records, 'groups': spans},
+                  f, ensure_ascii=False)
+    os.replace(snapshot_path + '.part', snapshot_path)
+
+    changelog = {'time': int(time.time()), 'songs': platform_changes, 'groups': groups}
+    if changelog_path:
+        with open(changelog_path, 'w', encoding='utf-8') as f:
+            json.dump(changelog, f, ensure_ascii=False, indent=2)
+    return changelog
+
+def changed_groups(changelog: Dict, output_path: str = 'arcade_songs_output.json',
+                   snapshot_path: str = SNAPSHOT_NAME) -> List[Dict]:
+    """按变更日志从输出文件中读取新增和变化的分组"""
+    with open(snapshot_path, 'r', encoding='utf-8') as f:
+        spans = group_spans(json.load(f))
+    result = []
+    with open(output_path, 'rb') as f:
+        for title in changelog['groups']['added'] + changelog['groups']['changed']:
+            f.seek(spans[title][0])
+            result.append(json.loads(f.read(spans[title][1])))
+    return result
+
+def summary(changelog: Dict) -> str:
+    groups = changelog['groups']
+    songs = ', '.join(f"{platform} +{c['added']} -{c['removed']} ~{c['changed']}"
+                      for platform, c in changelog['songs'].items())
+    return (f"分组: 新增 {len(groups['added'])}，删除 {len(groups['removed'])}，变化 {len(groups['changed'])}；"
+            f"歌曲: {songs}")
+
+# 导出
+__all__ = ["SNAPSHOT_NAME", "CHANGELOG_NAME", "record_digest", "record_keys", "load_snapshot", "group_spans",
+           "incremental_merge", "changed_groups", "summary"]
+
+if __name__ == '__main__':
+    print(summary(incremental_merge()))
@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 
+import sys
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Dict, Optional, List
 
-@dataclass
+# Fields whose values repeat across many songs (artists, categories, versions, levels)
+INTERNED_FIELDS = frozenset({
+    'artist', 'catname', 'catcode', 'category', 'version', 'release', 'date',
+    'newflag', 'new', 'chapter', 'character', 'copyright1', 'we_star',
+})
+
+@dataclass(slots=True)
 class Song:
     """Base class for all song types with common fields"""
     id: Optional[str] = None
@@ -18,7 +25,7 @@ class Song:
     image_url: Optional[str] = None
     image: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class ChunithmSong(Song):
     """Song class for Chunithm-specific data"""
     catname: Optional[str] = None
@@ -32,7 +39,7 @@ class ChunithmSong(Song):
     we_kanji: Optional[str] = None
     we_star: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class MaimaiSong(Song):
     """Song class for Maimai-specific data"""
     kanji: Optional[str] = None
@@ -56,7 +63,7 @@ class MaimaiSong(Song):
     comment: Optional[str] = None
     buddy: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class OngekiSong(Song):
     """Song class for Ongeki-specific data"""
     title_sort: Optional[str] = None
@@ -77,7 +84,7 @@ class OngekiSong(Song):
     lev_mas: Optional[str] = None
     lev_lnt: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class ArcadeSong:
     """Class containing arcade-specific song objects"""
     title: Optional[str] = None
@@ -85,9 +92,16 @@ class ArcadeSong:
     maimai: Optional[MaimaiSong] = None
     ongeki: Optional[OngekiSong] = None
 
-@dataclass
+@dataclass(slots=True)
 class SongJSON:
     songs: List[Song | ChunithmSong | MaimaiSong | OngekiSong]
 
+def intern_fields(data: Dict) -> Dict:
+    """Intern repeated string values in place so equal values share one object"""
+    for name, value in data.items():
+        if type(value) is str and (name in INTERNED_FIELDS or 'lev_' in name):
+            data[name] = sys.intern(value)
+    return data
+
 # Export all classes
-__all__ = ["Song", "ChunithmSong", "MaimaiSong", "OngekiSong", "ArcadeSong"]
\ No newline at end of file
+__all__ = ["Song", "ChunithmSong", "MaimaiSong", "OngekiSong", "ArcadeSong", "INTERNED_FIELDS", "intern_fields"]
\ No newline at end of file
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# 流式JSON读写：逐条解析顶层数组、按字节偏移回读单条记录、逐条写出JSON数组
+
+import codecs
+import json
+from typing import IO, Dict, Iterator, Optional, Tuple
+
+import serializer
+
+# 每次从文件读取的字节数
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r\ufeff'
+
+class _Reader:
+    """带UTF-8增量解码的缓冲读取器，pos为当前解析位置，offset为其对应的字节偏移"""
+
+    def __init__(self, f: IO[bytes], chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.offset = f.tell()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """丢弃已解析的部分并读取下一块数据，文件结束时返回False"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        self.eof = not chunk
+        self.buf = self.buf[self.pos:] + self.decoder.decode(chunk, final=self.eof)
+        self.pos = 0
+        return not self.eof
+
+    def consume(self, end: int):
+        """把解析位置前移到end"""
+        self.offset += len(self.buf[self.pos:end].encode('utf-8'))
+        self.pos = end
+
+    def peek(self) -> str:
+        """跳过空白后返回下一个字符，文件结束时返回空串"""
+        while True:
+            end = self.pos
+            while end < len(self.buf) and self.buf[end] in _WHITESPACE:
+                end += 1
+            self.consume(end)
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def value(self):
+        """解析当前位置的一个完整JSON值，数据不足时继续读取"""
+        while True:
+            try:
+                item, end = _decoder.raw_decode(self.buf, self.pos)
+                # 值恰好在缓冲区末尾结束时，可能是被截断的数字，需要再读一块确认
+                if end < len(self.buf) or self.eof:
+                    self.consume(end)
+                    return item
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+def iter_json_records(f: IO[bytes]) -> Iterator[Tuple[Optional[int], object]]:
+    """逐条产出顶层数组中的 (字节偏移, 记录)
+
+    顶层为 {"songs": [...]} 对象时无法逐条定位，整体解析后偏移为None
+    """
+    reader = _Reader(f)
+    first = reader.peek()
+    if first == '{':
+        for item in reader.value().get('songs', []):
+            yield None, item
+        return
+    if first != '[':
+        raise ValueError(f"不支持的JSON顶层结构: {first!r}")
+    reader.consume(reader.pos + 1)
+    while True:
+        char = reader.peek()
+        if char == ']':
+            return
+        if char == ',':
+            reader.consume(reader.pos + 1)
+            continue
+        if not char:
+            raise ValueError("JSON数组未正常结束")
+        offset = reader.offset
+        yield offset, reader.value()
+
+def read_record_at(f: IO[bytes], offset: int):
+    """从指定字节偏移处解析一条记录"""
+    f.seek(offset)
+    return _Reader(f, chunk_size=4096).value()
+
+def build_title_offsets(f: IO[bytes]) -> Dict[str, object]:
+    """按标题建立记录偏移索引，同名记录只保留第一条
+
+    无法定位偏移的记录直接保存记录本身
+    """
+    index = {}
+    for offset, item in iter_json_records(f):
+        title = item.get('title')
+        if title not in index:
+            index[title] = item if offset is None else offset
+    return index
+
+def load_indexed_record(f: IO[bytes], entry):
+    """读取build_title_offsets索引中的一条记录"""
+    if entry is None or isinstance(entry, dict):
+        return entry
+    return read_record_at(f, entry)
+
+class JSONArrayWriter:
+    """逐条写出JSON数组，输出与 json.dump(list, ensure_ascii=False, indent=indent) 完全一致
+
+    item可以是数据类对象，fast为True时使用orjson序列化（见serializer.dumps）
+    """
+
+    def __init__(self, f: IO[str], indent: int = 2, fast: bool = False):
+        self.f = f
+        self.indent = indent
+        self.fast = fast
+        self.count = 0
+        self._pad = ' ' * indent
+
+    def write(self, item):
+        text = serializer.dumps(item, indent=self.indent, fast=self.fast)
+        self.f.write(('[\n' if self.count == 0 else ',\n') + self._pad + text.replace('\n', '\n' + self._pad))
+        self.count += 1
+
+    def close(self):
+        self.f.write('\n]' if self.count else '[]')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+
+# 导出
+__all__ = ["iter_json_records", "read_record_at", "build_title_offsets", "load_indexed_record", "JSONArrayWriter"]
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# 跨平台曲目匹配：按规范化标题、读音（假名）和可选的模糊匹配把三个平台的同一首歌合并到一组
+# 用法: python3 matching.py [--mode normalized|fuzzy] [--threshold 0.75] [--show 20]
+# 合并时使用请运行 python3 testjson.py --match normalized（或 fuzzy）
+
+import argparse
+import math
+import re
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+# 匹配方式：exact与merge_arcade_songs完全一致；normalized增加规范化标题和读音匹配；fuzzy再增加模糊匹配
+MODES = ('exact', 'normalized', 'fuzzy')
+
+# 各平台中表示标题读音的字段
+READING_FIELDS = ('reading', 'title_kana', 'title_hiragana', 'title_katakana', 'title_sort')
+
+# 模糊匹配的默认相似度阈值（标题二元组的Dice系数）
+THRESHOLD = 0.75
+# 模糊匹配只比较规范化后不短于该长度的标题，过短的标题相似度没有区分度
+FUZZY_MIN_LENGTH = 4
+# 出现在过多标题中的二元组不参与分块，避免常见二元组让候选数退化为全部标题
+MAX_BLOCK = 200
+
+# 文字和数字以外的字符（空白、标点、符号）
+NON_WORD = re.compile(r'[\W_]+')
+
+def fold_kana(text: str) -> str:
+    """片假名转为平假名（ァ-ヶ），使假名写法不同的读音得到相同的键"""
+    return ''.join(chr(ord(ch) - 0x60) if 'ァ' <= ch <= 'ヶ' else ch for ch in text)
+
+def title_key(text: Optional[str]) -> str:
+    """规范化标题：NFKC（全角转半角、＆转&等）、忽略大小写、假名统一为平假名，只保留文字和数字
+
+    只由符号组成的标题去掉符号后为空，此时保留去掉空白后的符号
+    """
+    if not text:
+        return ''
+    text = fold_kana(unicodedata.normalize('NFKC', text).casefold())
+    key = NON_WORD.sub('', text)
+    return key or ''.join(text.split())
+
+def reading_key(song) -> str:
+    """歌曲读音的规范化键，取第一个非空的读音字段"""
+    for name in READING_FIELDS:
+        value = getattr(song, name, None)
+        if value:
+            return title_key(value)
+    return ''
+
+def grams(key: str) -> set:
+    return {key[i:i + 2] for i in range(len(key) - 1)}
+
+def similarity(a: set, b: set) -> float:
+    """两组二元组的Dice系数"""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+class TitleMatcher:
+    """按平台顺序逐首加入歌曲，把同一首歌归入同一组
+
+    每首歌依次尝试：标题完全一致、规范化标题一致、读音和艺术家均一致、模糊匹配（仅fuzzy模式）。
+    一组中每个平台最多一首，已有该平台歌曲的组不会再被匹配。模糊匹配用标题二元组分块，
+    只与至少共享一个二元组的组比较，相似度不低于阈值且艺术家一致（或缺失）时才合并
+    """
+
+    def __init__(self, platforms: List[str], mode: str = 'normalized', threshold: float = THRESHOLD):
+        if mode not in MODES:
+            raise ValueError(f"未知的匹配方式: {mode}")
+        self.platforms = platforms
+        self.mode = mode
+        self.threshold = threshold
+        self.groups: List[Dict] = []
+        self.by_title: Dict[str, List[int]] = {}
+        self.by_key: Dict[str, List[int]] = {}
+        self.by_reading: Dict[Tuple[str, str], List[int]] = {}
+        self.blocks: Dict[str, List[int]] = {}
+        self.gram_sets: Dict[int, set] = {}
+        self.artists: Dict[int, set] = {}
+        self.counts = dict.fromkeys(('exact', 'normalized', 'reading', 'fuzzy', 'new'), 0)
+        # 非完全一致的匹配 (方式, 平台, 歌曲标题, 组标题, 相似度)，用于人工核对
+        self.matches: List[Tuple[str, str, str, str, float]] = []
+
+    def free(self, positions: Optional[List[int]], platform: str) -> Optional[int]:
+        """第一个还没有该平台歌曲的组"""
+        for position in positions or ():
+            if self.groups[position][platform] is None:
+                return position
+        return None
+
+    def fuzzy(self, key: str, artist: str, platform: str) -> Tuple[Optional[int], float]:
+        """在共享二元组的组中找相似度最高的一个
+
+        Dice系数不低于阈值t时，两个标题至少共享 t*|Q|/(2-t) 个二元组，因此只需取查询中
+        最稀有的 |Q| - 该数 + 1 个二元组的分块作为候选（前缀过滤），再逐个计算相似度
+        """
+        if len(key) < FUZZY_MIN_LENGTH:
+            return None, 0.0
+        query = grams(key)
+        blocks = self.blocks
+        ordered = sorted(query, key=lambda gram: len(blocks.get(gram, ())))
+        min_overlap = math.ceil(self.threshold * len(query) / (2 - self.threshold))
+        candidates = set()
+        for gram in ordered[:len(query) - min_overlap + 1]:
+            block = blocks.get(gram)
+            if block and len(block) <= MAX_BLOCK:
+                candidates.update(block)
+        best, best_score = None, 0.0
+        for position in candidates:
+            if self.groups[position][platform] is not None:
+                continue
+            if artist and self.artists[position] and artist not in self.artists[position]:
+                continue
+            score = similarity(query, self.gram_sets[position])
+            if score >= self.threshold and score > best_score:
+                best, best_score = position, score
+        return best, best_score
+
+    @staticmethod
+    def keys(title: str, song) -> Tuple[str, str, str]:
+        """(规范化标题, 规范化艺术家, 读音键)"""
+        return title_key(title), title_key(getattr(song, 'artist', None)), reading_key(song)
+
+    def index(self, position: int, title: str, song, keys: Optional[Tuple[str, str, str]] = None):
+        """把组中新加入的歌曲的各个键加入索引"""
+        self.by_title.setdefault(title, []).append(position)
+        if self.mode == 'exact':
+            return
+        key, artist, reading = keys or self.keys(title, song)
+        self.by_key.setdefault(key, []).append(position)
+        if reading:
+            self.by_reading.setdefault((reading, artist), []).append(position)
+        if artist:
+            self.artists.setdefault(position, set()).add(artist)
+        else:
+            self.artists.setdefault(position, set())
+        if self.mode == 'fuzzy' and len(key) >= FUZZY_MIN_LENGTH and position not in self.gram_sets:
+            self.gram_sets[position] = key_grams = grams(key)
+            for gram in key_grams:
+                self.blocks.setdefault(gram, []).append(position)
+
+    def attach(self, position: int, platform: str, title: str, song, keys: Optional[Tuple[str, str, str]] = None):
+        self.groups[position][platform] = song
+        self.index(position, title, song, keys)
+
+    def add_platform(self, platform: str, songs: Dict[str, object]):
+        """加入一个平台的 标题 -> 歌曲 索引
+
+        先处理标题完全一致的歌曲，使其优先占用对应的组，再依次尝试其余匹配方式，
+        未匹配的歌曲按原顺序新建分组
+        """
+        pending = []
+        for title, song in songs.items():
+            position = self.free(self.by_title.get(title), platform)
+            if position is None:
+                pending.append((title, song))
+                continue
+            self.counts['exact'] += 1
+            self.attach(position, platform, title, song)
+
+        for title, song in pending:
+            position, method, score, keys = None, None, 1.0, None
+            if self.mode != 'exact':
+                keys = key, artist, reading = self.keys(title, song)
+                position, method = self.free(self.by_key.get(key), platform), 'normalized'
+                if position is None and reading:
+                    position, method = self.free(self.by_reading.get((reading, artist)), platform), 'reading'
+                if position is None and self.mode == 'fuzzy':
+                    (position, score), method = self.fuzzy(key, artist, platform), 'fuzzy'
+            if position is None:
+                self.counts['new'] += 1
+                position = len(self.groups)
+                self.groups.append(dict({name: None for name in self.platforms}, title=title))
+            else:
+                self.counts[method] += 1
+                self.matches.append((method, platform, title, self.groups[position]['title'], score))
+            self.attach(position, platform, title, song, keys)
+
+def match_groups(indexes: Dict[str, Dict[str, object]], mode: str = 'normalized',
+                 threshold: float = THRESHOLD) -> TitleMatcher:
+    """按indexes的平台顺序匹配，返回matcher；matcher.groups为 {'title', 平台: 歌曲或None} 的列表
+
+    组标题取最先出现的平台中的标题，分组顺序与merge_arcade_songs一致
+    """
+    matcher = TitleMatcher(list(indexes), mode, threshold)
+    for platform, songs in indexes.items():
+        matcher.add_platform(platform, songs)
+    return matcher
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='跨平台曲目匹配报告')
+    parser.add_argument('--mode', default='fuzzy', choices=MODES[1:], help='匹配方式')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='模糊匹配的相似度阈值')
+    parser.add_argument('--show', type=int, default=20, help='显示的非完全一致匹配数')
+    return parser.parse_args()
+
+# 导出
+__all__ = ["MODES", "THRESHOLD", "fold_kana", "title_key", "reading_key", "TitleMatcher", "match_groups"]
+
+if __name__ == '__main__':
+    from testjson import PLATFORMS, build_title_index, load_platform_songs
+    args = parse_arguments()
+    indexes = {platform: build_title_index(load_platform_songs(platform)) for platform in PLATFORMS}
+    for mode in ('exact', args.mode):
+        start = time.perf_counter()
+        matcher = match_groups(indexes, mode, args.threshold)
+        elapsed = time.perf_counter() - start
+        print(f"{mode}: {len(matcher.groups)} 组，{elapsed * 1000:.0f}ms，" +
+              '，'.join(f"{name} {count}" for name, count in matcher.counts.items()))
+    for method, platform, title, group_title, score in matcher.matches[:args.show]:
+        print(f"  [{method} {score:.2f}] {platform}: {title!r} -> {group_title!r}")
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# 轻量的耗时与计数统计：按阶段累计耗时、条目数和字节数，记录延迟直方图，
+# 输出JSON或Prometheus文本格式，并可选用cProfile/tracemalloc采集
+# 用法: python3 testjson.py --metrics metrics.json [--profile testjson.prof] [--tracemalloc]
+#       python3 import_data.py --metrics metrics.prom
+
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# 延迟直方图的桶上界（秒），与Prometheus客户端的默认值相同
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# Prometheus指标名前缀
+PREFIX = 'music_library'
+
+class Stage:
+    """一个处理阶段的累计值：调用次数、耗时、条目数和字节数"""
+
+    __slots__ = ('calls', 'seconds', 'items', 'bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.items = 0
+        self.bytes = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            'calls': self.calls,
+            'seconds': round(self.seconds, 6),
+            'items': self.items,
+            'bytes': self.bytes,
+            'items_per_second': round(self.items / self.seconds, 1) if self.seconds else None,
+        }
+
+class Histogram:
+    """固定桶的延迟直方图，counts[i]为落在第i个桶（不累计）的次数，最后一个为+Inf"""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        # 第一个不小于seconds的上界（Prometheus的le语义），超过全部上界时落入+Inf
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按桶上界估计分位数（落在+Inf桶时返回最后一个有限上界）"""
+        if not self.count:
+            return None
+        target = q * self.count
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= target:
+                return BUCKETS[min(index, len(BUCKETS) - 1)]
+        return BUCKETS[-1]
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(bound) for bound in BUCKETS] + ['+Inf'], self.counts)),
+        }
+
+class Metrics:
+    """线程安全的指标集合
+
+    stage()计时一个阶段并可在其中补充条目数和字节数；count()累加计数器；observe()记录一次延迟；
+    gauge()记录瞬时值（如内存峰值）。所有操作只在锁内做几次加法，可用于下载、导入等热循环
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Stage] = {}
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.gauges: Dict[str, float] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float = 0.0, items: int = 0, size: int = 0, calls: int = 1):
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = Stage()
+            stage.calls += calls
+            stage.seconds += seconds
+            stage.items += items
+            stage.bytes += size
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0, size: int = 0) -> Iterator[Dict]:
+        """计时一个阶段；with块中可以设置 record['items'] 和 record['bytes']"""
+        record = {'items': items, 'bytes': size}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.add(name, time.perf_counter() - start, record['items'], record['bytes'])
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+            self.histograms.clear()
+            self.gauges.clear()
+            self.started = time.time()
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                'started': self.started,
+                'elapsed': round(time.time() - self.started, 3),
+                'stages': {name: stage.to_dict() for name, stage in self.stages.items()},
+                'counters': dict(self.counters),
+                'histograms': {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+                'gauges': dict(self.gauges),
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus文本格式（0.0.4）"""
+        lines: List[str] = []
+        with self._lock:
+            for metric, attribute, help_text in (
+                ('stage_seconds_total', 'seconds', '各阶段累计耗时（秒）'),
+                ('stage_calls_total', 'calls', '各阶段调用次数'),
+                ('stage_items_total', 'items', '各阶段处理的条目数'),
+                ('stage_bytes_total', 'bytes', '各阶段读写的字节数'),
+            ):
+                lines.append(f"# HELP {PREFIX}_{metric} {help_text}")
+                lines.append(f"# TYPE {PREFIX}_{metric} counter")
+                for name, stage in self.stages.items():
+                    lines.append(f'{PREFIX}_{metric}{{stage="{name}"}} {getattr(stage, attribute)}')
+            for name, value in self.counters.items():
+                lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+                lines.append(f"{PREFIX}_{name}_total {value}")
+            for name, value in self.gauges.items():
+                lines.append(f"# TYPE {PREFIX}_{name} gauge")
+                lines.append(f"{PREFIX}_{name} {value}")
+            for name, histogram in self.histograms.items():
+                metric = f"{PREFIX}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                total = 0
+                for bound, count in zip([str(bound) for bound in BUCKETS] + ['+Inf'], histogram.counts):
+                    total += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {total}')
+                lines.append(f"{metric}_sum {histogram.sum}")
+                lines.append(f"{metric}_count {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """按扩展名写出：.prom/.txt为Prometheus文本格式，其余为JSON"""
+        text = self.to_prometheus() if os.path.splitext(path)[1] in ('.prom', '.txt') else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def report(self) -> str:
+        """各阶段的简短文本汇总"""
+        lines = [f"{'阶段':>16} {'耗时(s)':>9} {'条目':>9} {'条目/秒':>10} {'MB':>8}"]
+        for name, stage in self.summary()['stages'].items():
+            rate = f"{stage['items_per_second']:.0f}" if stage['items_per_second'] else '-'
+            lines.append(f"{name:>16} {stage['seconds']:>9.3f} {stage['items']:>9} {rate:>10} "
+                         f"{stage['bytes'] / 1024 / 1024:>8.1f}")
+        for name, histogram in self.histograms.items():
+            lines.append(f"{name}: {histogram.count} 次，p50≤{histogram.quantile(0.5)}s，p99≤{histogram.quantile(0.99)}s")
+        return '\n'.join(lines)
+
+# 进程内默认的指标集合，各模块直接调用下面的函数
+METRICS = Metrics()
+
+def stage(name: str, items: int = 0, size: int = 0):
+    return METRICS.stage(name, items, size)
+
+def add(name: str, seconds: float = 0.0, items: int = 0, size: int = 0, calls: int = 1):
+    METRICS.add(name, seconds, items, size, calls)
+
+def count(name: str, value: int = 1):
+    METRICS.count(name, value)
+
+def observe(name: str, seconds: float):
+    METRICS.observe(name, seconds)
+
+@contextmanager
+def profiling(profile_path: Optional[str] = None, trace_memory: bool = False, top: int = 20):
+    """可选的cProfile和tracemalloc采集
+
+    profile_path不为空时把cProfile结果写入该文件并输出累计耗时最多的函数；
+    trace_memory为True时记录内存峰值（gauge: memory_peak_bytes）并输出分配最多的代码行
+    """
+    profiler = cProfile.Profile() if profile_path else None
+    if trace_memory:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            print(f"cProfile结果已写入 {profile_path}")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(top)
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            METRICS.gauge('memory_peak_bytes', peak)
+            print(f"内存峰值: {peak / 1024 / 1024:.1f} MB，结束时仍占用内存最多的代码行:")
+            for statistic in snapshot.statistics('lineno')[:top]:
+                print(statistic)
+
+# 导出
+__all__ = ["BUCKETS", "Stage", "Histogram", "Metrics", "METRICS", "stage", "add", "count", "observe", "profiling"]
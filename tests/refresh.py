@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# 并发刷新三个SEGA曲库：带ETag/If-Modified-Since的条件请求，未变化的曲库不重新下载
+# 用法: python3 refresh.py [--force] [--timeout 30] [--insecure]
+# 合并前刷新请使用 python3 testjson.py --refresh，三个曲库均未变化时跳过合并
+
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import requests
+
+import metrics
+from downloader import CHUNK_SIZE, ImageManifest
+
+# 各平台曲库的下载地址（与refresh.sh一致），本地文件名见testjson.SOURCES
+CATALOG_URLS = {
+    'chunithm': "https://chunithm.sega.jp/storage/json/music.json",
+    'maimai': "https://maimai.sega.jp/data/maimai_songs.json",
+    'ongeki': "https://ongeki.sega.jp/assets/json/music/music.json",
+}
+
+CATALOG_FILES = {
+    'chunithm': 'chunithm_songs.json',
+    'maimai': 'maimai_songs.json',
+    'ongeki': 'ongeki_songs.json',
+}
+
+# 曲库状态文件，记录每个曲库的大小、ETag/Last-Modified和内容哈希（格式与图片清单相同）
+STATE_NAME = '.refresh_state.json'
+
+# 单个曲库的刷新结果
+UPDATED = 'updated'
+NOT_MODIFIED = 'not_modified'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+
+def fetch_catalog(platform: str, url: str, filepath: str, state: ImageManifest,
+                  session: Optional[requests.Session] = None, timeout: float = 30,
+                  verify: bool = True, force: bool = False) -> Tuple[str, float]:
+    """刷新单个曲库，返回 (结果, 耗时秒数)
+
+    本地文件与状态一致时发送条件请求，304表示未变化；服务器不支持条件请求时，
+    按内容哈希判断下载到的曲库是否变化。下载失败时保留原文件
+    """
+    start = time.perf_counter()
+    filename = os.path.basename(filepath)
+    try:
+        headers = {}
+        entry = state.get('catalog', filename)
+        if not force and state.matches(filepath, entry):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        session = session or requests
+        with session.get(url, headers=headers, stream=True, timeout=timeout, verify=verify) as response:
+            if response.status_code == 304 and headers:
+                metrics.add('fetch', time.perf_counter() - start)
+                metrics.count('catalogs_not_modified')
+                return NOT_MODIFIED, time.perf_counter() - start
+            response.raise_for_status()
+            digest = hashlib.sha256()
+            size = 0
+            partial_path = filepath + '.part'
+            with open(partial_path, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            os.replace(partial_path, filepath)
+
+        metrics.add('fetch', time.perf_counter() - start, 1, size)
+        sha256 = digest.hexdigest()
+        unchanged = entry is not None and entry.get('sha256') == sha256
+        metrics.count('catalogs_unchanged' if unchanged else 'catalogs_updated')
+        state.update('catalog', filename, {
+            'size': size,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': sha256,
+        })
+        return UNCHANGED if unchanged else UPDATED, time.perf_counter() - start
+    except Exception as e:
+        print(f"刷新曲库 {platform} 失败: {e}")
+        metrics.count('catalogs_failed')
+        return FAILED, time.perf_counter() - start
+
+def fetch_catalogs(root: str = '.', urls: Optional[Dict[str, str]] = None, state_path: Optional[str] = None,
+                   timeout: float = 30, verify: bool = True, force: bool = False) -> Dict[str, Tuple[str, float]]:
+    """同时刷新所有曲库，总耗时取决于最慢的一个；返回 平台 -> (结果, 耗时秒数)"""
+    urls = CATALOG_URLS if urls is None else urls
+    state = ImageManifest(state_path or os.path.join(root, STATE_NAME))
+    try:
+        with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+            futures = {
+                platform: pool.submit(fetch_catalog, platform, url, os.path.join(root, CATALOG_FILES[platform]),
+                                      state, timeout=timeout, verify=verify, force=force)
+                for platform, url in urls.items()
+            }
+            return {platform: future.result() for platform, future in futures.items()}
+    finally:
+        state.save()
+
+def catalogs_changed(results: Dict[str, Tuple[str, float]]) -> bool:
+    """是否有曲库内容发生变化，需要重新合并"""
+    return any(status == UPDATED for status, _ in results.values())
+
+def report(results: Dict[str, Tuple[str, float]]):
+    for platform, (status, elapsed) in results.items():
+        print(f"{platform}: {status}（{elapsed:.2f}s）")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='并发刷新三个SEGA曲库')
+    parser.add_argument('--force', action='store_true', help='忽略本地状态，重新下载全部曲库')
+    parser.add_argument('--timeout', type=float, default=30, help='每个请求的超时（秒）')
+    parser.add_argument('--insecure', action='store_true', help='不校验HTTPS证书')
+    return parser.parse_args()
+
+# 导出
+__all__ = ["CATALOG_URLS", "CATALOG_FILES", "STATE_NAME", "UPDATED", "NOT_MODIFIED", "UNCHANGED", "FAILED",
+           "fetch_catalog", "fetch_catalogs", "catalogs_changed", "report"]
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    start = time.perf_counter()
+    results = fetch_catalogs(timeout=args.timeout, verify=not args.insecure, force=args.force)
+    report(results)
+    print(f"刷新完成，耗时 {time.perf_counter() - start:.2f}s，{'有' if catalogs_changed(results) else '没有'}曲库变化")
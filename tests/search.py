@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# 曲库全文搜索：对标题、读音/假名、罗马字和艺术家建立字符二元组（bigram）倒排索引
+# 用法: python3 search.py 查询词 [--input arcade_songs_output.json] [--generate] [--limit 20]
+
+import argparse
+import json
+import os
+import time
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import serializer
+
+# 参与搜索的字段：分组标题以及各平台歌曲中的这些字段
+SONG_FIELDS = ('title', 'reading', 'title_kana', 'title_hiragana', 'title_katakana', 'title_romaji', 'artist')
+GAMES = ('chunithm', 'maimai', 'ongeki')
+# 各字段文本之间的分隔符，查询经过规范化后不会包含该字符，因此不会跨字段匹配
+SEPARATOR = '\x00'
+
+def normalize(text: str) -> str:
+    """NFKC规范化（全角转半角等）、忽略大小写并去掉空白"""
+    return ''.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+def group_texts(group: Dict) -> List[str]:
+    """分组中所有可搜索的文本（已规范化、去重），第一项为分组标题"""
+    title = group.get('title') or ''
+    values = {title: None}
+    for game in GAMES:
+        song = group.get(game)
+        if song:
+            for name in SONG_FIELDS:
+                value = song.get(name)
+                if value:
+                    values[value] = None
+    texts = {normalize(value): None for value in values}
+    return list(texts)
+
+def grams(text: str) -> set:
+    """文本中的全部字符二元组"""
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+class SearchIndex:
+    """二元组倒排索引
+
+    每个二元组对应一个按位置递增的分组位置数组（array('I')）。查询时取查询词中
+    最稀有二元组的倒排表作为候选，再用规范化后的文本做子串校验，因此结果与逐条
+    子串匹配完全一致；单字查询使用单字倒排表
+    """
+
+    def __init__(self, groups: List[Dict]):
+        self.groups = groups
+        self.postings: Dict[str, array] = {}
+        self.texts: List[str] = []
+        self.titles: List[str] = []
+        for position, group in enumerate(groups):
+            texts = group_texts(group)
+            text = SEPARATOR.join(texts)
+            self.texts.append(text)
+            self.titles.append(texts[0])
+            # 跨越分隔符的二元组不会被查询到，一并加入只是为了少做一次切分
+            keys = set(text)
+            keys.update(grams(text))
+            for key in keys:
+                posting = self.postings.get(key)
+                if posting is None:
+                    posting = self.postings[key] = array('I')
+                posting.append(position)
+
+    def candidates(self, query: str) -> Iterable[int]:
+        """包含查询词全部二元组的候选位置（取最稀有的一个倒排表）"""
+        keys = grams(query) if len(query) > 1 else {query}
+        best = None
+        for key in keys:
+            posting = self.postings.get(key)
+            if posting is None:
+                return ()
+            if best is None or len(posting) < len(best):
+                best = posting
+        return best
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """返回匹配的分组位置，依次按标题完全一致、标题前缀、标题包含、其他字段包含排序"""
+        query = normalize(query)
+        if not query:
+            return []
+        texts = self.texts
+        titles = self.titles
+        matches = [position for position in self.candidates(query) if query in texts[position]]
+        in_title = [position for position in matches if query in titles[position]]
+        if len(in_title) < len(matches):
+            others = [position for position in matches if query not in titles[position]]
+        else:
+            others = []
+        prefix = [position for position in in_title if titles[position].startswith(query)]
+        if prefix:
+            exact = [position for position in prefix if titles[position] == query]
+            prefix = exact + [position for position in prefix if titles[position] != query]
+            in_title = [position for position in in_title if not titles[position].startswith(query)]
+        results = prefix + in_title + others
+        return results[:limit] if limit else results
+
+def load_groups(path: str) -> List[Dict]:
+    """读取testjson.py输出的合并曲库"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='搜索合并后的曲库')
+    parser.add_argument('query', help='查询词（匹配标题、读音、假名、罗马字和艺术家）')
+    parser.add_argument('--input', default='arcade_songs_output.json', help='testjson.py输出的合并曲库')
+    parser.add_argument('--generate', action='store_true', help='直接由各平台JSON文件生成曲库，不读取--input')
+    parser.add_argument('--limit', type=int, default=20, help='最多显示的结果数')
+    return parser.parse_args()
+
+# 导出
+__all__ = ["normalize", "group_texts", "SearchIndex", "load_groups"]
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    start = time.perf_counter()
+    if args.generate or not os.path.exists(args.input):
+        from testjson import generate_arcade_songs
+        groups = serializer.to_dict(generate_arcade_songs())
+    else:
+        groups = load_groups(args.input)
+    index = SearchIndex(groups)
+    built = time.perf_counter()
+    results = index.search(args.query)
+    searched = time.perf_counter()
+
+    for position in results[:args.limit]:
+        group = groups[position]
+        games = [game for game in GAMES if group.get(game)]
+        artists = {group[game].get('artist') for game in games if group[game].get('artist')}
+        print(f"{group.get('title')}  [{', '.join(games)}]  {' / '.join(sorted(artists))}")
+    print(f"共 {len(results)} 条结果（{len(groups)} 组歌曲，建索引 {(built - start) * 1000:.0f}ms，"
+          f"查询 {(searched - built) * 1000:.2f}ms）")
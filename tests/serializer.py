@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# 数据类序列化：为每个数据类生成一次扁平的字段提取函数，可选使用orjson输出
+
+import json
+from dataclasses import fields, is_dataclass
+from types import UnionType
+from typing import Union, get_args, get_origin
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 可以直接输出、无需递归转换的字段类型
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+# 数据类 -> 字段提取函数
+_extractors = {}
+
+def _is_scalar(field_type) -> bool:
+    """字段类型是否为标量或标量的Optional/Union"""
+    if field_type in _SCALAR_TYPES:
+        return True
+    if get_origin(field_type) in (Union, UnionType):
+        return all(_is_scalar(arg) for arg in get_args(field_type))
+    return False
+
+def compile_extractor(cls):
+    """生成把数据类实例转换为字典的函数，标量字段直接读取，其余字段递归转换"""
+    items = []
+    for field in fields(cls):
+        if _is_scalar(field.type):
+            items.append(f"{field.name!r}: obj.{field.name}")
+        else:
+            items.append(f"{field.name!r}: None if obj.{field.name} is None else to_dict(obj.{field.name})")
+    source = "def extract(obj):\n    return {" + ", ".join(items) + "}\n"
+    namespace = {'to_dict': to_dict}
+    exec(compile(source, f"<extractor {cls.__name__}>", 'exec'), namespace)
+    return namespace['extract']
+
+def to_dict(obj):
+    """将数据类对象（或其列表）转换为字典，与原dataclass_to_dict的结果一致"""
+    extractor = _extractors.get(type(obj))
+    if extractor is not None:
+        return extractor(obj)
+    if is_dataclass(obj) and not isinstance(obj, type):
+        extractor = _extractors[type(obj)] = compile_extractor(type(obj))
+        return extractor(obj)
+    if isinstance(obj, list):
+        return [to_dict(item) for item in obj]
+    return obj
+
+def dumps(obj, indent: int = 2, fast: bool = False) -> str:
+    """序列化为JSON文本，格式与 json.dumps(ensure_ascii=False, indent=indent) 相同
+
+    fast为True且已安装orjson时使用orjson（仅支持缩进2），否则使用标准库。
+    orjson与标准库的差异只在带指数的浮点数和NaN上，SEGA曲库的字段均为字符串
+    """
+    data = to_dict(obj)
+    if fast and orjson is not None and indent == 2:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+        except TypeError:
+            # 超出64位的整数、非字符串键等orjson不支持的数据退回标准库
+            pass
+    return json.dumps(data, ensure_ascii=False, indent=indent)
+
+def dump(obj, f, indent: int = 2, fast: bool = False):
+    """序列化并写入文本文件，使用标准库时逐块写出"""
+    if fast and orjson is not None and indent == 2:
+        f.write(dumps(obj, indent=indent, fast=True))
+    else:
+        json.dump(to_dict(obj), f, ensure_ascii=False, indent=indent)
+
+# 导出
+__all__ = ["compile_extractor", "to_dict", "dumps", "dump"]
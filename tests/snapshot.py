@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# 二进制快照：把合并后的曲库写成 字符串表 + 定长记录 的紧凑文件，读取时用mmap打开，
+# 只在访问某条记录时才解码，打开时间与曲库大小无关
+# 用法: python3 snapshot.py [--input arcade_songs_output.json] [--output arcade_songs_output.snap]
+#       python3 snapshot.py --show 0 [--output arcade_songs_output.snap]
+# 合并时写出请使用 python3 testjson.py --snapshot arcade_songs_output.snap
+#
+# 文件布局（整数均为本机字节序，字节序记录在头部）:
+#   魔数 MAGIC (8字节) | 头部长度 (u32) | 头部JSON（版本、字节序、记录数、字段表、各段位置）
+#   记录段: 每条记录 width 个u32 —— 标题、平台位掩码、各平台每个字段的值编号
+#   偏移段: 字符串数+1 个u32，第i个值为字符串i在数据段中的起止位置
+#   数据段: 全部不同值的UTF-8拼接；非字符串的值（整数等）以JSON文本保存并在编号上加 JSON_FLAG
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from dataclasses import fields
+from typing import Dict, Iterable, List, Optional
+
+from jsondata import ChunithmSong, MaimaiSong, OngekiSong
+
+MAGIC = b'MLSNAP\x00\x01'
+VERSION = 1
+
+PLATFORMS = ('chunithm', 'maimai', 'ongeki')
+SONG_CLASSES = {'chunithm': ChunithmSong, 'maimai': MaimaiSong, 'ongeki': OngekiSong}
+# platforms列中各平台对应的位，与columnar.py相同
+PLATFORM_BITS = {'chunithm': 1, 'maimai': 2, 'ongeki': 4}
+
+# 值编号：NONE表示None，带JSON_FLAG的编号对应JSON文本
+NONE = 0xFFFFFFFF
+JSON_FLAG = 0x80000000
+
+# 各段按8字节对齐
+ALIGNMENT = 8
+# 为头部预留的空间，记录段从这里开始
+HEADER_SPACE = 64 * 1024
+
+def default_fields() -> Dict[str, List[str]]:
+    """各平台的字段名，与jsondata中的dataclass一致"""
+    return {platform: [field.name for field in fields(SONG_CLASSES[platform])] for platform in PLATFORMS}
+
+def padding(position: int) -> bytes:
+    return b'\0' * (-position % ALIGNMENT)
+
+class SnapshotWriter:
+    """逐组写出快照；记录边追加边写入临时文件，关闭时写出字符串表和头部，再替换目标文件
+
+    可用于流式合并：内存中只保存不同值的编号表
+    """
+
+    def __init__(self, path: str, platform_fields: Optional[Dict[str, List[str]]] = None):
+        self.path = path
+        self.fields = platform_fields or default_fields()
+        self.width = 2 + sum(len(names) for names in self.fields.values())
+        self.count = 0
+        self.ids: Dict[object, int] = {}
+        self.blob = bytearray()
+        self.offsets = array('I', [0])
+        self.file = open(path + '.part', 'wb')
+        # 头部在关闭时才能确定，先跳过预留的空间
+        self.file.seek(HEADER_SPACE)
+
+    def value_id(self, value) -> int:
+        if value is None:
+            return NONE
+        key = value if isinstance(value, str) else (type(value).__name__, value)
+        sid = self.ids.get(key)
+        if sid is None:
+            if isinstance(value, str):
+                sid = len(self.offsets) - 1
+                self.blob += value.encode('utf-8')
+            else:
+                sid = (len(self.offsets) - 1) | JSON_FLAG
+                self.blob += json.dumps(value, ensure_ascii=False).encode('utf-8')
+            if len(self.offsets) - 1 >= JSON_FLAG:
+                raise ValueError("快照中不同的值过多")
+            self.offsets.append(len(self.blob))
+            self.ids[key] = sid
+        return sid
+
+    def add(self, group: Dict):
+        """追加一组合并后的曲目（ArcadeSong的字典形式）"""
+        record = array('I', [self.value_id(group.get('title')), 0])
+        mask = 0
+        for platform, names in self.fields.items():
+            song = group.get(platform)
+            if song is None:
+                record.extend([NONE] * len(names))
+                continue
+            mask |= PLATFORM_BITS[platform]
+            record.extend(self.value_id(song.get(name)) for name in names)
+        record[1] = mask
+        record.tofile(self.file)
+        self.count += 1
+
+    def extend(self, groups: Iterable[Dict]):
+        for group in groups:
+            self.add(group)
+        return self
+
+    def close(self):
+        if self.file is None:
+            return
+        f = self.file
+        self.file = None
+        try:
+            position = f.tell()
+            f.write(padding(position))
+            offsets_start = position + len(padding(position))
+            self.offsets.tofile(f)
+            position = f.tell()
+            f.write(padding(position))
+            blob_start = f.tell()
+            f.write(self.blob)
+            header = json.dumps({
+                'version': VERSION,
+                'byteorder': sys.byteorder,
+                'count': self.count,
+                'width': self.width,
+                'fields': self.fields,
+                'strings': len(self.offsets) - 1,
+                'records': HEADER_SPACE,
+                'offsets': offsets_start,
+                'blob': blob_start,
+                'size': f.tell(),
+            }).encode('utf-8')
+            if len(MAGIC) + 4 + len(header) > HEADER_SPACE:
+                raise ValueError("快照头部过大")
+            f.seek(0)
+            f.write(MAGIC + struct.pack('<I', len(header)) + header)
+        except BaseException:
+            f.close()
+            os.remove(self.path + '.part')
+            raise
+        f.close()
+        os.replace(self.path + '.part', self.path)
+
+    def abort(self):
+        """放弃写出，删除临时文件"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            os.remove(self.path + '.part')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def write_snapshot(groups: Iterable[Dict], path: str) -> int:
+    """把合并后的曲库写成快照，返回记录数"""
+    with SnapshotWriter(path) as writer:
+        writer.extend(groups)
+    return writer.count
+
+class Snapshot(Sequence):
+    """只读打开快照，按下标返回与JSON中相同的分组字典
+
+    打开时只读取头部；记录和字符串在访问时才解码，解码过的值按编号缓存
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._mmap[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"不是快照文件: {path}")
+            length, = struct.unpack_from('<I', self._mmap, len(MAGIC))
+            header = json.loads(self._mmap[len(MAGIC) + 4:len(MAGIC) + 4 + length])
+            if header['version'] != VERSION:
+                raise ValueError(f"不支持的快照版本: {header['version']}")
+            if header['byteorder'] != sys.byteorder:
+                raise ValueError(f"快照的字节序为 {header['byteorder']}，请在本机重新生成")
+            if header['size'] != len(self._mmap):
+                raise ValueError(f"快照文件不完整: {path}")
+        except BaseException:
+            self._mmap.close()
+            raise
+        self.header = header
+        self.count = header['count']
+        self.width = header['width']
+        self.fields = header['fields']
+        view = memoryview(self._mmap)
+        self._records = view[header['records']:header['records'] + self.count * self.width * 4].cast('I')
+        self._offsets = view[header['offsets']:header['blob']].cast('I')
+        self._blob = view[header['blob']:]
+        self._views = (view, self._records, self._offsets, self._blob)
+        self._values = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def value(self, sid: int):
+        """按编号解码一个值"""
+        if sid == NONE:
+            return None
+        value = self._values.get(sid)
+        if value is None:
+            index = sid & ~JSON_FLAG
+            text = str(self._blob[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+            value = json.loads(text) if sid & JSON_FLAG else text
+            self._values[sid] = value
+        return value
+
+    def platforms(self, position: int) -> int:
+        """该分组的平台位掩码，不解码记录"""
+        return self._records[position * self.width + 1]
+
+    def column_index(self, name: str, platform: Optional[str] = None) -> int:
+        """字段在记录中的位置；platform为None时name只能是title或platforms"""
+        if platform is None:
+            return ('title', 'platforms').index(name)
+        column = 2
+        for other, names in self.fields.items():
+            if other == platform:
+                return column + names.index(name)
+            column += len(names)
+        raise ValueError(f"未知平台: {platform}")
+
+    def column(self, name: str, platform: Optional[str] = None) -> List:
+        """全部分组某一字段的值（未收录的平台为None），按步长切片读取，不解码整条记录"""
+        ids = self._records[self.column_index(name, platform)::self.width].tolist()
+        if name == 'platforms' and platform is None:
+            return ids
+        value = self.value
+        return [value(sid) for sid in ids]
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(self.count))]
+        if position < 0:
+            position += self.count
+        if not 0 <= position < self.count:
+            raise IndexError(position)
+        start = position * self.width
+        record = self._records[start:start + self.width]
+        value = self.value
+        group = {'title': value(record[0])}
+        mask = record[1]
+        column = 2
+        for platform, names in self.fields.items():
+            if mask & PLATFORM_BITS[platform]:
+                group[platform] = {name: value(record[column + i]) for i, name in enumerate(names)}
+            else:
+                group[platform] = None
+            column += len(names)
+        return group
+
+    def close(self):
+        """释放全部视图后关闭mmap；仍被引用的分组字典不受影响"""
+        if self._mmap.closed:
+            return
+        for view in reversed(self._views):
+            view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='合并曲库的二进制快照')
+    parser.add_argument('--input', default='arcade_songs_output.json', help='testjson.py输出的合并曲库')
+    parser.add_argument('--output', default='arcade_songs_output.snap', help='快照文件')
+    parser.add_argument('--show', type=int, default=None, help='不写出，只显示快照中该位置的分组')
+    return parser.parse_args()
+
+# 导出
+__all__ = ["MAGIC", "VERSION", "NONE", "JSON_FLAG", "default_fields", "SnapshotWriter", "write_snapshot", "Snapshot"]
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    if args.show is not None:
+        with Snapshot(args.output) as snapshot:
+            print(f"{len(snapshot)} 组，{snapshot.header['strings']} 个不同的值，每条记录 {snapshot.width * 4} 字节")
+            print(json.dumps(snapshot[args.show], ensure_ascii=False, indent=2))
+    else:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            count = write_snapshot(json.load(f), args.output)
+        print(f"已写出 {args.output}: {count} 组，{os.path.getsize(args.output) / 1024 / 1024:.1f} MB")
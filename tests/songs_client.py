@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# 歌曲API列表客户端：分页导出整个曲库，支持页码（OFFSET）和游标（add_time, id）两种分页方式
+# 用法: python3 songs_client.py [--base-url URL] [--mode keyset|offset] [--output library.json]
+
+import argparse
+import logging
+import time
+from typing import Dict, Iterator, List, Optional
+
+import requests
+
+from jsonstream import JSONArrayWriter
+
+# 与import_data.py相同的默认服务器
+BASE_URL = "https://your-default-base-url.com"
+
+MODES = ('keyset', 'offset')
+
+# 需要重试的状态码
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class SongsClient:
+    """GET /api/Songs 的分页客户端
+
+    offset模式按page=1,2,3...请求，服务器每页都要跳过前面的所有行；keyset模式把上一页
+    返回的nextCursor（最后一首的add_time和id）作为afterTime/afterId传回，每页的开销相同。
+    服务器不返回nextCursor（旧版API）时自动改用offset模式继续
+    """
+
+    def __init__(self, base_url: str = BASE_URL, session: Optional[requests.Session] = None,
+                 timeout: float = 30, retries: int = 3, backoff: float = 0.5, page_size: Optional[int] = None):
+        self.base_url = base_url.rstrip('/')
+        # 每页歌曲数，None时使用服务器默认值（20），服务器最多接受500
+        self.page_size = page_size
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.requests = 0
+
+    def get_page(self, page: int = 1, cursor: Optional[Dict] = None) -> Dict:
+        """请求一页，cursor为上一页的nextCursor；网络错误和5xx/429按指数退避重试"""
+        params = {'page': page}
+        if self.page_size:
+            params['pageSize'] = self.page_size
+        if cursor:
+            params.update(afterTime=cursor['afterTime'], afterId=cursor['afterId'])
+        for attempt in range(self.retries + 1):
+            try:
+                self.requests += 1
+                response = self.session.get(f"{self.base_url}/api/Songs", params=params, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    return response.json()
+                error = requests.HTTPError(f"{response.status_code} {response.reason}", response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        raise error
+
+    def iter_pages(self, mode: str = 'keyset') -> Iterator[List[Dict]]:
+        """按add_time倒序逐页返回歌曲列表"""
+        if mode not in MODES:
+            raise ValueError(f"未知的分页方式: {mode}")
+        page = 1
+        cursor = None
+        while True:
+            data = self.get_page(page, cursor if mode == 'keyset' else None)
+            songs = data.get('songs') or []
+            if songs:
+                yield songs
+            if len(songs) < (data.get('pageSize') or len(songs) or 1):
+                return
+            page += 1
+            if mode == 'keyset':
+                cursor = data.get('nextCursor')
+                if cursor is None:
+                    logging.warning("服务器未返回nextCursor，改用页码分页")
+                    mode = 'offset'
+
+    def iter_songs(self, mode: str = 'keyset') -> Iterator[Dict]:
+        for songs in self.iter_pages(mode):
+            yield from songs
+
+def export_library(client: SongsClient, path: str, mode: str = 'keyset') -> int:
+    """把整个曲库逐首写入JSON文件，返回歌曲数"""
+    with open(path, 'w', encoding='utf-8') as f, JSONArrayWriter(f) as writer:
+        for song in client.iter_songs(mode):
+            writer.write(song)
+    return writer.count
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='分页导出歌曲库')
+    parser.add_argument('--base-url', default=BASE_URL, help='API服务器地址')
+    parser.add_argument('--mode', default='keyset', choices=MODES, help='分页方式')
+    parser.add_argument('--output', default='library.json', help='输出文件')
+    parser.add_argument('--timeout', type=float, default=30, help='每个请求的超时（秒）')
+    parser.add_argument('--page-size', type=int, default=None, help='每页歌曲数，默认使用服务器默认值，最多500')
+    return parser.parse_args()
+
+# 导出
+__all__ = ["SongsClient", "export_library"]
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_arguments()
+    client = SongsClient(args.base_url, timeout=args.timeout, page_size=args.page_size)
+    start = time.perf_counter()
+    count = export_library(client, args.output, args.mode)
+    logging.info(f"导出 {count} 首到 {args.output}，{client.requests} 个请求，耗时 {time.perf_counter() - start:.2f}s")
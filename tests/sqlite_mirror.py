@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# Song表的本地SQLite镜像：按DATABASE.sql/INITDB.sql建库，附加FTS5全文索引和分类+时间索引，
+# 数据来自list.txt或testjson.py输出的合并曲库，用于离线查询
+# 用法: python3 sqlite_mirror.py build [--db mirror.db] [--list list.txt] [--arcade arcade_songs_output.json] [--fresh]
+#       python3 sqlite_mirror.py search 查询词 [--db mirror.db] [--type all] [--category 0] [--page 1] [--like]
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_PATH = os.path.join(ROOT_DIR, 'DATABASE.sql')
+INITDB_PATH = os.path.join(ROOT_DIR, 'INITDB.sql')
+
+PAGE_SIZE = 20
+
+# 合并曲库中各平台对应的分类（INITDB.sql中的插入顺序）
+ARCADE_CATEGORIES = {'maimai': 5, 'ongeki': 6, 'chunithm': 7}
+
+# 镜像附加的索引：
+# - (category_id, add_time) 覆盖按分类筛选并按时间倒序分页的查询，rowid（id）隐含在索引中
+# - add_time 覆盖不带分类的 GetSongs 排序（DATABASE.sql 已包含，这里为旧的镜像补建）
+# - SongFts 为外部内容FTS5表，trigram分词器支持任意位置的子串匹配（与 LIKE '%q%' 语义一致），
+#   触发器保持其与Song表同步
+MIRROR_SQL = """
+CREATE INDEX IF NOT EXISTS idx_song_category_time ON Song (category_id, add_time);
+CREATE INDEX IF NOT EXISTS idx_song_add_time ON Song (add_time);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS SongFts USING fts5(
+    title, title_hiragana, title_katakana, title_romaji, artist,
+    content='Song', content_rowid='id', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS song_fts_insert AFTER INSERT ON Song BEGIN
+    INSERT INTO SongFts (rowid, title, title_hiragana, title_katakana, title_romaji, artist)
+    VALUES (new.id, new.title, new.title_hiragana, new.title_katakana, new.title_romaji, new.artist);
+END;
+
+CREATE TRIGGER IF NOT EXISTS song_fts_delete AFTER DELETE ON Song BEGIN
+    INSERT INTO SongFts (SongFts, rowid, title, title_hiragana, title_katakana, title_romaji, artist)
+    VALUES ('delete', old.id, old.title, old.title_hiragana, old.title_katakana, old.title_romaji, old.artist);
+END;
+
+CREATE TRIGGER IF NOT EXISTS song_fts_update AFTER UPDATE ON Song BEGIN
+    INSERT INTO SongFts (SongFts, rowid, title, title_hiragana, title_katakana, title_romaji, artist)
+    VALUES ('delete', old.id, old.title, old.title_hiragana, old.title_katakana, old.title_romaji, old.artist);
+    INSERT INTO SongFts (rowid, title, title_hiragana, title_katakana, title_romaji, artist)
+    VALUES (new.id, new.title, new.title_hiragana, new.title_katakana, new.title_romaji, new.artist);
+END;
+"""
+
+# 与 SongsController.SearchSongs 相同的查询列
+SELECT_SQL = """
+    SELECT s.id, s.title, s.title_hiragana, s.title_katakana, s.title_romaji,
+           s.artist, s.description, s.category_id, s.add_time, s.from_platform, s.from_url, s.image_url,
+           c.name as category_name, c.name_english as category_name_english,
+           p.name as platform_name, p.type as platform_type, p.url as platform_url
+    FROM Song s
+    LEFT JOIN Category c ON s.category_id = c.id
+    LEFT JOIN Platform p ON s.from_platform = p.id
+    WHERE 1=1 """
+
+# 各搜索类型对应的列
+SEARCH_COLUMNS = {
+    'title': ('title', 'title_hiragana', 'title_katakana', 'title_romaji'),
+    'artist': ('artist',),
+    'all': ('title', 'title_hiragana', 'title_katakana', 'title_romaji', 'artist'),
+}
+
+# trigram分词器至少需要3个字符，更短的查询只能扫描
+FTS_MIN_LENGTH = 3
+
+SONG_COLUMNS = ('title', 'title_hiragana', 'title_katakana', 'title_romaji', 'artist',
+                'description', 'category_id', 'add_time', 'from_platform', 'from_url', 'image_url')
+
+def create_schema(con: sqlite3.Connection, mirror: bool = True, initdb: bool = True):
+    """执行DATABASE.sql（和INITDB.sql），mirror为True时再创建全文索引和附加索引"""
+    with open(SCHEMA_PATH, 'r', encoding='utf-8') as f:
+        con.executescript(f.read())
+    if initdb:
+        with open(INITDB_PATH, 'r', encoding='utf-8') as f:
+            con.executescript(f.read())
+    if mirror:
+        con.executescript(MIRROR_SQL)
+
+def open_mirror(path: str, fresh: bool = False) -> sqlite3.Connection:
+    """打开镜像数据库，不存在或fresh为True时重新建库"""
+    if fresh and os.path.exists(path):
+        os.remove(path)
+    exists = os.path.exists(path)
+    con = sqlite3.connect(path)
+    con.row_factory = sqlite3.Row
+    if not exists:
+        create_schema(con)
+    else:
+        # 旧的镜像补建附加索引，IF NOT EXISTS 保证可重复执行
+        con.executescript(MIRROR_SQL)
+    return con
+
+def rows_from_list(list_path: str) -> List[Tuple]:
+    """解析list.txt，与import_data.py使用同一解析逻辑"""
+    from import_data import import_from_list_file
+    entries, skipped = import_from_list_file(list_path)
+    for line in skipped:
+        print(line)
+    return [(entry['Title'], None, None, None, entry['Artist'], None,
+             entry['CategoryId'], entry['AddTime'], None, None, None) for entry in entries]
+
+def rows_from_arcade(groups: Iterable[Dict], add_time: Optional[int] = None) -> List[Tuple]:
+    """合并曲库中每个平台的歌曲各占一行，分类按平台区分"""
+    add_time = int(time.time()) if add_time is None else add_time
+    rows = []
+    for group in groups:
+        for game, category_id in ARCADE_CATEGORIES.items():
+            song = group.get(game)
+            if not song:
+                continue
+            rows.append((
+                song.get('title') or group.get('title'),
+                song.get('title_hiragana'),
+                song.get('title_katakana') or song.get('title_kana') or song.get('reading'),
+                song.get('title_romaji'),
+                song.get('artist') or '',
+                None,
+                category_id,
+                add_time,
+                None,
+                None,
+                song.get('image_url') or song.get('image'),
+            ))
+    return rows
+
+def insert_rows(con: sqlite3.Connection, rows: Iterable[Tuple]) -> int:
+    """在一个事务中批量插入歌曲，全文索引由触发器同步"""
+    sql = f"INSERT INTO Song ({', '.join(SONG_COLUMNS)}) VALUES ({', '.join('?' * len(SONG_COLUMNS))})"
+    with con:
+        cursor = con.executemany(sql, rows)
+    return cursor.rowcount
+
+def fts_phrase(query: str) -> str:
+    """把查询词转换为FTS5短语（双引号转义）"""
+    return '"' + query.replace('"', '""') + '"'
+
+def search_sql(query: str = '', search_type: str = 'all', category: int = 0,
+               page: int = 1, use_fts: bool = True) -> Tuple[str, List]:
+    """生成与SearchSongs等价的查询；use_fts为False时使用原来的 LIKE '%q%'"""
+    sql = SELECT_SQL
+    params = []
+    if category:
+        sql += "AND s.category_id = ? "
+        params.append(category)
+    if query:
+        columns = SEARCH_COLUMNS[search_type]
+        if use_fts and len(query) >= FTS_MIN_LENGTH:
+            match = fts_phrase(query)
+            if search_type != 'all':
+                match = '{' + ' '.join(columns) + '} : ' + match
+            sql += "AND s.id IN (SELECT rowid FROM SongFts WHERE SongFts MATCH ?) "
+            params.append(match)
+        else:
+            sql += "AND (" + " OR ".join(f"s.{column} LIKE ?" for column in columns) + ") "
+            params.extend([f"%{query}%"] * len(columns))
+    sql += "ORDER BY s.add_time DESC LIMIT ? OFFSET ?"
+    params.extend([PAGE_SIZE, (max(1, page) - 1) * PAGE_SIZE])
+    return sql, params
+
+def list_sql(page: int = 1, cursor: Optional[Dict] = None) -> Tuple[str, List]:
+    """生成与GetSongs等价的查询；cursor为上一页的nextCursor时按 (add_time, id) 游标分页"""
+    sql = SELECT_SQL
+    params = []
+    if cursor:
+        # 单独的 add_time <= ? 让索引按范围定位到游标处，OR 条件只过滤同一时间的歌曲
+        sql += "AND s.add_time <= ? AND (s.add_time < ? OR s.id < ?) "
+        params.extend([cursor['afterTime'], cursor['afterTime'], cursor['afterId']])
+    sql += "ORDER BY s.add_time DESC, s.id DESC LIMIT ? OFFSET ?"
+    params.extend([PAGE_SIZE, 0 if cursor else (max(1, page) - 1) * PAGE_SIZE])
+    return sql, params
+
+def search(con: sqlite3.Connection, query: str = '', search_type: str = 'all', category: int = 0,
+           page: int = 1, use_fts: bool = True) -> List[sqlite3.Row]:
+    """按SearchSongs的语义查询一页歌曲"""
+    sql, params = search_sql(query, search_type, category, page, use_fts)
+    return con.execute(sql, params).fetchall()
+
+def explain(con: sqlite3.Connection, sql: str, params: List) -> List[str]:
+    """查询计划（EXPLAIN QUERY PLAN 的detail列）"""
+    return [row[3] for row in con.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Song表的本地SQLite镜像')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help='建库并导入歌曲')
+    build.add_argument('--db', default='mirror.db', help='镜像数据库文件')
+    build.add_argument('--list', default=None, help='从list.txt导入')
+    build.add_argument('--arcade', default=None, help='从testjson.py输出的合并曲库导入')
+    build.add_argument('--fresh', action='store_true', help='删除已有的镜像后重新建库')
+
+    query = sub.add_parser('search', help='按SearchSongs的语义查询')
+    query.add_argument('query', nargs='?', default='', help='查询词')
+    query.add_argument('--db', default='mirror.db', help='镜像数据库文件')
+    query.add_argument('--type', default='all', choices=sorted(SEARCH_COLUMNS), help='搜索类型')
+    query.add_argument('--category', type=int, default=0, help='分类ID，0表示全部')
+    query.add_argument('--page', type=int, default=1, help='页码')
+    query.add_argument('--like', action='store_true', help='使用原来的LIKE查询而不是全文索引')
+    query.add_argument('--plan', action='store_true', help='同时输出查询计划')
+
+    return parser.parse_args()
+
+# 导出
+__all__ = ["create_schema", "open_mirror", "rows_from_list", "rows_from_arcade", "insert_rows",
+           "search_sql", "list_sql", "search", "explain"]
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    if args.command == 'build':
+        con = open_mirror(args.db, fresh=args.fresh)
+        if args.list is None and args.arcade is None:
+            args.list = 'list.txt'
+        if args.list:
+            print(f"从 {args.list} 导入 {insert_rows(con, rows_from_list(args.list))} 首")
+        if args.arcade:
+            with open(args.arcade, 'r', encoding='utf-8') as f:
+                groups = json.load(f)
+            print(f"从 {args.arcade} 导入 {insert_rows(con, rows_from_arcade(groups))} 首")
+        total = con.execute("SELECT COUNT(*) FROM Song").fetchone()[0]
+        print(f"{args.db}: 共 {total} 首")
+    else:
+        con = open_mirror(args.db)
+        start = time.perf_counter()
+        sql, params = search_sql(args.query, args.type, args.category, args.page, use_fts=not args.like)
+        rows = con.execute(sql, params).fetchall()
+        elapsed = time.perf_counter() - start
+        for row in rows:
+            print(f"{row['id']:>8}  {row['title']}  /  {row['artist']}  [{row['category_name']}]")
+        print(f"{len(rows)} 条结果，耗时 {elapsed * 1000:.2f}ms")
+        if args.plan:
+            for detail in explain(con, sql, params):
+                print(f"  {detail}")
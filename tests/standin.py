@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# 本地HTTP替身服务器，用于在不访问SEGA官网或正式API的情况下验证下载与导入流程
+
+import hashlib
+import json
+import sys
+import threading
+import time
+from bisect import bisect_right
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # 加大监听队列，避免高并发测试时连接被拒后等待重传
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # 客户端被中途结束导致的断开属于预期情况
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+class StandinServer:
+    """在后台线程中运行的本地HTTP服务器，端口随机分配"""
+
+    def __init__(self, handler_class):
+        self.handler_class = handler_class
+        self.server = None
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.server = _Server(('127.0.0.1', 0), self.handler_class)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """不输出访问日志的请求处理器基类"""
+    protocol_version = 'HTTP/1.1'
+    # 关闭Nagle算法，避免小响应被延迟确认拖慢
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+def file_handler(files: Dict[str, bytes], latency: float = 0, content_type: str = 'application/octet-stream',
+                 etag: bool = True, modified: Optional[Dict[str, float]] = None):
+    """生成静态文件替身服务器的处理器，按路径末尾的文件名返回files中的内容
+
+    etag为True时响应带有基于内容哈希的ETag，支持If-None-Match；modified给出文件名对应的
+    修改时间时响应带有Last-Modified，支持If-Modified-Since。files和modified可在运行中修改
+    """
+    stats = {'requests': 0, 'not_modified': 0, 'bytes': 0}
+    lock = threading.Lock()
+
+    class FileHandler(QuietHandler):
+        def send_validators(self, tag: Optional[str], mtime: Optional[float]):
+            if tag:
+                self.send_header('ETag', tag)
+            if mtime is not None:
+                self.send_header('Last-Modified', formatdate(mtime, usegmt=True))
+
+        def do_GET(self):
+            with lock:
+                stats['requests'] += 1
+            # 模拟网络往返延迟
+            if latency:
+                time.sleep(latency)
+            name = self.path.rsplit('/', 1)[-1]
+            body = files.get(name)
+            if body is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            tag = '"%s"' % hashlib.sha256(body).hexdigest()[:16] if etag else None
+            mtime = modified.get(name) if modified else None
+            if tag and self.headers.get('If-None-Match') is not None:
+                fresh = self.headers.get('If-None-Match') == tag
+            else:
+                since = self.headers.get('If-Modified-Since')
+                fresh = mtime is not None and since is not None and int(mtime) <= parsedate_to_datetime(since).timestamp()
+            if fresh:
+                with lock:
+                    stats['not_modified'] += 1
+                self.send_response(304)
+                self.send_validators(tag, mtime)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            with lock:
+                stats['bytes'] += len(body)
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_validators(tag, mtime)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    FileHandler.stats = stats
+    return FileHandler
+
+def image_handler(images: Dict[str, bytes], latency: float = 0):
+    """生成图片替身服务器的处理器，响应带有基于内容哈希的ETag，支持If-None-Match条件请求"""
+    return file_handler(images, latency, content_type='image/png')
+
+# GET /api/Songs 的pageSize上限（与SongsController.MaxPageSize一致）
+MAX_PAGE_SIZE = 500
+
+def song_key(song: Dict) -> str:
+    """歌曲的 Title|Artist 键，字段名大小写不敏感（与ASP.NET模型绑定一致）"""
+    fields = {name.lower(): value for name, value in song.items()}
+    return f"{fields.get('title')}|{fields.get('artist')}"
+
+def api_handler(latency: float = 0, fail_every: int = 0, fail_status: int = 503, existing=(), batch: bool = True,
+                page_size: int = 20, retry_after: Optional[str] = '0'):
+    """生成歌曲API替身服务器的处理器
+
+    POST /api/Songs 新建歌曲返回201，Title|Artist重复时返回409；
+    POST /api/Songs/batch 批量新建，返回每首的状态，batch为False时返回400（与旧版服务器一致）；
+    GET /api/Songs 按 (add_time, id) 倒序分页列出歌曲，支持page和afterTime/afterId两种分页方式，
+    pageSize可覆盖默认的page_size（最多MAX_PAGE_SIZE，与正式API一致）；
+    fail_every大于0时每第N个请求在处理前返回fail_status，用于验证重试；注入的失败带有Retry-After: retry_after
+    （为None时不带，模拟无法确定是否已处理的错误）
+    """
+    stats = {'requests': 0, 'created': 0, 'duplicates': 0, 'failures': 0, 'batches': 0, 'pages': 0, 'payload_bytes': []}
+    songs = {key: index for index, key in enumerate(existing, 1)}
+    records = {}
+    for key, song_id in songs.items():
+        title, _, artist = key.partition('|')
+        records[song_id] = {'id': song_id, 'title': title, 'artist': artist, 'add_time': 0}
+    # 按 (add_time, id) 倒序排列的歌曲，新建歌曲后重新排序
+    listing = {'order': None, 'keys': None}
+    lock = threading.Lock()
+
+    class ApiHandler(QuietHandler):
+        def send_json(self, status: int, payload, headers: Optional[Dict[str, str]] = None):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            with lock:
+                stats['payload_bytes'].append(length)
+            return json.loads(self.rfile.read(length) or b'null')
+
+        def begin_request(self) -> bool:
+            """统计请求并模拟延迟，需要注入失败时返回错误响应和False"""
+            with lock:
+                stats['requests'] += 1
+                failing = fail_every and stats['requests'] % fail_every == 0
+                if failing:
+                    stats['failures'] += 1
+            if latency:
+                time.sleep(latency)
+            if failing:
+                headers = None if retry_after is None else {'Retry-After': retry_after}
+                self.send_json(fail_status, {'error': 'injected failure'}, headers)
+            return not failing
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path.rstrip('/') != '/api/Songs':
+                self.send_json(404, {'error': 'Not found'})
+                return
+            if not self.begin_request():
+                return
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            page = int(query.get('page', 1))
+            size = min(max(int(query.get('pageSize', page_size)), 1), MAX_PAGE_SIZE)
+            with lock:
+                stats['pages'] += 1
+                if listing['order'] is None:
+                    order = sorted(records.values(), key=lambda song: (song['add_time'], song['id']), reverse=True)
+                    listing['order'] = order
+                    # 取负值后为升序，便于二分查找游标位置
+                    listing['keys'] = [(-song['add_time'], -song['id']) for song in order]
+                order, keys = listing['order'], listing['keys']
+            if 'afterTime' in query and 'afterId' in query:
+                start = bisect_right(keys, (-int(query['afterTime']), -int(query['afterId'])))
+            else:
+                start = (page - 1) * size
+            page_songs = order[start:start + size]
+            next_cursor = None
+            if len(page_songs) == size:
+                next_cursor = {'afterTime': page_songs[-1]['add_time'], 'afterId': page_songs[-1]['id']}
+            self.send_json(200, {'songs': page_songs, 'page': page, 'pageSize': size, 'nextCursor': next_cursor})
+
+        def do_POST(self):
+            payload = self.read_json()
+            if not self.begin_request():
+                return
+            path = self.path.rstrip('/')
+            if path == '/api/Songs/batch':
+                if not batch or not isinstance(payload, list):
+                    self.send_json(400, {'error': 'Batch import is not supported'})
+                    return
+                with lock:
+                    stats['batches'] += 1
+                results = []
+                for index, song in enumerate(payload):
+                    status, body = self.create_song(song)
+                    results.append({'index': index, 'status': status, **body})
+                self.send_json(200, {'results': results})
+            elif path == '/api/Songs':
+                self.send_json(*self.create_song(payload))
+            else:
+                self.send_json(404, {'error': 'Not found'})
+
+        def create_song(self, song: Dict):
+            key = song_key(song)
+            with lock:
+                if key in songs:
+                    stats['duplicates'] += 1
+                    return 409, {'error': 'Song already exists'}
+                song_id = songs[key] = len(songs) + 1
+                fields = {name.lower(): value for name, value in song.items()}
+                records[song_id] = {'id': song_id, 'title': fields.get('title'), 'artist': fields.get('artist'),
+                                    'category_id': fields.get('categoryid'), 'add_time': fields.get('addtime') or 0}
+                listing['order'] = None
+                stats['created'] += 1
+                return 201, {'id': song_id}
+
+    ApiHandler.stats = stats
+    ApiHandler.songs = songs
+    ApiHandler.records = records
+    return ApiHandler
+
+# 导出
+__all__ = ["StandinServer", "QuietHandler", "file_handler", "image_handler", "MAX_PAGE_SIZE", "song_key", "api_handler"]
@@ -1,54 +1,28 @@
-import json
 import requests
 import os
-import pyotp
 import logging
 import base64
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.hazmat.primitives.serialization import load_pem_private_key
-from cryptography.hazmat.backends import default_backend
+from auth import get_totp_provider, load_auth_config, RSASigner
 
 # 配置日志记录
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # 加载 appsettings.json 文件获取授权令牌
+# 文件内容按修改时间缓存，未变化时不再重复读取
 def get_auth_tokens():
     appsettings_path = './music_library/net_api/appsettings.json'
     if not os.path.exists(appsettings_path):
         logging.error(f"文件 {appsettings_path} 不存在")
         return None, None, None
 
-    with open(appsettings_path, 'r', encoding='utf-8') as f:
-        config = json.load(f)
     # 获取 TOTPKey、RSAKey 和私钥
-    totp_key = config.get('ApiKeyConfig', {}).get('TOTPKey')
-    rsa_key = config.get('ApiKeyConfig', {}).get('RSAKey')
-    # 从文件读取私钥
     privkey_path = './music_library/net_api/privkey.pem'
-    if os.path.exists(privkey_path):
-        with open(privkey_path, 'r', encoding='utf-8') as f:
-            private_key = f.read()
-    else:
-        private_key = None
-    return totp_key, rsa_key, private_key
+    return load_auth_config(appsettings_path, privkey_path)
 
 # 使用 SHA256withRSA 算法签名数据，签名结果进行 Base64 编码
+# 同一私钥只解析一次
 def sign_data(private_key_pem, data):
-    # 加载私钥
-    private_key = load_pem_private_key(
-        private_key_pem.encode('utf-8'),
-        password=None,
-        backend=default_backend()
-    )
-    # 签名数据
-    signature = private_key.sign(
-        data.encode('utf-8'),
-        padding.PKCS1v15(),
-        hashes.SHA256()
-    )
-    # 对签名结果进行 Base64 编码
-    return base64.b64encode(signature).decode('utf-8')
+    return RSASigner(private_key_pem).sign(data)
 
 # 测试 API 端点
 def test_api_with_token(api_url, token, token_type):
@@ -74,8 +48,7 @@ def test_auth_api():
     # 使用 TOTPKey 测试
     if totp_key:
         # 生成动态 TOTP 令牌
-        totp = pyotp.TOTP(totp_key)
-        totp_token = totp.now()
+        totp_token = get_totp_provider(totp_key).token()
         test_api_with_token(api_url, totp_token, "TOTPKey")
     else:
         logging.info("未获取到 TOTPKey，跳过 TOTPKey 测试。")
@@ -1,43 +1,65 @@
 #!/usr/bin/env python3
 
+import argparse
 import json
 import os
-from typing import List, Dict, Optional
-from jsondata import Song, ChunithmSong, MaimaiSong, OngekiSong, ArcadeSong
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from jsondata import Song, ChunithmSong, MaimaiSong, OngekiSong, ArcadeSong, intern_fields
+from downloader import ImageDownloader, ImageManifest, MANIFEST_NAME, DOWNLOADED, REVALIDATED, SKIPPED
+from jsonstream import build_title_offsets, load_indexed_record, JSONArrayWriter
+import metrics
+import serializer
+
+# 平台列表，决定图片下载和统计的顺序
+PLATFORMS = ['chunithm', 'maimai', 'ongeki']
+
+# 各平台的曲库文件和对应的歌曲类
+SOURCES = {
+    'chunithm': ('chunithm_songs.json', ChunithmSong),
+    'maimai': ('maimai_songs.json', MaimaiSong),
+    'ongeki': ('ongeki_songs.json', OngekiSong),
+}
 
 def read_json_file(file_path: str) -> Dict:
     """读取JSON文件并返回解析后的字典"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with metrics.stage('parse', size=os.path.getsize(file_path)) as record, \
+                open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            record['items'] = len(data if isinstance(data, list) else data.get('songs', []))
+            return data
     except Exception as e:
         print(f"读取文件 {file_path} 失败: {e}")
         return {}
 
-def create_song_objects(json_data: Dict, song_class) -> List:
+def create_song_object(item: Dict, song_class, intern_strings: bool = False):
+    """根据单条JSON记录创建对应的歌曲对象，intern_strings为True时驻留重复的字符串"""
+    # 创建基础Song对象属性
+    song_base = {
+        'title_hiragana': item.get('title_hiragana'),
+        'title_katakana': item.get('title_katakana'),
+        'title_romaji': item.get('title_romaji'),
+        'category_id': item.get('category_id'),
+        'platform_id': item.get('platform_id'),
+        'image_url': item.get('image_url')
+    }
+    
+    # 合并基础属性和游戏特定属性，避免重复参数
+    song_data = song_base.copy()
+    song_data.update(item)
+    if intern_strings:
+        intern_fields(song_data)
+    
+    # 创建游戏特定对象
+    return song_class(** song_data)
+
+def create_song_objects(json_data: Dict, song_class, intern_strings: bool = False) -> List:
     """根据JSON数据创建对应的歌曲对象列表"""
-    songs = []
     # Handle both list and dict JSON structures
     songs_data = json_data if isinstance(json_data, list) else json_data.get('songs', [])
-    for item in songs_data:
-        # 创建基础Song对象属性
-        song_base = {
-            'title_hiragana': item.get('title_hiragana'),
-            'title_katakana': item.get('title_katakana'),
-            'title_romaji': item.get('title_romaji'),
-            'category_id': item.get('category_id'),
-            'platform_id': item.get('platform_id'),
-            'image_url': item.get('image_url')
-        }
-        
-        # 合并基础属性和游戏特定属性，避免重复参数
-        song_data = song_base.copy()
-        song_data.update(item)
-        
-        # 创建游戏特定对象
-        game_song = song_class(** song_data)
-        songs.append(game_song)
-    return songs
+    with metrics.stage('create_song_objects', items=len(songs_data)):
+        return [create_song_object(item, song_class, intern_strings) for item in songs_data]
 
 def find_song_by_title(song_list: List, title: str) -> Optional:
     """根据标题在歌曲列表中查找歌曲"""
@@ -46,88 +68,116 @@ def find_song_by_title(song_list: List, title: str) -> Optional:
             return song
     return None
 
-def generate_arcade_songs() -> List[ArcadeSong]:
-    """生成ArcadeSong对象列表"""
-    # 读取三个JSON文件
-    chunithm_data = read_json_file('chunithm_songs.json')
-    maimai_data = read_json_file('maimai_songs.json')
-    ongeki_data = read_json_file('ongeki_songs.json')
-    
-    # 创建对应的歌曲对象列表
-    chunithm_songs = create_song_objects(chunithm_data, ChunithmSong)
-    maimai_songs = create_song_objects(maimai_data, MaimaiSong)
-    ongeki_songs = create_song_objects(ongeki_data, OngekiSong)
-    
-    # 收集所有唯一的标题
-    all_titles = set()
-    all_titles.update(song.title for song in chunithm_songs)
-    all_titles.update(song.title for song in maimai_songs)
-    all_titles.update(song.title for song in ongeki_songs)
-    
+def build_title_index(song_list: List) -> Dict:
+    """按标题建立歌曲索引，同名歌曲只保留第一首（与find_song_by_title一致）"""
+    index = {}
+    for song in song_list:
+        index.setdefault(song.title, song)
+    return index
+
+def merge_arcade_songs(chunithm_songs: List, maimai_songs: List, ongeki_songs: List,
+                       match: str = 'exact') -> List[ArcadeSong]:
+    """按标题合并三个平台的歌曲列表，每个来源只建立一次索引
+
+    match为normalized或fuzzy时使用matching.py按规范化标题、读音和模糊匹配合并
+    """
+    with metrics.stage('join', items=len(chunithm_songs) + len(maimai_songs) + len(ongeki_songs)):
+        return _merge_arcade_songs(chunithm_songs, maimai_songs, ongeki_songs, match)
+
+def _merge_arcade_songs(chunithm_songs: List, maimai_songs: List, ongeki_songs: List, match: str) -> List[ArcadeSong]:
+    chunithm_index = build_title_index(chunithm_songs)
+    maimai_index = build_title_index(maimai_songs)
+    ongeki_index = build_title_index(ongeki_songs)
+
+    if match != 'exact':
+        from matching import match_groups
+        matcher = match_groups({'chunithm': chunithm_index, 'maimai': maimai_index, 'ongeki': ongeki_index}, match)
+        return [ArcadeSong(**group) for group in matcher.groups]
+
+    # 收集所有唯一的标题，按首次出现的顺序排列
+    all_titles = dict.fromkeys(chunithm_index)
+    all_titles.update(dict.fromkeys(maimai_index))
+    all_titles.update(dict.fromkeys(ongeki_index))
+
     # 根据标题创建ArcadeSong对象
-    arcade_songs = []
-    for title in all_titles:
-        arcade_song = ArcadeSong(
+    return [
+        ArcadeSong(
             title=title,
-            chunithm=find_song_by_title(chunithm_songs, title),
-            maimai=find_song_by_title(maimai_songs, title),
-            ongeki=find_song_by_title(ongeki_songs, title)
+            chunithm=chunithm_index.get(title),
+            maimai=maimai_index.get(title),
+            ongeki=ongeki_index.get(title)
         )
-        arcade_songs.append(arcade_song)
-    
-    return arcade_songs
+        for title in all_titles
+    ]
+
+def load_platform_songs(platform: str, intern_strings: bool = False) -> List:
+    """读取单个平台的曲库文件并创建歌曲对象列表"""
+    file_path, song_class = SOURCES[platform]
+    return create_song_objects(read_json_file(file_path), song_class, intern_strings)
+
+def generate_arcade_songs(intern_strings: bool = False, processes: int = 1, match: str = 'exact') -> List[ArcadeSong]:
+    """生成ArcadeSong对象列表，processes大于1时在多个进程中同时解析三个曲库"""
+    if processes > 1:
+        # 子进程中的parse/create_song_objects统计不会传回，这里按整体记为parallel_load
+        with metrics.stage('parallel_load') as record, \
+                ProcessPoolExecutor(max_workers=min(processes, len(PLATFORMS))) as pool:
+            songs = dict(zip(PLATFORMS, pool.map(load_platform_songs, PLATFORMS, [intern_strings] * len(PLATFORMS))))
+            record['items'] = sum(len(platform_songs) for platform_songs in songs.values())
+    else:
+        songs = {platform: load_platform_songs(platform, intern_strings) for platform in PLATFORMS}
+
+    return merge_arcade_songs(songs['chunithm'], songs['maimai'], songs['ongeki'], match)
+
+def stream_arcade_songs() -> Iterator[ArcadeSong]:
+    """流式生成ArcadeSong对象
+
+    先为每个曲库文件建立 标题->字节偏移 索引，再按与merge_arcade_songs相同的顺序
+    逐组回读记录并产出，内存占用只与标题数量有关
+    """
+    files = {}
+    try:
+        indexes = {}
+        for platform in PLATFORMS:
+            file_path, _ = SOURCES[platform]
+            try:
+                files[platform] = open(file_path, 'rb')
+                indexes[platform] = build_title_offsets(files[platform])
+            except Exception as e:
+                print(f"读取文件 {file_path} 失败: {e}")
+                indexes[platform] = {}
+
+        seen = []
+        for platform in PLATFORMS:
+            for title in indexes[platform]:
+                # 已在前面的平台中产出过的标题跳过
+                if any(title in index for index in seen):
+                    continue
+                songs = {}
+                for name in PLATFORMS:
+                    entry = indexes[name].get(title)
+                    item = load_indexed_record(files[name], entry) if entry is not None else None
+                    songs[name] = create_song_object(item, SOURCES[name][1]) if item is not None else None
+                yield ArcadeSong(title=title, **songs)
+            seen.append(indexes[platform])
+    finally:
+        for f in files.values():
+            f.close()
 
 def dataclass_to_dict(obj):
     """将dataclass对象转换为字典"""
-    if hasattr(obj, '__dataclass_fields__'):
-        result = {}
-        for field in obj.__dataclass_fields__:
-            value = getattr(obj, field)
-            result[field] = dataclass_to_dict(value)
-        return result
-    elif isinstance(obj, list):
-        return [dataclass_to_dict(item) for item in obj]
-    else:
-        return obj
+    return serializer.to_dict(obj)
     
 def download_image(image_url: str, platform: str, filename: str):
-
     """下载图片到指定路径"""
-    try:
-        filepath = os.path.join('images', platform, filename)
-        real_image_url = image_url
-
-        if(platform == 'chunithm'):
-            real_image_url = "https://new.chunithm-net.com/chuni-mobile/html/mobile/img/" + image_url
-        elif(platform == 'maimai'):
-            real_image_url = "https://maimaidx.jp/maimai-mobile/img/Music/" + image_url
-        elif(platform == 'ongeki'):
-            real_image_url = "https://ongeki-net.com/ongeki-mobile/img/music/" + image_url
-
-        import requests
-        response = requests.get(real_image_url, verify=False)
-        response.raise_for_status()  # 确保请求成功
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
-        print(f"图片已下载: {filepath}")
-    except Exception as e:
-        print(f"下载图片失败: {e}")
+    with ImageDownloader(workers=1) as downloader:
+        return downloader.download(image_url, platform, filename)
 
-if __name__ == '__main__':
-    # 生成ArcadeSong对象列表
-    arcade_songs = generate_arcade_songs()
-    
-    # 转换为字典列表
-    arcade_songs_dict = [dataclass_to_dict(song) for song in arcade_songs]
-    
-    # 输出到JSON文件
-    with open('arcade_songs_output.json', 'w', encoding='utf-8') as f:
-        json.dump(arcade_songs_dict, f, ensure_ascii=False, indent=2)    
-        
-    # 此处遍历字典并下载图片
+def collect_image_jobs(arcade_songs_dict: List[Dict]) -> List[Tuple[str, str, str]]:
+    """收集需要下载的图片 (image_url, platform, filename) 列表"""
+    jobs = []
     for song in arcade_songs_dict:
         # 遍历每个游戏平台
-        for platform in ['chunithm', 'maimai', 'ongeki']:
+        for platform in PLATFORMS:
             if song[platform] is None: continue
             # 获取图片URL
             image_url = song[platform]['image_url']
@@ -136,37 +186,224 @@ if __name__ == '__main__':
             if image_url:
                 # 提取文件名
                 filename = os.path.basename(image_url)
-                # 构建完整路径
-                filepath = filename
-                # 下载图片
-                download_image(image_url, platform, filename)
+                jobs.append((image_url, platform, filename))
+    return jobs
 
+class ArcadeStats:
+    """逐首累计各平台收录统计，可用于流式输出"""
 
+    def __init__(self):
+        self.total = 0
+        self.counts = dict.fromkeys(PLATFORMS, 0)
+        self.both_chunithm_maimai = 0
+        self.both_chunithm_ongeki = 0
+        self.both_maimai_ongeki = 0
+        self.all_three = 0
+
+    def add(self, song: ArcadeSong):
+        self.total += 1
+        for platform in PLATFORMS:
+            if getattr(song, platform) is not None:
+                self.counts[platform] += 1
+        if song.chunithm and song.maimai:
+            self.both_chunithm_maimai += 1
+        if song.chunithm and song.ongeki:
+            self.both_chunithm_ongeki += 1
+        if song.maimai and song.ongeki:
+            self.both_maimai_ongeki += 1
+        if song.chunithm and song.maimai and song.ongeki:
+            self.all_three += 1
+
+    def report(self):
+        # 输出数据统计信息
+        print("===== 数据统计结果 =====")
+        print(f"总歌曲数量: {self.total}")
+        
+        # 各平台单独收录统计
+        print(f"\n各平台收录数量:")
+        print(f"Chunithm: {self.counts['chunithm']}")
+        print(f"Maimai: {self.counts['maimai']}")
+        print(f"Ongeki: {self.counts['ongeki']}")
+        
+        # 多平台同时收录统计
+        print(f"\n多平台同时收录数量:")
+        print(f"Chunithm & Maimai: {self.both_chunithm_maimai}")
+        print(f"Chunithm & Ongeki: {self.both_chunithm_ongeki}")
+        print(f"Maimai & Ongeki: {self.both_maimai_ongeki}")
+        print(f"三平台同时收录: {self.all_three}")
+        print("=======================")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='街机曲库合并工具')
+    parser.add_argument('--workers', type=int, default=8, help='图片下载并发数，默认8')
+    parser.add_argument('--rate', type=float, default=0, help='每个主机每秒最多请求数，默认0表示不限制')
+    parser.add_argument('--manifest', default=os.path.join('images', MANIFEST_NAME), help='图片清单路径，用于跳过未变化的图片')
+    parser.add_argument('--revalidate', action='store_true', help='对已有图片发送条件请求确认是否变化')
+    parser.add_argument('--stream', action='store_true', help='流式读取曲库并逐条写出，内存占用与曲库大小无关')
+    parser.add_argument('--no-images', action='store_true', help='只生成JSON，不同步图片')
+    parser.add_argument('--fast-json', action='store_true', help='已安装orjson时用其写出JSON，输出内容不变')
+    parser.add_argument('--intern', action='store_true', help='驻留艺术家、分类、版本、难度等重复字符串以节省内存')
+    parser.add_argument('--refresh', action='store_true', help='先并发刷新三个曲库，均未变化且已有输出时跳过合并')
+    parser.add_argument('--force', action='store_true', help='与--refresh一起使用，重新下载全部曲库并合并')
+    parser.add_argument('--incremental', action='store_true', help='与上次合并的快照比较，只更新变化的分组并写出变更日志')
+    parser.add_argument('--parse-workers', type=int, default=None, help='解析曲库的进程数，默认使用--refresh时为3，否则为1')
+    parser.add_argument('--match', default='exact', choices=['exact', 'normalized', 'fuzzy'],
+                        help='跨平台匹配方式：exact按标题完全一致，normalized忽略全半角/空白/符号并按读音匹配，fuzzy再加模糊匹配')
+    parser.add_argument('--columnar', default=None,
+                        help='同时写出列式文件（.parquet/.arrow/.feather需要pyarrow，.npy需要numpy），并按列统计难度分布')
+    parser.add_argument('--snapshot', default=None, help='同时写出二进制快照（如arcade_songs_output.snap），查看器可用mmap直接打开')
+    parser.add_argument('--thumbnails', action='store_true', help='同步图片后按内容去重并生成缩略图（需要Pillow），查看器改用缩略图')
+    parser.add_argument('--thumb-format', default='webp', choices=['webp', 'jpeg'], help='缩略图格式，默认webp')
+    parser.add_argument('--metrics', default=None, help='写出各阶段耗时、吞吐和延迟直方图（.prom为Prometheus文本格式，其余为JSON）')
+    parser.add_argument('--profile', default=None, help='用cProfile采集并写入该文件')
+    parser.add_argument('--tracemalloc', action='store_true', help='用tracemalloc记录内存峰值和分配最多的代码行')
+    args = parser.parse_args()
+    if args.match != 'exact' and (args.stream or args.incremental):
+        parser.error('--match 不能与 --stream 或 --incremental 同时使用')
+    if args.thumbnails and args.no_images:
+        parser.error('--thumbnails 不能与 --no-images 同时使用')
+    if args.columnar and args.incremental:
+        parser.error('--columnar 不能与 --incremental 同时使用')
+    if args.columnar:
+        from columnar import check_format
+        try:
+            check_format(args.columnar)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+def sync_images(args, image_jobs: Iterable[Tuple[str, str, str]]) -> str:
+    """并发同步图片，未变化的图片按清单跳过，返回图片根目录
+
+    image_jobs可以是生成器：下载器按需读取，在途任务数有上限，流式处理时图片边合并边下载
+    """
+    manifest = ImageManifest(args.manifest)
+    with metrics.stage('images') as record, \
+            ImageDownloader(workers=args.workers, rate_per_host=args.rate,
+                            manifest=manifest, revalidate=args.revalidate) as downloader:
+        counts, failed = downloader.download_all(image_jobs)
+        record['items'] = sum(counts.values()) + len(failed)
+    print(f"图片同步完成: 下载 {counts[DOWNLOADED]} 张, 确认未变化 {counts[REVALIDATED]} 张, "
+          f"跳过 {counts[SKIPPED]} 张, 失败 {len(failed)} 张")
+    return downloader.root
+
+def main(args):
+    stats = ArcadeStats()
+    columns = None
+    snapshot = None
+    if args.columnar:
+        from columnar import ColumnBuilder, export
+        columns = ColumnBuilder()
+    image_jobs = []
+    image_root = None
+
+    if args.refresh:
+        from refresh import fetch_catalogs, catalogs_changed, report
+        results = fetch_catalogs(force=args.force)
+        report(results)
+        if not catalogs_changed(results) and os.path.exists('arcade_songs_output.json') and not args.force:
+            print("三个曲库均未变化，跳过合并")
+            return
+    parse_workers = args.parse_workers or (len(PLATFORMS) if args.refresh else 1)
+
+    if args.incremental:
+        # 只重新生成受影响的分组，图片只同步新增和变化的分组
+        from incremental import incremental_merge, changed_groups, summary
+        with metrics.stage('incremental'):
+            changelog = incremental_merge()
+        print(summary(changelog))
+        if args.snapshot:
+            # 快照不支持原地更新，按合并后的完整输出重新写出
+            from snapshot import write_snapshot
+            with metrics.stage('snapshot') as record, open('arcade_songs_output.json', 'r', encoding='utf-8') as f:
+                record['items'] = write_snapshot(json.load(f), args.snapshot)
+        if not args.no_images:
+            image_jobs = collect_image_jobs(changed_groups(changelog))
+    else:
+        with open('arcade_songs_output.json', 'w', encoding='utf-8') as f:
+            if args.stream:
+                # 逐组合并、转换并写出
+                if args.snapshot:
+                    from snapshot import SnapshotWriter
+                    snapshot = SnapshotWriter(args.snapshot)
+                with metrics.stage('stream') as record, JSONArrayWriter(f, fast=args.fast_json) as writer:
+                    def write_songs():
+                        """逐组写出，并产生该组需要同步的图片"""
+                        for song in stream_arcade_songs():
+                            song_dict = dataclass_to_dict(song)
+                            writer.write(song_dict)
+                            if snapshot is not None:
+                                snapshot.add(song_dict)
+                            if columns is not None:
+                                columns.add(song_dict)
+                            else:
+                                stats.add(song)
+                            if not args.no_images:
+                                yield from collect_image_jobs([song_dict])
+                    if args.no_images:
+                        for _ in write_songs():
+                            pass
+                    else:
+                        # 边合并边下载，不保存整个曲库的图片列表
+                        image_root = sync_images(args, write_songs())
+                    record['items'] = writer.count
+                if snapshot is not None:
+                    # 先写完JSON，快照的修改时间不早于JSON，查看器才会选用快照
+                    f.flush()
+                    with metrics.stage('snapshot', items=snapshot.count):
+                        snapshot.close()
+            else:
+                # 生成ArcadeSong对象列表
+                arcade_songs = generate_arcade_songs(args.intern, parse_workers, args.match)
+            
+                # 转换为字典列表
+                with metrics.stage('to_dict', items=len(arcade_songs)):
+                    arcade_songs_dict = [dataclass_to_dict(song) for song in arcade_songs]
+            
+                # 输出到JSON文件
+                with metrics.stage('serialize', items=len(arcade_songs_dict)) as record:
+                    serializer.dump(arcade_songs_dict, f, fast=args.fast_json)
+                    record['bytes'] = f.tell()
+                if args.snapshot:
+                    from snapshot import write_snapshot
+                    f.flush()
+                    with metrics.stage('snapshot', items=len(arcade_songs_dict)):
+                        write_snapshot(arcade_songs_dict, args.snapshot)
+                if columns is not None:
+                    columns.extend(arcade_songs_dict)
+                else:
+                    for song in arcade_songs:
+                        stats.add(song)
+                if not args.no_images:
+                    image_jobs = collect_image_jobs(arcade_songs_dict)
+        
+    # 并发同步所有图片（流式处理时已在写出过程中同步）
+    if not args.no_images:
+        if image_root is None:
+            image_root = sync_images(args, image_jobs)
+        if args.thumbnails:
+            # 相同内容的图片只保留一份，每个内容生成一张缩略图
+            from thumbnails import sync_thumbnails, report as thumbnail_report
+            with metrics.stage('thumbnails') as record:
+                thumbnail_stats = sync_thumbnails(image_root, thumb_format=args.thumb_format)
+                record['items'] = thumbnail_stats.get('generated', 0)
+            thumbnail_report(thumbnail_stats)
     
-    # 输出数据统计信息
-    print("===== 数据统计结果 =====")
-    total_songs = len(arcade_songs)
-    print(f"总歌曲数量: {total_songs}")
-    
-    # 各平台单独收录统计
-    chunithm_count = sum(1 for song in arcade_songs if song.chunithm is not None)
-    maimai_count = sum(1 for song in arcade_songs if song.maimai is not None)
-    ongeki_count = sum(1 for song in arcade_songs if song.ongeki is not None)
-    
-    print(f"\n各平台收录数量:")
-    print(f"Chunithm: {chunithm_count}")
-    print(f"Maimai: {maimai_count}")
-    print(f"Ongeki: {ongeki_count}")
-    
-    # 多平台同时收录统计
-    both_chunithm_maimai = sum(1 for song in arcade_songs if song.chunithm and song.maimai)
-    both_chunithm_ongeki = sum(1 for song in arcade_songs if song.chunithm and song.ongeki)
-    both_maimai_ongeki = sum(1 for song in arcade_songs if song.maimai and song.ongeki)
-    all_three = sum(1 for song in arcade_songs if song.chunithm and song.maimai and song.ongeki)
-    
-    print(f"\n多平台同时收录数量:")
-    print(f"Chunithm & Maimai: {both_chunithm_maimai}")
-    print(f"Chunithm & Ongeki: {both_chunithm_ongeki}")
-    print(f"Maimai & Ongeki: {both_maimai_ongeki}")
-    print(f"三平台同时收录: {all_three}")
-    print("=======================")
\ No newline at end of file
+    if columns is not None:
+        # 平台收录和难度分布按列统计
+        from columnar import report
+        with metrics.stage('columnar', items=columns.count):
+            export(columns.columns, args.columnar)
+        print(f"列式文件已写出: {args.columnar}")
+        report(columns.columns)
+    elif not args.incremental:
+        stats.report()
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    with metrics.profiling(args.profile, args.tracemalloc):
+        main(args)
+    if args.metrics:
+        metrics.METRICS.write(args.metrics)
+        print(metrics.METRICS.report())
+        print(f"指标已写出: {args.metrics}")
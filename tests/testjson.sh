@@ -1,5 +1,4 @@
 #! /bin/bash
-rm -rvf *.json
-./refresh.sh
-python3 testjson.py
-python3 viewdata.py
\ No newline at end of file
+# 并发刷新三个曲库（条件请求），有变化时合并并同步图片
+python3 testjson.py --refresh
+python3 viewdata.py
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# 封面缩略图：按内容哈希把各平台的封面图片只保存一份（硬链接到内容寻址存储），
+# 再用进程池生成WebP/JPEG缩略图，已生成的缩略图跳过
+# 用法: python3 thumbnails.py [--root images] [--size 200] [--format webp|jpeg] [--processes N]
+# 下载图片后直接生成请使用 python3 testjson.py --thumbnails
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from downloader import MANIFEST_NAME, file_sha256
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+PLATFORMS = ('chunithm', 'maimai', 'ongeki')
+
+# 内容寻址存储：images/store/<哈希前两位>/<哈希>，扩展名不同但内容相同的图片也只存一份
+STORE_DIR = 'store'
+# 缩略图：images/thumbs/<哈希>.<格式>，文件名只由内容决定，可长期缓存
+THUMB_DIR = 'thumbs'
+# 索引：每张图片的大小、修改时间和哈希，以及每个哈希对应的缩略图文件名
+INDEX_NAME = 'thumbs.json'
+
+# 缩略图最长边（像素），页面按100px显示，按2倍生成以适配高分屏
+THUMB_SIZE = 200
+FORMATS = {'webp': ('.webp', 'WEBP'), 'jpeg': ('.jpg', 'JPEG')}
+QUALITY = 80
+
+def load_index(root: str) -> Dict:
+    try:
+        with open(os.path.join(root, INDEX_NAME), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if isinstance(index.get('images'), dict) and isinstance(index.get('thumbs'), dict):
+            return index
+    except (OSError, ValueError):
+        pass
+    return {'images': {}, 'thumbs': {}}
+
+def save_index(root: str, index: Dict):
+    """先写临时文件再替换，查看器读取时不会读到一半的索引"""
+    path = os.path.join(root, INDEX_NAME)
+    with open(path + '.part', 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(path + '.part', path)
+
+def scan_images(root: str) -> List[Tuple[str, str]]:
+    """各平台目录下的图片 (平台, 文件名)，跳过下载中的临时文件"""
+    images = []
+    for platform in PLATFORMS:
+        directory = os.path.join(root, platform)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.part') or name == MANIFEST_NAME:
+                continue
+            if os.path.isfile(os.path.join(directory, name)):
+                images.append((platform, name))
+    return images
+
+def dedupe(root: str, index: Dict) -> Dict[str, int]:
+    """把每张图片硬链接到内容寻址存储，内容相同的图片共用一份数据
+
+    大小和修改时间与索引一致的图片不重新计算哈希。文件系统不支持硬链接时只记录哈希，
+    缩略图仍按哈希去重。返回 文件数、不同内容数、新链接数和节省的字节数
+    """
+    entries = index['images']
+    seen = {}
+    stats = {'files': 0, 'unique': 0, 'linked': 0, 'saved_bytes': 0, 'unlinked': 0}
+    live = set()
+    for platform, name in scan_images(root):
+        key = f"{platform}/{name}"
+        path = os.path.join(root, platform, name)
+        stat = os.stat(path)
+        entry = entries.get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            sha256 = entry['sha256']
+        else:
+            sha256 = file_sha256(path)
+        live.add(key)
+        stats['files'] += 1
+
+        store_path = os.path.join(root, STORE_DIR, sha256[:2], sha256)
+        try:
+            if not os.path.exists(store_path):
+                os.makedirs(os.path.dirname(store_path), exist_ok=True)
+                os.link(path, store_path)
+            elif not os.path.samefile(path, store_path):
+                # 已有相同内容：用指向存储的硬链接替换这份副本
+                os.link(store_path, path + '.part')
+                os.replace(path + '.part', path)
+                stats['linked'] += 1
+                stat = os.stat(path)
+        except OSError:
+            stats['unlinked'] += 1
+        else:
+            if sha256 in seen:
+                stats['saved_bytes'] += stat.st_size
+        seen.setdefault(sha256, stat.st_size)
+        entries[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+
+    # 已删除的图片从索引中移除，存储中不再被引用的内容及其缩略图一并删除
+    for key in [key for key in entries if key not in live]:
+        del entries[key]
+    stats['unique'] = len(seen)
+    stats['pruned'] = prune_store(root, seen)
+    stats['pruned_thumbs'] = prune_thumbnails(root, seen)
+    index['thumbs'] = {sha256: name for sha256, name in index['thumbs'].items() if sha256 in seen}
+    return stats
+
+def prune_store(root: str, live) -> int:
+    """删除存储中哈希不在live中的文件，返回删除数"""
+    store = os.path.join(root, STORE_DIR)
+    if not os.path.isdir(store):
+        return 0
+    pruned = 0
+    for prefix in os.listdir(store):
+        directory = os.path.join(store, prefix)
+        for name in os.listdir(directory):
+            if name not in live:
+                os.remove(os.path.join(directory, name))
+                pruned += 1
+    return pruned
+
+def prune_thumbnails(root: str, live) -> int:
+    """删除哈希不在live中的缩略图（thumbs/<哈希>.*，包括未完成的临时文件），返回删除数"""
+    thumb_dir = os.path.join(root, THUMB_DIR)
+    if not os.path.isdir(thumb_dir):
+        return 0
+    pruned = 0
+    for name in os.listdir(thumb_dir):
+        if name.split('.', 1)[0] not in live:
+            os.remove(os.path.join(thumb_dir, name))
+            pruned += 1
+    return pruned
+
+def make_thumbnail(job: Tuple[str, str, int, str]) -> Tuple[str, Optional[str]]:
+    """在子进程中生成一张缩略图，返回 (目标路径, 错误信息)"""
+    source, target, size, image_format = job
+    try:
+        with Image.open(source) as image:
+            # 调色板图只能按最近邻缩放，先和其他模式一样转为RGB，有透明度时转为RGBA
+            if image.mode not in ('RGB', 'RGBA', 'L'):
+                has_alpha = 'A' in image.mode or 'transparency' in image.info
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+            image.thumbnail((size, size))
+            if image_format == 'JPEG' and image.mode == 'RGBA':
+                # JPEG不支持透明度，铺在白色背景上
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            partial_path = target + '.part'
+            image.save(partial_path, format=image_format, quality=QUALITY)
+        os.replace(partial_path, target)
+        return target, None
+    except Exception as e:
+        return target, str(e)
+
+def generate_thumbnails(root: str, index: Dict, size: int = THUMB_SIZE, thumb_format: str = 'webp',
+                        processes: Optional[int] = None, chunksize: int = 16) -> Dict:
+    """为每个不同的内容生成一张缩略图，已存在的跳过；返回生成数、跳过数、失败和耗时"""
+    if Image is None:
+        raise RuntimeError("生成缩略图需要安装 Pillow")
+    suffix, image_format = FORMATS[thumb_format]
+    thumb_dir = os.path.join(root, THUMB_DIR)
+    os.makedirs(thumb_dir, exist_ok=True)
+
+    sources = {}
+    for key, entry in index['images'].items():
+        sources.setdefault(entry['sha256'], os.path.join(root, *key.split('/', 1)))
+    jobs = []
+    skipped = 0
+    thumbs = {}
+    for sha256, source in sources.items():
+        name = sha256 + suffix
+        thumbs[sha256] = name
+        target = os.path.join(thumb_dir, name)
+        if os.path.exists(target):
+            skipped += 1
+        else:
+            jobs.append((source, target, size, image_format))
+
+    start = time.perf_counter()
+    failed = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for target, error in pool.map(make_thumbnail, jobs, chunksize=chunksize):
+                if error:
+                    failed.append((target, error))
+                    thumbs.pop(os.path.splitext(os.path.basename(target))[0], None)
+    elapsed = time.perf_counter() - start
+    index['thumbs'] = thumbs
+    return {'generated': len(jobs) - len(failed), 'skipped': skipped, 'failed': failed, 'seconds': elapsed}
+
+def sync_thumbnails(root: str = 'images', size: int = THUMB_SIZE, thumb_format: str = 'webp',
+                    processes: Optional[int] = None) -> Dict:
+    """去重并生成缩略图，返回合并的统计；未安装Pillow时只去重"""
+    index = load_index(root)
+    stats = dedupe(root, index)
+    if Image is None:
+        print("未安装Pillow，跳过缩略图生成（图片去重已完成）")
+    else:
+        stats.update(generate_thumbnails(root, index, size, thumb_format, processes))
+    save_index(root, index)
+    stats['original_bytes'] = sum(entry['size'] for entry in index['images'].values())
+    stats['thumb_bytes'] = sum(os.path.getsize(os.path.join(root, THUMB_DIR, name))
+                               for name in index['thumbs'].values()
+                               if os.path.exists(os.path.join(root, THUMB_DIR, name)))
+    return stats
+
+def thumbnail_map(root: str = 'images') -> Dict[str, str]:
+    """平台/文件名 -> 缩略图文件名，供查看器使用"""
+    index = load_index(root)
+    thumbs = index['thumbs']
+    return {key: thumbs[entry['sha256']] for key, entry in index['images'].items() if entry['sha256'] in thumbs}
+
+def report(stats: Dict):
+    megabytes = 1024 * 1024
+    print(f"图片 {stats['files']} 张，不同内容 {stats['unique']} 张，本次链接 {stats['linked']} 张，"
+          f"去重节省 {stats['saved_bytes'] / megabytes:.1f} MB")
+    if stats.get('pruned') or stats.get('pruned_thumbs'):
+        print(f"删除不再引用的内容 {stats['pruned']} 份、缩略图 {stats['pruned_thumbs']} 张")
+    if stats.get('unlinked'):
+        print(f"{stats['unlinked']} 张图片无法建立硬链接（文件系统不支持），未节省空间")
+    if 'generated' in stats:
+        rate = stats['generated'] / stats['seconds'] if stats['seconds'] else 0
+        print(f"缩略图: 生成 {stats['generated']} 张（{rate:.0f} 张/秒），跳过已有 {stats['skipped']} 张，"
+              f"失败 {len(stats['failed'])} 张")
+        for target, error in stats['failed'][:10]:
+            print(f"  {target}: {error}")
+    if stats['thumb_bytes']:
+        print(f"原图共 {stats['original_bytes'] / megabytes:.1f} MB，缩略图共 {stats['thumb_bytes'] / megabytes:.1f} MB")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='封面图片去重与缩略图生成')
+    parser.add_argument('--root', default='images', help='图片根目录')
+    parser.add_argument('--size', type=int, default=THUMB_SIZE, help='缩略图最长边（像素）')
+    parser.add_argument('--format', default='webp', choices=list(FORMATS), help='缩略图格式')
+    parser.add_argument('--processes', type=int, default=None, help='生成缩略图的进程数，默认为CPU数')
+    return parser.parse_args()
+
+# 导出
+__all__ = ["STORE_DIR", "THUMB_DIR", "INDEX_NAME", "THUMB_SIZE", "FORMATS", "load_index", "scan_images", "dedupe",
+           "prune_store", "prune_thumbnails", "make_thumbnail", "generate_thumbnails", "sync_thumbnails", "thumbnail_map", "report"]
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    report(sync_thumbnails(args.root, args.size, args.format, args.processes))
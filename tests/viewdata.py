@@ -1,22 +1,299 @@
-from flask import Flask, render_template
+from bisect import bisect_left
+from downloader import build_image_url
+from flask import Flask, request, send_from_directory, stream_template, url_for
 import json
 import os
+import threading
+from search import SearchIndex
+from snapshot import PLATFORM_BITS, Snapshot
+from thumbnails import INDEX_NAME, THUMB_DIR, thumbnail_map
+from urllib.parse import urlencode
 
 app = Flask(__name__)
 
-@app.route('/')
-def display_songs():
-    # 加载JSON数据
-    json_file_path = os.path.join(os.path.dirname(__file__), 'arcade_songs_output.json')
+JSON_FILE_PATH = os.path.join(os.path.dirname(__file__), 'arcade_songs_output.json')
+# testjson.py --snapshot 生成的二进制快照，不比JSON旧时优先使用
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), 'arcade_songs_output.snap')
+# testjson.py --thumbnails 生成的缩略图和索引
+IMAGE_DIR = os.path.join(os.path.dirname(__file__), 'images')
+
+GAMES = ('chunithm', 'maimai', 'ongeki')
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# 缓存的渲染页面数上限
+MAX_CACHED_PAGES = 64
+# 流式输出时每次发送的最小字节数
+STREAM_BUFFER_SIZE = 16 * 1024
+# 缩略图的文件名由图片内容的哈希决定，内容变化时地址也会变化，可以长期缓存
+THUMB_MAX_AGE = 365 * 24 * 3600
+
+# 构建索引所需的 (标题, [(收录的游戏, 艺术家)]) 序列；快照按列读取这几个字段，不解码整条记录
+def index_rows(groups):
+    if isinstance(groups, Snapshot):
+        masks = groups.column('platforms')
+        columns = [(game, PLATFORM_BITS[game], groups.column('artist', game)) for game in GAMES]
+        for position, title in enumerate(groups.column('title')):
+            mask = masks[position]
+            yield title, [(game, artists[position]) for game, bit, artists in columns if mask & bit]
+        return
+    for group in groups:
+        yield group.get('title'), [(game, group[game].get('artist')) for game in GAMES if group.get(game)]
+
+# 歌曲分组的索引，每个版本的数据在第一次筛选时构建一次，不带筛选条件的列表页不需要索引
+# 游戏和艺术家索引为 值 -> 分组位置列表，标题索引为按小写标题排序的 (标题, 位置) 列表，用于前缀查找
+class SongIndex:
+    def __init__(self, groups):
+        self.groups = groups
+        self.built = False
+        self.lock = threading.Lock()
+
+    # 遍历全部分组构建索引；数据来自快照时会在这里解码全部记录
+    def build(self):
+        if self.built:
+            return
+        with self.lock:
+            if not self.built:
+                self._build()
+                self.built = True
+
+    def _build(self):
+        self.by_game = {game: [] for game in GAMES}
+        self.by_artist = {}
+        titles = []
+        for position, (title, songs) in enumerate(index_rows(self.groups)):
+            artists = set()
+            for game, artist in songs:
+                self.by_game[game].append(position)
+                if artist:
+                    artists.add(artist.casefold())
+            for artist in artists:
+                self.by_artist.setdefault(artist, []).append(position)
+            titles.append(((title or '').casefold(), position))
+        titles.sort()
+        self.titles = titles
+        self.title_keys = [title for title, _ in titles]
+        self.game_sets = {game: set(positions) for game, positions in self.by_game.items()}
+
+    # 标题以prefix开头的分组位置（按位置排序）
+    def title_prefix(self, prefix):
+        self.build()
+        prefix = prefix.casefold()
+        start = bisect_left(self.title_keys, prefix)
+        positions = []
+        for title, position in self.titles[start:]:
+            if not title.startswith(prefix):
+                break
+            positions.append(position)
+        positions.sort()
+        return positions
+
+    # 按游戏、标题前缀和艺术家筛选，返回分组位置列表（保持原有顺序）
+    def query(self, games=(), title=None, artist=None):
+        if not games and not title and not artist:
+            return range(len(self.groups))
+        self.build()
+        candidates = []
+        if title:
+            candidates.append(self.title_prefix(title))
+        if artist:
+            candidates.append(self.by_artist.get(artist.casefold(), []))
+        if not candidates:
+            # 只按游戏筛选时以最短的游戏列表为基础
+            candidates.append(min((self.by_game[game] for game in games), key=len))
+        candidates.sort(key=len)
+        filters = [set(positions) for positions in candidates[1:]]
+        filters.extend(self.game_sets[game] for game in games)
+        return [position for position in candidates[0] if all(position in f for f in filters)]
+
+# 缩略图索引的修改时间，尚未生成缩略图时为0
+def thumbs_version():
+    try:
+        return os.stat(os.path.join(IMAGE_DIR, INDEX_NAME)).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+# 进程级缓存：按文件的修改时间和大小缓存解析后的数据、索引和渲染后的页面，文件变化后自动失效
+# 页面中的封面地址取决于缩略图索引，索引变化时同样失效
+class SongCache:
+    def __init__(self):
+        # (文件版本, 索引, ETag)：重新加载时整体替换，无锁读取时三者总是同一版本
+        self.state = (None, None, None)
+        self.search = None
+        self.thumbs = {}
+        self.pages = {}
+        self.lock = threading.Lock()
+
+    # 返回 (索引, ETag)，文件未变化时直接使用缓存
+    def load(self, path):
+        stat = os.stat(path)
+        thumbs = thumbs_version()
+        key = (path, stat.st_mtime_ns, stat.st_size, thumbs)
+        cached_key, index, etag = self.state
+        if key == cached_key:
+            return index, etag
+        with self.lock:
+            cached_key, index, etag = self.state
+            if key != cached_key:
+                if cached_key is None or key[:3] != cached_key[:3]:
+                    if path == SNAPSHOT_PATH:
+                        # mmap打开，只读取头部，分组在访问时才解码
+                        data = Snapshot(path)
+                    else:
+                        with open(path, 'r', encoding='utf-8') as f:
+                            data = json.load(f)
+                    index = SongIndex(data)
+                    self.search = None
+                self.thumbs = thumbnail_map(IMAGE_DIR) if thumbs else {}
+                etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}-{thumbs:x}"
+                self.pages = {}
+                self.state = (key, index, etag)
+            return index, etag
+
+    # 搜索索引在第一次搜索时构建，同一版本的数据只构建一次
+    def search_index(self, index):
+        search = self.search
+        if search is None or search.groups is not index.groups:
+            with self.lock:
+                if self.search is None or self.search.groups is not index.groups:
+                    self.search = SearchIndex(index.groups)
+                search = self.search
+        return search
+
+    # 缓存渲染结果，同一版本的数据只保留最近的若干页；多个响应可能同时结束，淘汰和写入都在锁内进行
+    def store(self, name, etag, page):
+        with self.lock:
+            if etag == self.state[2]:
+                while len(self.pages) >= MAX_CACHED_PAGES:
+                    self.pages.pop(next(iter(self.pages)))
+                self.pages[(name, etag)] = page
+        return page
+
+    # 边渲染边输出，合并模板产生的小块后再发送；完整输出后写入缓存
+    def stream(self, name, etag, chunks):
+        parts = []
+        buffered = []
+        size = 0
+        for chunk in chunks:
+            chunk = chunk.encode('utf-8')
+            buffered.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_BUFFER_SIZE:
+                block = b''.join(buffered)
+                parts.append(block)
+                buffered, size = [], 0
+                yield block
+        block = b''.join(buffered)
+        parts.append(block)
+        yield block
+        self.store(name, etag, b''.join(parts))
+
+song_cache = SongCache()
+
+# 从查询参数中读取正整数
+def int_arg(name, default, maximum=None):
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        value = default
+    value = max(1, value)
+    return min(value, maximum) if maximum else value
+
+# 封面地址：已生成缩略图时使用本站的缩略图，否则使用官方原图
+@app.template_global()
+def jacket(platform, image_url):
+    name = song_cache.thumbs.get(f"{platform}/{os.path.basename(image_url)}")
+    if name:
+        return url_for('thumbnail', name=name)
+    return build_image_url(image_url, platform)
+
+# 有快照且不比JSON旧时使用快照，否则使用JSON
+def data_path():
+    try:
+        snapshot = os.stat(SNAPSHOT_PATH)
+    except FileNotFoundError:
+        return JSON_FILE_PATH
+    try:
+        return SNAPSHOT_PATH if snapshot.st_mtime_ns >= os.stat(JSON_FILE_PATH).st_mtime_ns else JSON_FILE_PATH
+    except FileNotFoundError:
+        return SNAPSHOT_PATH
+
+# 加载数据，返回 (索引, ETag) 或错误响应
+def load_index():
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            songs_data = json.load(f)
+        return song_cache.load(data_path()), None
     except FileNotFoundError:
-        return "错误: 未找到arcade_songs_output.json文件", 404
+        return None, ("错误: 未找到arcade_songs_output.json文件", 404)
     except json.JSONDecodeError:
-        return "错误: JSON文件格式无效", 500
+        return None, ("错误: JSON文件格式无效", 500)
+    except ValueError:
+        return None, ("错误: 快照文件格式无效", 500)
+
+# 分页渲染positions中的分组，filters为回填到表单和翻页链接中的查询参数
+def render_page(index, etag, positions, filters):
+    page_size = filters['page_size']
+    pages = max(1, -(-len(positions) // page_size))
+    page = min(int_arg('page', 1), pages)
+    groups = [index.groups[position] for position in positions[(page - 1) * page_size:page * page_size]]
+
+    name = request.full_path
+    html = song_cache.pages.get((name, etag))
+    if html is None:
+        # stream_template 已通过 stream_with_context 保留请求上下文，首批分组渲染后即开始发送
+        chunks = stream_template('index.html', groups=groups, games=GAMES, filters=filters,
+                                 query=urlencode(filters, doseq=True), page=page, pages=pages, total=len(positions))
+        html = song_cache.stream(name, etag, chunks)
+    response = app.response_class(html, mimetype='text/html')
+    response.set_etag(etag)
+    return response
+
+# 客户端已有当前版本时直接返回304，不再渲染
+def not_modified(etag):
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+@app.route('/')
+def display_songs():
+    loaded, error = load_index()
+    if error:
+        return error
+    index, etag = loaded
+    response = not_modified(etag)
+    if response:
+        return response
+
+    # 筛选条件：game可重复（须同时收录于这些游戏），title为标题前缀，artist为艺术家全名（不区分大小写）
+    games = [game for game in request.args.getlist('game') if game in GAMES]
+    title = request.args.get('title', '').strip()
+    artist = request.args.get('artist', '').strip()
+    filters = {'game': games, 'title': title, 'artist': artist, 'page_size': int_arg('page_size', PAGE_SIZE, MAX_PAGE_SIZE)}
+    return render_page(index, etag, index.query(games, title, artist), filters)
+
+@app.route('/search')
+def search_songs():
+    loaded, error = load_index()
+    if error:
+        return error
+    index, etag = loaded
+    response = not_modified(etag)
+    if response:
+        return response
+
+    # 在标题、读音/假名、罗马字和艺术家中搜索q，结果按相关度排序
+    q = request.args.get('q', '').strip()
+    positions = song_cache.search_index(index).search(q) if q else []
+    filters = {'q': q, 'page_size': int_arg('page_size', PAGE_SIZE, MAX_PAGE_SIZE)}
+    return render_page(index, etag, positions, filters)
 
-    return render_template('index.html', groups=songs_data)
+# 缩略图按内容寻址，浏览器缓存后不再重新验证
+@app.route('/thumbs/<name>')
+def thumbnail(name):
+    response = send_from_directory(os.path.join(IMAGE_DIR, THUMB_DIR), name, max_age=THUMB_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 if __name__ == '__main__':
     # 确保templates目录存在